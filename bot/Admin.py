@@ -1,10 +1,7 @@
 # bot/Admin.py (Yakuniy versiya: Kuryer sessiyasini avtomatik yaratish qo'shildi)
 
 import os 
-import json 
 import time
-import asyncio 
-from pathlib import Path 
 from aiogram.utils.markdown import html_decoration as hd
 
 # ---------------- Aiogram Importlari ----------------
@@ -13,9 +10,25 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
+from Storage import (
+    get_all_user_ids,
+    allocate_id,
+    load_admin_sessions,
+    save_admin_sessions,
+    load_products,
+    save_products,
+    load_couriers,
+    save_couriers,
+    cancel_order,
+)
+from Broadcast import start_broadcast as start_broadcast_job
+from ProductCard import invalidate_product
+from Clock import now_str, event_fields
+from AutoDispatch import on_order_cancelled
+
 # Kuryer funksiyalarini import qilish: get_courier_keyboard va save_courier_session
 try:
-    from .Kuryer import get_courier_keyboard, save_courier_session
+    from Kuryer import get_courier_keyboard, save_courier_session
 except ImportError:
     # Agar import xato bo'lsa, 'dummy' funksiyalarni yaratish
     def get_courier_keyboard():
@@ -29,13 +42,7 @@ except ImportError:
         return {}
 
 # ----------------- Konstanta -----------------
-COMMISSION_RATE = 0.10 
-
-# ----------------- Fayl yo'llari -----------------
-SESSION_FILE = Path(__file__).parent / 'admin.json' 
-DATABASE_FILE = Path(__file__).parent / 'database.json' 
-PRODUCTS_FILE = Path(__file__).parent / 'products.json' 
-COURIERS_FILE = Path(__file__).parent / 'couriers.json' 
+from Rollups import courier_stats
 
 # --------------------------------------------------------------------------------------
 # FSM (Holatlar)
@@ -53,131 +60,28 @@ class AdminStates(StatesGroup):
     waiting_for_courier_id_report = State() 
 
 # --------------------------------------------------------------------------------------
-# JSON bilan ishlash funksiyalari (Admin sessiya, DB, Product, Courier)
+# Admin sessiyasi (saqlash Storage.py orqali)
 # --------------------------------------------------------------------------------------
 
-def load_admin_sessions():
-    if not SESSION_FILE.exists():
-        return {}
-    try:
-        with open(SESSION_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
 def save_admin_session(user_id, message_data):
     sessions = load_admin_sessions()
     session_data = {
         'id': user_id,
         'username': message_data.from_user.username,
         'first_name': message_data.from_user.first_name,
-        'login_time': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
+        'login_time': now_str(),
         'timestamp': time.time()
     }
     sessions[str(user_id)] = session_data
-    try:
-        with open(SESSION_FILE, 'w', encoding='utf-8') as f:
-            json.dump(sessions, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        print(f"XATO: Admin sessiyasini saqlashda xato yuz berdi: {e}")
+    save_admin_sessions(sessions)
     return session_data
 
-def load_products():
-    if not PRODUCTS_FILE.exists():
-        return {}
-    try:
-        with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-def save_products(data):
-    try:
-        with open(PRODUCTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except IOError as e:
-        print(f"XATO: products.json ga saqlashda xato yuz berdi: {e}")
-        return False
-
-def load_couriers():
-    if not COURIERS_FILE.exists():
-        return {}
-    try:
-        with open(COURIERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-def save_couriers(data):
-    try:
-        with open(COURIERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except IOError as e:
-        print(f"XATO: couriers.json ga saqlashda xato yuz berdi: {e}")
-        return False
-
-def load_database():
-    if not DATABASE_FILE.exists():
-        return {}
-    try:
-        with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-def get_all_user_ids():
-    if not DATABASE_FILE.exists():
-        return []
-    try:
-        with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            user_ids = [int(user_id) for user_id in data.keys()] 
-            return user_ids
-        return []
-    except Exception:
-        return []
-
 # --------------------------------------------------------------------------------------
 # Kuryer.py dagi Hisobot Mantiqi (local nusxasi)
 # --------------------------------------------------------------------------------------
 def aggregate_courier_stats(courier_id: str):
-    db_data = load_database()
-    delivered_orders = []
-    total_delivered_count = 0
-    total_sales_amount = 0
-    total_commission = 0
-    
-    for _, user_data in db_data.items():
-        user_orders = user_data.get('orders', [])
-        
-        for order in user_orders:
-            if order.get('status') == 'delivered' and str(order.get('courier_id')) == courier_id:
-                
-                total_delivered_count += 1
-                order_total = order.get('total', 0)
-                commission = int(order_total * COMMISSION_RATE)
-                
-                total_sales_amount += order_total
-                total_commission += commission
-                
-                delivered_orders.append({
-                    'order_id': order.get('order_id'),
-                    'total': order_total,
-                    'commission': commission,
-                    'date': order.get('delivered_at', order.get('date', 'Noma\'lum sana'))
-                })
-                
-    delivered_orders.sort(key=lambda x: x['date'], reverse=True)
-    
-    return {
-        'orders_list': delivered_orders,
-        'count': total_delivered_count,
-        'total_sales': total_sales_amount,
-        'total_commission': total_commission
-    }
+    # Kunlik yig'ma savatlardan (Rollups.py) olinadi, butun tarix qayta aylanmaydi
+    return courier_stats(courier_id)
 
 
 # --------------------------------------------------------------------------------------
@@ -248,13 +152,7 @@ async def _save_product_data(message: types.Message, state: FSMContext, photo_fi
     data = await state.get_data()
     products = load_products()
     
-    new_id = "1"
-    if products:
-        try:
-            last_id = max([int(key) for key in products.keys()])
-            new_id = str(last_id + 1)
-        except ValueError:
-             new_id = "1"
+    new_id = allocate_id('product')
     
     new_product = {
         "id": new_id,
@@ -262,10 +160,11 @@ async def _save_product_data(message: types.Message, state: FSMContext, photo_fi
         "description": data.get('new_product_description'),
         "price": data.get('new_product_price'),
         "image": photo_file_id, 
-        "created_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        "created_at": now_str()
     }
     
     products[new_id] = new_product
+    invalidate_product(new_id)
     
     if save_products(products):
         await message.answer(
@@ -328,33 +227,20 @@ async def start_broadcast(message: types.Message, state: FSMContext):
 
 
 @admin_router.message(AdminStates.broadcast_message, F.content_type.in_({'text', 'photo', 'video', 'document'}))
-async def process_broadcast(message: types.Message, state: FSMContext):
+async def process_broadcast(message: types.Message, state: FSMContext, bot: Bot):
     admin_id = message.from_user.id
     
     try:
         await state.clear() 
-        await message.answer("🚀 Xabarnoma yuborish boshlandi...")
 
         recipient_ids = get_all_user_ids()
         if admin_id in recipient_ids:
             recipient_ids.remove(admin_id) 
-            
-        success_count = 0
-        failed_count = 0
-        
-        if len(recipient_ids) > 0:
-            for user_id in recipient_ids:
-                try:
-                    await message.copy_to(chat_id=user_id) 
-                    success_count += 1
-                except Exception:
-                    failed_count += 1
-                await asyncio.sleep(0.05)
-                
+
+        # Yuborish fonda bajariladi (Broadcast.py): holat saqlanadi va jarayon xabari yangilanib turadi
+        job = await start_broadcast_job(bot, admin_id, message.chat.id, message.message_id, recipient_ids)
         await message.answer(
-            (f"✅ {hd.bold('Xabarnoma yakunlandi!')}\n\n"
-             f"📤 Yuborildi: {hd.bold(str(success_count))} ta\n"
-             f"❌ Yuborilmadi (bloklangan/xato): {hd.bold(str(failed_count))} ta"),
+            f"🚀 Xabarnoma #{job['job_id']} navbatga qo'yildi: {hd.bold(str(len(recipient_ids)))} ta qabul qiluvchi.",
             parse_mode="HTML",
             reply_markup=get_admin_keyboard() 
         )
@@ -384,6 +270,39 @@ async def handle_admin_stats(message: types.Message):
     await message.answer(response, parse_mode="HTML")
 
 
+# ----------------------------------------------------------------------------------
+# 3.1. Buyurtmani bekor qilish (yangi buyurtma xabaridagi tugma)
+# ----------------------------------------------------------------------------------
+@admin_router.callback_query(F.data.startswith("admin_cancel_"))
+async def callback_admin_cancel_order(call: types.CallbackQuery, bot: Bot):
+    if call.from_user.id not in ADMINS or str(call.from_user.id) not in load_admin_sessions():
+        await call.answer("⚠️ Kirish uchun ruxsat yo'q.", show_alert=True)
+        return
+
+    parts = call.data.split('_')
+    target_user_id, order_id = parts[-2], parts[-1]
+    # pending yoki on_delivery: kuryer bir vaqtda qabul qilsa ham holat compare-and-set bilan o'zgaradi
+    user_id, order, previous = cancel_order(
+        order_id, owner_id=target_user_id,
+        updates={**event_fields('cancelled'), 'cancelled_by': 'admin'}
+    )
+    if order is None:
+        await call.answer("Buyurtmani bekor qilib bo'lmaydi (yetkazilgan yoki allaqachon bekor qilingan).", show_alert=True)
+        return
+
+    await call.answer("Bekor qilindi.")
+    try:
+        await call.message.edit_reply_markup(reply_markup=None)
+    except Exception:
+        pass
+    await call.message.answer(f"🚫 Buyurtma #{order_id} bekor qilindi (avvalgi holat: {previous}).")
+    await on_order_cancelled(bot, order)
+    try:
+        await bot.send_message(int(user_id), f"🚫 Buyurtmangiz #{order_id} admin tomonidan bekor qilindi.")
+    except Exception as e:
+        print(f"XATO: Mijoz {user_id} ga bekor qilish haqida xabar yuborib bo'lmadi: {e}")
+
+
 # ----------------------------------------------------------------------------------
 # 4. Kuryer Nazorati tugmasi (Asosiy kuryer menyusi)
 # ----------------------------------------------------------------------------------
@@ -479,7 +398,7 @@ async def process_add_courier_username(message: types.Message, state: FSMContext
         "id": courier_id,
         "username": final_username,
         "added_by": str(message.from_user.id),
-        "added_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        "added_at": now_str()
     }
     
     couriers[courier_id] = new_courier
@@ -717,6 +636,7 @@ async def process_delete_product(message: types.Message, state: FSMContext):
         return
         
     deleted_product = products.pop(target_id_str)
+    invalidate_product(target_id_str)
     
     if save_products(products):
         await message.answer(
@@ -0,0 +1,246 @@
+# bot/AutoDispatch.py (Buyurtmalarni kuryerlarga avtomatik biriktirish)
+#
+# AUTO_DISPATCH yoqilganda yangi buyurtma barcha kuryerlarga emas, eng mos bitta kuryerga
+# taklif qilinadi. Tanlov: hozirgi yuklama (on_delivery + javob kutilayotgan takliflar),
+# masofa (Dispatch.courier_location) va oxirgi takliflarni qabul qilish darajasi.
+# Kuryer AUTO_DISPATCH_TIMEOUT ichida "✅ Buyurtmani olish" ni bosmasa yoki rad etsa,
+# buyurtma keyingi kuryerga o'tadi. Hech kim qolmasa, odatdagidek hammaga yuboriladi.
+# Qabul qilish eski courier_accept_ callbacki va transition_order orqali bo'ladi.
+
+import os
+import asyncio
+
+from aiogram import Bot, types
+
+from Storage import get_order, iter_orders_by_status, iter_orders_by_courier, load_courier_sessions, save_courier_sessions
+from Dispatch import (
+    COURIER_RADIUS_KM,
+    courier_location,
+    courier_order_view,
+    format_courier_order,
+    mark_order_taken,
+    online_courier_ids,
+    push_new_order,
+    remember_push,
+)
+from Geo import haversine_km, point_of
+
+# ----------------- Sozlamalar -----------------
+AUTO_DISPATCH = os.getenv("AUTO_DISPATCH", "off").strip().lower() in ("1", "true", "on", "yes")
+AUTO_DISPATCH_TIMEOUT = float(os.getenv("AUTO_DISPATCH_TIMEOUT", "45"))      # sekund
+AUTO_DISPATCH_MAX_LOAD = int(os.getenv("AUTO_DISPATCH_MAX_LOAD", "5"))       # bir vaqtdagi buyurtmalar
+ACCEPT_RATE_ALPHA = 0.2   # qabul qilish darajasi uchun eksponensial o'rtacha koeffitsienti
+
+# Ball (kichigi yaxshi): yuklama, masofa (radiusga nisbatan) va rad etishlar uchun jarima
+WEIGHT_LOAD = 1.0
+WEIGHT_DISTANCE = 1.0
+WEIGHT_DECLINE = 2.0
+
+# Faol takliflar: order_id -> {'user_id', 'courier_id', 'message_id', 'tried', 'task'}
+_offers = {}
+
+# Ishlayotgan fon vazifalari (taymerlar va qayta takliflar, GC yig'ib olmasligi uchun)
+_tasks = set()
+
+
+def _task_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"XATO: Avtomatik taqsimlash vazifasida xato: {task.exception()!r}")
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
+
+# --------------------------------------------------------------------------------------
+# Kuryerni baholash
+# --------------------------------------------------------------------------------------
+
+def acceptance_rate(courier_id) -> float:
+    session = load_courier_sessions().get(str(courier_id)) or {}
+    return session.get('accept_rate', 1.0)
+
+
+def record_offer_result(courier_id, accepted: bool):
+    sessions = load_courier_sessions()
+    session = sessions.get(str(courier_id))
+    if session is None:
+        return
+    rate = session.get('accept_rate', 1.0)
+    session['accept_rate'] = round((1 - ACCEPT_RATE_ALPHA) * rate + ACCEPT_RATE_ALPHA * (1.0 if accepted else 0.0), 4)
+    save_courier_sessions(sessions)
+
+
+def courier_load(courier_id) -> int:
+    """Yetkazilayotgan buyurtmalar + javob kutilayotgan takliflar soni."""
+    courier_id = str(courier_id)
+    delivering = sum(1 for _ in iter_orders_by_courier(courier_id, 'on_delivery'))
+    offered = sum(1 for offer in _offers.values() if offer['courier_id'] == courier_id)
+    return delivering + offered
+
+
+def rank_couriers(order: dict, exclude=()) -> list:
+    """Buyurtma uchun onlayn kuryerlarni (ball, courier_id) ko'rinishida, eng mosidan boshlab."""
+    target = point_of(order.get('location_geo'))
+    ranked = []
+    for courier_id in online_courier_ids():
+        if courier_id in exclude:
+            continue
+        load = courier_load(courier_id)
+        if load >= AUTO_DISPATCH_MAX_LOAD:
+            continue
+        point = courier_location(courier_id)
+        if target is not None and point is not None:
+            distance = haversine_km(point[0], point[1], target[0], target[1])
+            if distance > COURIER_RADIUS_KM:
+                continue
+            distance_score = distance / COURIER_RADIUS_KM
+        else:
+            # Joylashuv noma'lum: radius chegarasidagi kuryer kabi baholanadi
+            distance_score = 1.0
+        score = (
+            WEIGHT_LOAD * load
+            + WEIGHT_DISTANCE * distance_score
+            + WEIGHT_DECLINE * (1.0 - acceptance_rate(courier_id))
+        )
+        ranked.append((score, courier_id))
+    ranked.sort()
+    return ranked
+
+# --------------------------------------------------------------------------------------
+# Taklif yuborish, vaqt tugashi va qayta biriktirish
+# --------------------------------------------------------------------------------------
+
+def get_offer_keyboard(user_id: str, order_id: str):
+    keyboard = [
+        [
+            types.InlineKeyboardButton(text="✅ Buyurtmani olish", callback_data=f"courier_accept_{user_id}_{order_id}"),
+            types.InlineKeyboardButton(text="❌ Rad etish", callback_data=f"courier_decline_{order_id}")
+        ]
+    ]
+    return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def _is_open(order_id) -> bool:
+    _, order = get_order(order_id)
+    return order is not None and order.get('status') == 'pending' and order.get('courier_id') is None
+
+
+async def dispatch_order(bot: Bot, user_id, order: dict):
+    """Yangi buyurtma: AUTO_DISPATCH bo'lsa bitta kuryerga taklif, aks holda hammaga push."""
+    if not AUTO_DISPATCH:
+        await push_new_order(bot, user_id, order)
+        return
+    await offer_next(bot, str(user_id), str(order.get('order_id')))
+
+
+async def offer_next(bot: Bot, user_id: str, order_id: str):
+    offer = _offers.pop(order_id, None)
+    tried = offer['tried'] if offer else set()
+    if not _is_open(order_id):
+        return
+    _, order = get_order(order_id)
+
+    for _, courier_id in rank_couriers(order, exclude=tried):
+        tried.add(courier_id)
+        view = courier_order_view(user_id, order)
+        text = (
+            f"🎯 <b>Sizga buyurtma biriktirildi!</b>\n"
+            f"⏳ Tasdiqlash uchun {AUTO_DISPATCH_TIMEOUT:g} soniya.\n"
+            + format_courier_order(view)
+        )
+        try:
+            msg = await bot.send_message(int(courier_id), text, parse_mode="HTML", reply_markup=get_offer_keyboard(user_id, order_id))
+        except Exception as e:
+            print(f"XATO: Buyurtma #{order_id} taklifini kuryer {courier_id} ga yuborib bo'lmadi: {e}")
+            continue
+
+        remember_push(order_id, courier_id, msg.message_id)
+        _offers[order_id] = {
+            'user_id': user_id,
+            'courier_id': courier_id,
+            'message_id': msg.message_id,
+            'tried': tried,
+            'task': _spawn(_expire(bot, order_id, courier_id)),
+        }
+        return
+
+    # Mos kuryer qolmadi: odatdagi rejimda barcha onlayn kuryerlarga yuboriladi
+    await push_new_order(bot, user_id, order)
+
+
+async def _expire(bot: Bot, order_id: str, courier_id: str):
+    await asyncio.sleep(AUTO_DISPATCH_TIMEOUT)
+    offer = _offers.get(order_id)
+    if offer is None or offer['courier_id'] != courier_id or offer['task'] is not asyncio.current_task():
+        return
+    record_offer_result(courier_id, False)
+    try:
+        await bot.edit_message_text(
+            chat_id=int(courier_id), message_id=offer['message_id'],
+            text=f"⌛ Buyurtma #{order_id} uchun vaqt tugadi, u boshqa kuryerga berildi."
+        )
+    except Exception:
+        pass
+    await offer_next(bot, offer['user_id'], order_id)
+
+
+def on_order_accepted(order_id, courier_id):
+    """courier_accept_ muvaffaqiyatli bo'lganda chaqiriladi: taymer to'xtatiladi."""
+    offer = _offers.pop(str(order_id), None)
+    if offer is None:
+        return
+    offer['task'].cancel()
+    if offer['courier_id'] == str(courier_id):
+        record_offer_result(courier_id, True)
+
+
+async def on_order_cancelled(bot: Bot, order: dict):
+    """Buyurtma bekor qilindi: taklif taymeri to'xtatiladi, kuryerlardagi nusxalar tahrirlanadi."""
+    order_id = str(order.get('order_id'))
+    offer = _offers.pop(order_id, None)
+    if offer is not None:
+        offer['task'].cancel()
+    text = f"🚫 Buyurtma #{order_id} bekor qilindi."
+    await mark_order_taken(bot, order_id, None, text=text)
+    courier_id = order.get('courier_id')
+    if courier_id is not None:
+        try:
+            await bot.send_message(int(courier_id), text)
+        except Exception as e:
+            print(f"XATO: Bekor qilish haqida kuryer {courier_id} ga xabar yuborib bo'lmadi: {e}")
+
+
+def decline_offer(bot: Bot, order_id, courier_id) -> bool:
+    """Kuryer taklifni rad etdi: keyingi kuryerga taklif fonda yuboriladi (callback kutib qolmaydi)."""
+    order_id, courier_id = str(order_id), str(courier_id)
+    offer = _offers.get(order_id)
+    if offer is None or offer['courier_id'] != courier_id:
+        return False
+    offer['task'].cancel()
+    record_offer_result(courier_id, False)
+    _spawn(offer_next(bot, offer['user_id'], order_id))
+    return True
+
+# --------------------------------------------------------------------------------------
+# Ishga tushirish / to'xtatish
+# --------------------------------------------------------------------------------------
+
+def resume_auto_dispatch(bot: Bot):
+    """Qayta ishga tushganda kuryersiz qolgan pending buyurtmalarni qayta taklif qiladi."""
+    if not AUTO_DISPATCH:
+        return
+    for user_id_str, order in iter_orders_by_status('pending'):
+        order_id = str(order.get('order_id'))
+        if order.get('courier_id') is None and order_id not in _offers:
+            _spawn(offer_next(bot, user_id_str, order_id))
+
+
+def stop_auto_dispatch():
+    for task in list(_tasks):
+        task.cancel()
+    _tasks.clear()
+    _offers.clear()
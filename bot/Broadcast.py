@@ -0,0 +1,206 @@
+# bot/Broadcast.py (Fon rejimidagi, davom ettiriladigan xabarnoma yuborish)
+#
+# Admin xabarnoma yuborganda handler darhol qaytadi, yuborish esa fon vazifasida
+# bir nechta parallel ishchi bilan bajariladi. Ish holati (kichik yozuv) 'broadcasts'
+# kolleksiyasida, qabul qiluvchilar ro'yxati esa alohida, bir marta yoziladigan joyda
+# saqlanadi: har flush faqat kichik yozuvni yozadi. Bot qayta ishga tushsa, tugallanmagan
+# xabarnoma to'xtagan joyidan davom etadi. Botni bloklagan foydalanuvchilar belgilanadi
+# va keyingi xabarnomalarda o'tkazib yuboriladi (/start bosganda belgi olib tashlanadi).
+
+import os
+import time
+import asyncio
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.utils.markdown import html_decoration as hd
+
+from Storage import (
+    allocate_id, get_collection, mark_collection_dirty, get_user_data, mark_dirty, run_io,
+    save_broadcast_recipients, load_broadcast_recipients, delete_broadcast_recipients,
+)
+from Sender import broadcast_priority
+from Clock import now_str
+
+# ----------------- Sozlamalar -----------------
+COLLECTION = 'broadcasts'
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "8"))
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "10"))  # sekund
+BROADCAST_SAVE_EVERY = int(os.getenv("BROADCAST_SAVE_EVERY", "50"))  # har N ta yuborishda holat saqlanadi
+
+# Ishlayotgan fon vazifalari: job_id -> asyncio.Task
+_tasks = {}
+
+# --------------------------------------------------------------------------------------
+# Bloklangan foydalanuvchilar
+# --------------------------------------------------------------------------------------
+
+def is_blocked(user_id) -> bool:
+    user = get_user_data(user_id)
+    return bool(user and user.get('blocked'))
+
+
+def set_blocked(user_id, blocked: bool):
+    user = get_user_data(user_id)
+    if not user or bool(user.get('blocked')) == blocked:
+        return
+    if blocked:
+        user['blocked'] = True
+    else:
+        user.pop('blocked', None)
+    mark_dirty(user_id)
+
+# --------------------------------------------------------------------------------------
+# Ish (job) yaratish va davom ettirish
+# --------------------------------------------------------------------------------------
+
+def _progress_text(job: dict) -> str:
+    total = job.get('total', 0)
+    if job['status'] == 'done':
+        header = f"✅ {hd.bold('Xabarnoma yakunlandi!')}"
+    else:
+        header = f"🚀 {hd.bold('Xabarnoma yuborilmoqda...')} ({job['position']}/{total})"
+    return (
+        f"{header}\n\n"
+        f"📤 Yuborildi: {hd.bold(str(job['sent']))} ta\n"
+        f"🚫 Bloklagan: {hd.bold(str(job['blocked']))} ta\n"
+        f"⏭ O'tkazib yuborildi (avval bloklagan): {hd.bold(str(job['skipped']))} ta\n"
+        f"❌ Xato: {hd.bold(str(job['failed']))} ta"
+    )
+
+
+async def _edit_progress(bot: Bot, job: dict):
+    if not job.get('progress_message_id'):
+        return
+    try:
+        await bot.edit_message_text(
+            chat_id=job['admin_id'],
+            message_id=job['progress_message_id'],
+            text=_progress_text(job),
+            parse_mode="HTML"
+        )
+    except TelegramBadRequest:
+        # Matn o'zgarmagan yoki xabar o'chirilgan
+        pass
+    except Exception as e:
+        print(f"XATO: Xabarnoma holatini yangilashda xato: {e}")
+
+
+async def start_broadcast(bot: Bot, admin_id: int, from_chat_id: int, message_id: int, recipient_ids: list) -> dict:
+    """Yangi xabarnoma ishini yaratadi, saqlaydi va fonda ishga tushiradi."""
+    job_id = allocate_id('broadcast')
+    job = {
+        'job_id': job_id,
+        'admin_id': admin_id,
+        'from_chat_id': from_chat_id,
+        'message_id': message_id,
+        'status': 'running',
+        'total': len(recipient_ids),
+        'position': 0,
+        'sent': 0,
+        'failed': 0,
+        'blocked': 0,
+        'skipped': 0,
+        'created_at': now_str(),
+        'progress_message_id': None,
+    }
+    progress = await bot.send_message(admin_id, _progress_text(job), parse_mode="HTML")
+    job['progress_message_id'] = progress.message_id
+
+    recipients = list(recipient_ids)
+    # Ro'yxat ish yozuvidan oldin yoziladi: qayta ishga tushganda ish doim ro'yxatini topadi
+    await run_io(save_broadcast_recipients, job_id, recipients)
+    get_collection(COLLECTION)[job_id] = job
+    mark_collection_dirty(COLLECTION)
+    _tasks[job_id] = asyncio.create_task(_run(bot, job, recipients))
+    return job
+
+
+def resume_broadcasts(bot: Bot) -> int:
+    """Bot ishga tushganda tugallanmagan xabarnomalarni davom ettiradi."""
+    resumed = 0
+    for job_id, job in get_collection(COLLECTION).items():
+        if job.get('status') == 'running' and job_id not in _tasks:
+            _tasks[job_id] = asyncio.create_task(_run(bot, job))
+            resumed += 1
+    if resumed:
+        print(f"📢 {resumed} ta tugallanmagan xabarnoma davom ettirilmoqda.")
+    return resumed
+
+
+def stop_broadcasts():
+    """Bot o'chayotganda fon vazifalarini to'xtatadi (holat keyingi ishga tushishgacha saqlanadi)."""
+    if _tasks:
+        # Oxirgi saqlangandan keyingi yutuqlar ham yakuniy flush ga tushsin
+        mark_collection_dirty(COLLECTION)
+    for task in list(_tasks.values()):
+        task.cancel()
+    _tasks.clear()
+
+# --------------------------------------------------------------------------------------
+# Yuborish
+# --------------------------------------------------------------------------------------
+
+async def _send_one(bot: Bot, job: dict, user_id: int):
+    if is_blocked(user_id):
+        job['skipped'] += 1
+        return
+    try:
+        await bot.copy_message(chat_id=user_id, from_chat_id=job['from_chat_id'], message_id=job['message_id'])
+        job['sent'] += 1
+    except TelegramForbiddenError:
+        # Foydalanuvchi botni bloklagan yoki akkaunt o'chirilgan
+        set_blocked(user_id, True)
+        job['blocked'] += 1
+    except Exception:
+        job['failed'] += 1
+
+
+async def _run(bot: Bot, job: dict, recipients: list = None):
+    if recipients is None:
+        recipients = await run_io(load_broadcast_recipients, job['job_id'])
+    start = job['position']
+    next_index = start
+    saved_position = start
+    finished = set()
+    last_edit = time.monotonic()
+
+    async def worker():
+        nonlocal next_index, saved_position, last_edit
+        while next_index < len(recipients):
+            index = next_index
+            next_index += 1
+            await _send_one(bot, job, recipients[index])
+
+            # position - shu joygacha hamma yuborilgan (qayta ishga tushganda shu yerdan davom etadi)
+            finished.add(index)
+            while job['position'] in finished:
+                finished.discard(job['position'])
+                job['position'] += 1
+            # Kolleksiya har yuborishda emas, har BROADCAST_SAVE_EVERY tadan keyin yoziladi
+            # (qayta ishga tushganda eng ko'pi shuncha foydalanuvchiga xabar takror boradi)
+            if job['position'] - saved_position >= BROADCAST_SAVE_EVERY:
+                saved_position = job['position']
+                mark_collection_dirty(COLLECTION)
+
+            if time.monotonic() - last_edit >= BROADCAST_PROGRESS_INTERVAL:
+                last_edit = time.monotonic()
+                await _edit_progress(bot, job)
+
+    try:
+        with broadcast_priority():
+            await asyncio.gather(*(worker() for _ in range(max(1, BROADCAST_CONCURRENCY))))
+        job['status'] = 'done'
+        job['finished_at'] = now_str()
+        mark_collection_dirty(COLLECTION)
+        # Tugagan ish uchun ro'yxat kerak emas
+        await run_io(delete_broadcast_recipients, job['job_id'])
+        await _edit_progress(bot, job)
+    except asyncio.CancelledError:
+        # Bot o'chirilmoqda: holat saqlangan, keyingi ishga tushishda davom etadi
+        raise
+    except Exception as e:
+        print(f"XATO: Xabarnoma #{job['job_id']} yuborishda kritik xato: {e}")
+    finally:
+        if _tasks.get(job['job_id']) is asyncio.current_task():
+            del _tasks[job['job_id']]
@@ -1,7 +1,6 @@
 import json
 import os
 import asyncio
-from datetime import datetime
 from aiogram import Bot, Dispatcher, F, Router
 from aiogram.types import (
     Message,
@@ -12,11 +11,32 @@ from aiogram.types import (
     InlineKeyboardButton,
     ReplyKeyboardRemove
 )
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 
+from Storage import (
+    get_user_data,
+    save_user_data,
+    add_order,
+    allocate_id,
+    get_order,
+    save_order,
+    load_products,
+    save_rating,
+    save_comment,
+    save_complaint,
+    order_items,
+    cancel_order,
+)
+from Broadcast import set_blocked
+from AutoDispatch import dispatch_order, on_order_cancelled
+from Geo import create_location_links
+from Clock import now_str, event_fields, stamp
+from ProductCard import render_product_card, render_catalog_page, card_key, is_shown, mark_shown
+
 # ============================================================================
 # SOZLAMALAR - Environment variables dan o'qish
 # ============================================================================
@@ -24,13 +44,15 @@ from aiogram.fsm.storage.memory import MemoryStorage
 ADMIN_ID = int(os.getenv("ADMIN_ID", "5879651176"))
 COMPLAINT_LINK = os.getenv("COMPLAINT_LINK", "https://t.me/questianonbot?start=5879651176")
 
-DATABASE_FILE = 'database.json'
-PRODUCTS_FILE = 'products.json'
-RATINGS_FILE = 'ratings.json'
-COMMENTS_FILE = 'comments.json'
-COMPLAINTS_FILE = 'complaints.json'  # Yangi fayl: shikoyatlar uchun
 DELIVERY_FILE = 'delivery.json'
 
+# ➕/➖ bosishlar shu vaqt (sekund) ichida to'xtaguncha bitta yozuv va bitta tahrirga birlashtiriladi
+CART_DEBOUNCE = float(os.getenv("CART_DEBOUNCE", "0.7"))
+
+# cards (standart) - har bir mahsulot rasmi bilan alohida xabar;
+# paged - barcha mahsulotlar bitta sahifalangan xabarda (rasmlarsiz, faqat yoqilganda)
+CATALOG_MODE = os.getenv("CATALOG_MODE", "cards").strip().lower()
+
 # ============================================================================
 # FSM STATES
 # ============================================================================
@@ -79,73 +101,6 @@ class ComplaintStates(StatesGroup):
 # DATABASE FUNKSIYALARI
 # ============================================================================
 
-def load_database():
-    if os.path.exists(DATABASE_FILE):
-        try:
-            with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-def save_database(data):
-    with open(DATABASE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-
-def load_products():
-    if os.path.exists(PRODUCTS_FILE):
-        try:
-            with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-def load_ratings():
-    if os.path.exists(RATINGS_FILE):
-        try:
-            with open(RATINGS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
-
-def save_rating(rating_data):
-    ratings = load_ratings()
-    ratings.append(rating_data)
-    with open(RATINGS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(ratings, f, ensure_ascii=False, indent=4)
-
-def load_comments():
-    if os.path.exists(COMMENTS_FILE):
-        try:
-            with open(COMMENTS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
-
-def save_comment(comment_data):
-    comments = load_comments()
-    comments.append(comment_data)
-    with open(COMMENTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(comments, f, ensure_ascii=False, indent=4)
-
-def load_complaints():
-    if os.path.exists(COMPLAINTS_FILE):
-        try:
-            with open(COMPLAINTS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return []
-    return []
-
-def save_complaint(complaint_data):
-    complaints = load_complaints()
-    complaints.append(complaint_data)
-    with open(COMPLAINTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(complaints, f, ensure_ascii=False, indent=4)
-
 def load_delivery_boys():
     if os.path.exists(DELIVERY_FILE):
         try:
@@ -159,15 +114,6 @@ def save_delivery_boys(data):
     with open(DELIVERY_FILE, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=4)
 
-def get_user_data(user_id):
-    db = load_database()
-    return db.get(str(user_id), None)
-
-def save_user_data(user_id, data):
-    db = load_database()
-    db[str(user_id)] = data
-    save_database(db)
-
 def is_registered(user_id):
     user_data = get_user_data(user_id)
     return bool(user_data and user_data.get('name') and user_data.get('phone') and 
@@ -299,15 +245,12 @@ def rating_keyboard():
 # YORDAMCHI FUNKSIYALAR
 # ============================================================================
 
-def remember_product_message_id(user_id: int, product_id: str, message_id: int):
-    data = get_user_data(user_id) or {}
-    if 'product_messages' not in data:
-        data['product_messages'] = {}
-    data['product_messages'][product_id] = message_id
-    save_user_data(user_id, data)
-
-async def clear_product_buttons_for_user(bot: Bot, user_id: int, product_id: str):
-    data = get_user_data(user_id) or {}
+async def clear_product_buttons_for_user(bot: Bot, user_id: int, product_id: str, state: FSMContext):
+    """Buyurtmadan keyin mahsulot tugmalarini yangilaydi (xabar ID lari FSM holatida saqlanadi)."""
+    data = await state.get_data()
+    if data.get('catalog_message_id'):
+        await update_catalog_message(bot, user_id, data['catalog_message_id'], data.get('catalog_page', 0))
+        return
     pm = (data.get('product_messages') or {}).get(product_id)
     if pm:
         try:
@@ -315,11 +258,6 @@ async def clear_product_buttons_for_user(bot: Bot, user_id: int, product_id: str
         except Exception:
             pass
 
-def create_location_links(lat, lon):
-    google_link = f"https://www.google.com/maps?q={lat},{lon}"
-    yandex_link = f"https://yandex.com/maps/?ll={lon},{lat}&z=16&pt={lon},{lat}"
-    return google_link, yandex_link
-
 def get_delivery_boy_rating(delivery_boy_id):
     delivery_boys = load_delivery_boys()
     boy = delivery_boys.get(str(delivery_boy_id), {})
@@ -342,6 +280,8 @@ async def cmd_start(message: Message, state: FSMContext):
     user_id = message.from_user.id
     
     if is_registered(user_id):
+        # Avval botni bloklagan bo'lsa, xabarnomalar yana yuboriladi
+        set_blocked(user_id, False)
         await message.answer(
             "Xush kelibsiz! 😊\n\n📱 Asosiy menyu:",
             reply_markup=main_menu_keyboard()
@@ -449,8 +389,7 @@ async def process_home_location_text(message: Message, state: FSMContext):
         'current_location_text': data.get('temp_current_location_text', ''),
         'cart': {},
         'orders': [],
-        'registered_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'product_messages': {}
+        'registered_date': now_str()
     }
     
     save_user_data(user_id, user_data)
@@ -484,8 +423,7 @@ async def process_current_location_text(message: Message, state: FSMContext):
         'current_location_text': message.text,
         'cart': {},
         'orders': [],
-        'registered_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'product_messages': {}
+        'registered_date': now_str()
     }
     
     save_user_data(user_id, user_data)
@@ -562,7 +500,7 @@ async def save_complaint_text(message: Message, state: FSMContext):
         'name': user_data.get('name', 'Nomalum'),
         'phone': user_data.get('phone', 'Nomalum'),
         'complaint': message.text,
-        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'date': now_str(),
         'type': 'complaint'
     }
     
@@ -612,8 +550,14 @@ async def show_products(message: Message, state: FSMContext):
     )
     
     user_id = message.from_user.id
-    for product_id, product in products.items():
-        await send_product_card(message.bot, user_id, product_id, product)
+    if CATALOG_MODE == "paged":
+        message_id = await send_catalog(message.bot, user_id, products)
+        await state.update_data(catalog_message_id=message_id, catalog_page=0, product_messages={})
+    else:
+        product_messages = {}
+        for product_id, product in products.items():
+            product_messages[product_id] = await send_product_card(message.bot, user_id, product_id, product)
+        await state.update_data(catalog_message_id=None, product_messages=product_messages)
     
     await state.set_state(MainMenuStates.products_menu)
 
@@ -623,29 +567,7 @@ async def send_product_card(bot: Bot, user_id: int, product_id: str, product: di
     if user_data and 'cart' in user_data:
         quantity = user_data['cart'].get(product_id, 0)
     
-    if 'price_with_cap' in product and 'price_without_cap' in product:
-        price_text = f"💰 Narx: {product['price_with_cap']:,} so'm (bachok bilan)\n       {product['price_without_cap']:,} so'm (bachoksiz)"
-    else:
-        price_text = f"💰 Narx: {product.get('price', 0):,} so'm"
-    
-    caption = (
-        f"*{product['name']}*\n\n"
-        f"📝 {product['description']}\n"
-        f"{price_text}\n"
-        f"📊 Savatchada: {quantity} ta"
-    )
-    
-    keyboard = [
-        [
-            InlineKeyboardButton(text="➖", callback_data=f"dec_{product_id}"),
-            InlineKeyboardButton(text=f"📦 {quantity}", callback_data=f"show_{product_id}"),
-            InlineKeyboardButton(text="➕", callback_data=f"inc_{product_id}")
-        ]
-    ]
-    if quantity > 0:
-        keyboard.append([InlineKeyboardButton(text="🛒 Buyurtma Qilish", callback_data=f"order_{product_id}")])
-    
-    reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+    caption, reply_markup = render_product_card(product_id, product, quantity)
     
     try:
         if product.get('image'):
@@ -663,7 +585,6 @@ async def send_product_card(bot: Bot, user_id: int, product_id: str, product: di
                 parse_mode='Markdown',
                 reply_markup=reply_markup
             )
-        remember_product_message_id(user_id, product_id, msg.message_id)
     except Exception:
         msg = await bot.send_message(
             chat_id=user_id,
@@ -671,64 +592,200 @@ async def send_product_card(bot: Bot, user_id: int, product_id: str, product: di
             parse_mode='Markdown',
             reply_markup=reply_markup
         )
-        remember_product_message_id(user_id, product_id, msg.message_id)
+    mark_shown(user_id, msg.message_id, card_key(product_id, quantity))
+    return msg.message_id
+
+async def send_catalog(bot: Bot, user_id: int, products: dict, page: int = 0) -> int:
+    user_data = get_user_data(user_id) or {}
+    key, text, reply_markup, page = render_catalog_page(products, user_data.get('cart', {}), page)
+    msg = await bot.send_message(chat_id=user_id, text=text, parse_mode='Markdown', reply_markup=reply_markup)
+    mark_shown(user_id, msg.message_id, key)
+    return msg.message_id
+
+async def update_catalog_message(bot: Bot, chat_id: int, message_id: int, page: int):
+    """Katalog xabarini joyida tahrirlaydi (o'zgarmagan bo'lsa so'rov yuborilmaydi)."""
+    user_data = get_user_data(chat_id) or {}
+    key, text, reply_markup, page = render_catalog_page(load_products(), user_data.get('cart', {}), page)
+    if is_shown(chat_id, message_id, key):
+        return
+    try:
+        await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text, parse_mode='Markdown', reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if 'message is not modified' not in str(e):
+            print(f"XATO: Katalog xabarini yangilab bo'lmadi: {e}")
+            return
+    mark_shown(chat_id, message_id, key)
+
+# Kutilayotgan savatcha yangilanishlari: (user_id, product_id) -> {'message', 'shown', 'page', 'task'}
+# Katalog rejimida kalit (user_id, None): bir sahifadagi barcha bosishlar bitta tahrirga birlashadi
+_cart_pending = {}
+
+def change_cart_quantity(user_data: dict, product_id: str, delta: int) -> int:
+    """Savatchadagi miqdorni xotirada o'zgartiradi (diskka yozilmaydi). Yangi miqdorni qaytaradi."""
+    cart = user_data.setdefault('cart', {})
+    quantity = max(0, cart.get(product_id, 0) + delta)
+    if quantity > 0:
+        cart[product_id] = quantity
+    else:
+        cart.pop(product_id, None)
+    return quantity
+
+def _cart_pending_key(user_id: int, product_id: str, page: int | None):
+    return (user_id, product_id) if page is None else (user_id, None)
+
+def schedule_cart_update(message: Message, user_id: int, product_id: str, shown_quantity: int, page: int | None = None):
+    """Tez-tez bosishlarni birlashtiradi: oxirgi bosishdan CART_DEBOUNCE o'tgach bitta yozuv va bitta tahrir."""
+    key = _cart_pending_key(user_id, product_id, page)
+    entry = _cart_pending.get(key)
+    if entry is None:
+        entry = {'message': message, 'shown': shown_quantity, 'page': page, 'task': None}
+        _cart_pending[key] = entry
+    else:
+        entry['message'] = message
+        entry['page'] = page
+        entry['task'].cancel()
+    entry['task'] = asyncio.create_task(_apply_cart_update(key))
+
+async def _apply_cart_update(key):
+    await asyncio.sleep(CART_DEBOUNCE)
+    entry = _cart_pending.pop(key)
+    user_id, product_id = key
 
-@router.callback_query(F.data.startswith("inc_"))
-async def handle_increase(callback: CallbackQuery, state: FSMContext):
-    await callback.answer()
-    user_id = callback.from_user.id
-    product_id = callback.data.replace("inc_", "")
-    
     user_data = get_user_data(user_id)
     if not user_data:
-        await callback.message.answer("❌ Xatolik! /start dan boshlang.")
         return
-    
-    if 'cart' not in user_data:
-        user_data['cart'] = {}
-    
-    user_data['cart'][product_id] = user_data['cart'].get(product_id, 0) + 1
     save_user_data(user_id, user_data)
-    
-    products = load_products()
-    product = products.get(product_id)
+
+    message = entry['message']
+    if entry['page'] is not None:
+        await update_catalog_message(message.bot, message.chat.id, message.message_id, entry['page'])
+        return
+
+    quantity = user_data.get('cart', {}).get(product_id, 0)
+    if quantity == entry['shown']:
+        # Masalan ➕ keyin ➖: kartochka o'zgarmagan, tahrir shart emas
+        return
+    product = load_products().get(product_id)
     if product:
-        await update_product_card(callback.message, product_id, product, user_data['cart'][product_id])
+        await update_product_card(message, product_id, product, quantity)
 
-@router.callback_query(F.data.startswith("dec_"))
-async def handle_decrease(callback: CallbackQuery, state: FSMContext):
+async def _handle_cart_tap(callback: CallbackQuery, product_id: str, delta: int, page: int | None = None):
     await callback.answer()
     user_id = callback.from_user.id
-    product_id = callback.data.replace("dec_", "")
-    
+
     user_data = get_user_data(user_id)
     if not user_data:
         await callback.message.answer("❌ Xatolik! /start dan boshlang.")
         return
-    
-    if 'cart' not in user_data:
-        user_data['cart'] = {}
-    
-    if user_data['cart'].get(product_id, 0) > 0:
-        user_data['cart'][product_id] -= 1
-        if user_data['cart'][product_id] == 0:
-            del user_data['cart'][product_id]
-        save_user_data(user_id, user_data)
-    
-    products = load_products()
-    product = products.get(product_id)
-    if product:
-        await update_product_card(callback.message, product_id, product, user_data['cart'].get(product_id, 0))
+
+    shown_quantity = user_data.get('cart', {}).get(product_id, 0)
+    changed = change_cart_quantity(user_data, product_id, delta) != shown_quantity
+    if changed or _cart_pending_key(user_id, product_id, page) in _cart_pending:
+        schedule_cart_update(callback.message, user_id, product_id, shown_quantity, page)
+
+@router.callback_query(F.data.startswith("inc_"))
+async def handle_increase(callback: CallbackQuery, state: FSMContext):
+    await _handle_cart_tap(callback, callback.data.replace("inc_", ""), 1)
+
+@router.callback_query(F.data.startswith("dec_"))
+async def handle_decrease(callback: CallbackQuery, state: FSMContext):
+    await _handle_cart_tap(callback, callback.data.replace("dec_", ""), -1)
+
+# ============================================================================
+# SAHIFALANGAN KATALOG (CATALOG_MODE=paged)
+# ============================================================================
+
+def _parse_catalog_tap(data: str, prefix: str):
+    product_id, page = data.replace(prefix, "", 1).rsplit("_", 1)
+    return product_id, int(page)
+
+@router.callback_query(F.data.startswith("cat_inc_"))
+async def handle_catalog_increase(callback: CallbackQuery, state: FSMContext):
+    product_id, page = _parse_catalog_tap(callback.data, "cat_inc_")
+    await _handle_cart_tap(callback, product_id, 1, page)
+
+@router.callback_query(F.data.startswith("cat_dec_"))
+async def handle_catalog_decrease(callback: CallbackQuery, state: FSMContext):
+    product_id, page = _parse_catalog_tap(callback.data, "cat_dec_")
+    await _handle_cart_tap(callback, product_id, -1, page)
+
+@router.callback_query(F.data.startswith("cat_page_"))
+async def handle_catalog_page(callback: CallbackQuery, state: FSMContext):
+    await callback.answer()
+    page = int(callback.data.replace("cat_page_", ""))
+    await state.update_data(catalog_message_id=callback.message.message_id, catalog_page=page)
+
+    pending = _cart_pending.get((callback.from_user.id, None))
+    if pending is not None:
+        # Kutilayotgan tahrir bor: u yangi sahifani chizadi
+        pending['page'] = page
+        return
+    await update_catalog_message(callback.bot, callback.message.chat.id, callback.message.message_id, page)
+
+@router.callback_query(F.data == "cat_noop")
+async def handle_catalog_noop(callback: CallbackQuery):
+    await callback.answer()
 
 # ============================================================================
 # BUYURTMA JARAYONI - ASOSIY QISMI (O'ZGARTIRILGAN)
 # ============================================================================
 
+def cart_line_items(cart: dict, products: dict, cap_choices: dict) -> list:
+    """Savatchadagi mahsulotlardan buyurtma qatorlarini tuzadi (o'chirilgan mahsulotlar tashlab ketiladi)."""
+    items = []
+    for product_id, quantity in cart.items():
+        product = products.get(product_id)
+        if not product or quantity <= 0:
+            continue
+        with_cap = None
+        if 'price_with_cap' in product and 'price_without_cap' in product:
+            with_cap = cap_choices.get(product_id, True)
+            price = product['price_with_cap'] if with_cap else product['price_without_cap']
+        else:
+            price = product['price']
+        items.append({
+            'product_id': product_id,
+            'product_name': product['name'],
+            'price': price,
+            'quantity': quantity,
+            'total': price * quantity,
+            'with_cap': with_cap
+        })
+    return items
+
+def cap_label(item: dict) -> str:
+    if item.get('with_cap') is None:
+        return ""
+    return "bachok bilan" if item['with_cap'] else "bachoksiz"
+
+async def ask_next_cap_or_location(message: Message, state: FSMContext):
+    """Bachok turi so'ralmagan mahsulot qolsa uni so'raydi, aks holda manzilga o'tadi."""
+    data = await state.get_data()
+    products = load_products()
+    cap_choices = data.get('cap_choices', {})
+    for item in data.get('pending_order_items', []):
+        product = products.get(item['product_id'])
+        if product and 'price_with_cap' in product and 'price_without_cap' in product and item['product_id'] not in cap_choices:
+            await message.answer(
+                f"💧 *{product['name']}: suv turini tanlang:*",
+                parse_mode='Markdown',
+                reply_markup=cap_type_keyboard(item['product_id'])
+            )
+            await state.set_state(OrderStates.choose_cap_type)
+            return
+    
+    await message.answer(
+        "📍 *Yetkazib berish manzilini tanlang:*",
+        parse_mode='Markdown',
+        reply_markup=location_choice_keyboard()
+    )
+    await state.set_state(OrderStates.waiting_location_choice)
+
 @router.callback_query(F.data.startswith("order_"))
 async def handle_order_request(callback: CallbackQuery, state: FSMContext):
+    """Butun savatchani bitta buyurtma sifatida rasmiylashtiradi (order_cart yoki order_<product_id>)."""
     await callback.answer()
     user_id = callback.from_user.id
-    product_id = callback.data.replace("order_", "")
     
     user_data = get_user_data(user_id)
     if not user_data:
@@ -736,50 +793,33 @@ async def handle_order_request(callback: CallbackQuery, state: FSMContext):
         return
     
     products = load_products()
-    product = products.get(product_id)
-    quantity = user_data.get('cart', {}).get(product_id, 0)
+    pending_items = [
+        {'product_id': product_id, 'quantity': quantity}
+        for product_id, quantity in user_data.get('cart', {}).items()
+        if product_id in products and quantity > 0
+    ]
+    if not pending_items:
+        await callback.message.answer("🛒 Savatchangiz bo'sh.")
+        return
     
-    if product and quantity > 0:
-        if 'price_with_cap' in product and 'price_without_cap' in product:
-            await state.update_data(pending_order_product_id=product_id, pending_order_quantity=quantity)
-            await callback.message.answer(
-                "💧 *Suv turini tanlang:*",
-                parse_mode='Markdown',
-                reply_markup=cap_type_keyboard(product_id)
-            )
-            await state.set_state(OrderStates.choose_cap_type)
-        else:
-            await state.update_data(pending_order_product_id=product_id, pending_order_quantity=quantity)
-            await callback.message.answer(
-                "📍 *Yetkazib berish manzilini tanlang:*",
-                parse_mode='Markdown',
-                reply_markup=location_choice_keyboard()
-            )
-            await state.set_state(OrderStates.waiting_location_choice)
+    await state.update_data(pending_order_items=pending_items, cap_choices={})
+    await ask_next_cap_or_location(callback.message, state)
 
 @router.callback_query(F.data.startswith("with_cap_"))
 async def handle_with_cap(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     product_id = callback.data.replace("with_cap_", "")
-    await state.update_data(with_cap=True)
-    await callback.message.answer(
-        "📍 *Yetkazib berish manzilini tanlang:*",
-        parse_mode='Markdown',
-        reply_markup=location_choice_keyboard()
-    )
-    await state.set_state(OrderStates.waiting_location_choice)
+    data = await state.get_data()
+    await state.update_data(cap_choices={**data.get('cap_choices', {}), product_id: True})
+    await ask_next_cap_or_location(callback.message, state)
 
 @router.callback_query(F.data.startswith("without_cap_"))
 async def handle_without_cap(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     product_id = callback.data.replace("without_cap_", "")
-    await state.update_data(with_cap=False)
-    await callback.message.answer(
-        "📍 *Yetkazib berish manzilini tanlang:*",
-        parse_mode='Markdown',
-        reply_markup=location_choice_keyboard()
-    )
-    await state.set_state(OrderStates.waiting_location_choice)
+    data = await state.get_data()
+    await state.update_data(cap_choices={**data.get('cap_choices', {}), product_id: False})
+    await ask_next_cap_or_location(callback.message, state)
 
 # O'ZGARTIRILGAN: "🏠 Mening uyimga" tugmasi bosilganda
 @router.message(StateFilter(OrderStates.waiting_location_choice), F.text == "🏠 Mening uyimga")
@@ -909,6 +949,10 @@ async def handle_location_confirmed(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     await confirm_order_details(callback, state)
 
+def pending_order_lines(data: dict) -> list:
+    cart = {item['product_id']: item['quantity'] for item in data.get('pending_order_items', [])}
+    return cart_line_items(cart, load_products(), data.get('cap_choices', {}))
+
 async def confirm_order_details(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     data = await state.get_data()
@@ -918,24 +962,11 @@ async def confirm_order_details(callback: CallbackQuery, state: FSMContext):
         await callback.message.answer("❌ Xatolik! /start dan boshlang.")
         return
     
-    product_id = data['pending_order_product_id']
-    quantity = data['pending_order_quantity']
-    
-    products = load_products()
-    product = products.get(product_id)
-    
-    if 'price_with_cap' in product and 'price_without_cap' in product:
-        if data.get('with_cap', True):
-            price = product['price_with_cap']
-            cap_text = "bachok bilan"
-        else:
-            price = product['price_without_cap']
-            cap_text = "bachoksiz"
-    else:
-        price = product['price']
-        cap_text = ""
-    
-    total = price * quantity
+    items = pending_order_lines(data)
+    if not items:
+        await callback.message.answer("❌ Xatolik! Savatchadagi mahsulotlar topilmadi.")
+        return
+    total = sum(item['total'] for item in items)
     
     keyboard = [
         [
@@ -945,11 +976,14 @@ async def confirm_order_details(callback: CallbackQuery, state: FSMContext):
     ]
     reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
     
+    lines_text = ""
+    for i, item in enumerate(items, 1):
+        cap_text = f" ({cap_label(item)})" if cap_label(item) else ""
+        lines_text += f"{i}. {item['product_name']}{cap_text}: {item['quantity']} ta x {item['price']:,} = {item['total']:,} so'm\n"
+    
     order_text = (
         f"📋 *BUYURTMA TAFSILOTLARI*\n\n"
-        f"🛍 Mahsulot: {product['name']}\n"
-        f"📊 Soni: {quantity} ta\n"
-        f"💰 Bir dona narxi: {price:,} so'm ({cap_text})\n"
+        f"🛍 Mahsulotlar:\n{lines_text}\n"
         f"💵 Jami summa: *{total:,} so'm*\n\n"
         f"📍 Manzil: {data['order_location_text']}\n"
         f"⏰ Yetkazish vaqti: {data['order_delivery_time']}\n"
@@ -963,6 +997,28 @@ async def confirm_order_details(callback: CallbackQuery, state: FSMContext):
         reply_markup=reply_markup
     )
 
+_notify_tasks = set()   # tugallanmagan yangi buyurtma xabarnomalari (GC yig'ib olmasligi uchun)
+
+
+async def _notify_new_order(bot: Bot, user_id, user_data: dict, order: dict):
+    await send_to_admin(bot, user_id, user_data, order)
+    # Sessiyasi faol kuryerlarga darhol yuboriladi yoki AUTO_DISPATCH da bittasiga taklif qilinadi
+    await dispatch_order(bot, user_id, order)
+
+
+def _notify_done(task: asyncio.Task):
+    _notify_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"XATO: Yangi buyurtma haqida admin/kuryerlarga xabar berib bo'lmadi: {task.exception()!r}")
+
+
+def start_new_order_notify(bot: Bot, user_id, user_data: dict, order: dict) -> asyncio.Task:
+    task = asyncio.create_task(_notify_new_order(bot, user_id, user_data, order))
+    _notify_tasks.add(task)
+    task.add_done_callback(_notify_done)
+    return task
+
+
 @router.callback_query(F.data == "confirm_order")
 async def handle_confirm_order(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
@@ -974,45 +1030,34 @@ async def handle_confirm_order(callback: CallbackQuery, state: FSMContext):
         await callback.message.answer("❌ Xatolik! /start dan boshlang.")
         return
     
-    product_id = data['pending_order_product_id']
-    products = load_products()
-    product = products.get(product_id)
-    
-    if 'price_with_cap' in product and 'price_without_cap' in product:
-        if data.get('with_cap', True):
-            price = product['price_with_cap']
-        else:
-            price = product['price_without_cap']
-    else:
-        price = product['price']
+    items = pending_order_lines(data)
+    if not items:
+        await callback.message.answer("❌ Xatolik! Savatchadagi mahsulotlar topilmadi.")
+        return
     
     order = {
-        'order_id': datetime.now().strftime('%Y%m%d%H%M%S'),
-        'product_id': product_id,
-        'product_name': product['name'],
-        'price': price,
-        'quantity': data['pending_order_quantity'],
-        'total': price * data['pending_order_quantity'],
-        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'order_id': allocate_id('order'),
+        'items': items,
+        'total': sum(item['total'] for item in items),
+        **event_fields('created'),
         'status': 'pending',
         'rated': False,
         'location_geo': data['order_location_geo'],
         'location_text': data['order_location_text'],
         'delivery_time': data['order_delivery_time'],
-        'comment': data.get('order_comment', ''),
-        'with_cap': data.get('with_cap', True)
+        'comment': data.get('order_comment', '')
     }
     
-    if 'orders' not in user_data:
-        user_data['orders'] = []
-    user_data['orders'].append(order)
-    
-    if product_id in user_data['cart']:
-        del user_data['cart'][product_id]
+    for item in items:
+        user_data['cart'].pop(item['product_id'], None)
     
     save_user_data(user_id, user_data)
+    add_order(user_id, order)
+    await state.update_data(pending_order_items=[], cap_choices={})
     
-    await send_to_admin(callback.bot, user_id, user_data, product, order)
+    # Admin guruhi va kuryerlarga xabar fon vazifasida: mijoz javobi ularning tezlik
+    # cheklovlarini (guruh: 20 xabar/daqiqa) kutib qolmaydi
+    start_new_order_notify(callback.bot, user_id, user_data, order)
     
     await callback.message.edit_text(
         "✅ *Buyurtma qabul qilindi!*\n\n"
@@ -1033,10 +1078,11 @@ async def handle_confirm_order(callback: CallbackQuery, state: FSMContext):
         reply_markup=delivery_keyboard
     )
     
-    try:
-        await clear_product_buttons_for_user(callback.bot, user_id, product_id)
-    except Exception:
-        pass
+    for item in items:
+        try:
+            await clear_product_buttons_for_user(callback.bot, user_id, item['product_id'], state)
+        except Exception:
+            pass
     
     await callback.message.answer(
         "📱 Asosiy menyu:",
@@ -1073,17 +1119,16 @@ async def handle_rating(callback: CallbackQuery, state: FSMContext):
         'name': user_data.get('name', 'Nomalum'),
         'order_id': order_id,
         'rating': rating,
-        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        'date': now_str()
     }
     save_rating(rating_data)
     
-    if user_data and 'orders' in user_data:
-        for order in user_data['orders']:
-            if order['order_id'] == order_id:
-                order['rated'] = True
-                order['rating'] = rating
-                break
-        save_user_data(user_id, user_data)
+    owner_id, order = get_order(order_id)
+    if order is not None and owner_id == str(user_id):
+        order['rated'] = True
+        order['rating'] = rating
+        stamp(order, 'rated')
+        save_order(user_id, order)
     
     stars = "⭐️" * rating
     try:
@@ -1138,44 +1183,33 @@ async def handle_location_change(callback: CallbackQuery, state: FSMContext):
     await state.set_state(MainMenuStates.main_menu)
 
 async def update_product_card(message: Message, product_id: str, product: dict, quantity: int):
-    if 'price_with_cap' in product and 'price_without_cap' in product:
-        price_text = f"💰 Narx: {product['price_with_cap']:,} so'm (bachok bilan)\n       {product['price_without_cap']:,} so'm (bachoksiz)"
-    else:
-        price_text = f"💰 Narx: {product.get('price', 0):,} so'm"
-    
-    caption = (
-        f"*{product['name']}*\n\n"
-        f"📝 {product['description']}\n"
-        f"{price_text}\n"
-        f"📊 Savatchada: {quantity} ta"
-    )
-    
-    keyboard = [
-        [
-            InlineKeyboardButton(text="➖", callback_data=f"dec_{product_id}"),
-            InlineKeyboardButton(text=f"📦 {quantity}", callback_data=f"show_{product_id}"),
-            InlineKeyboardButton(text="➕", callback_data=f"inc_{product_id}")
-        ]
-    ]
-    if quantity > 0:
-        keyboard.append([InlineKeyboardButton(text="🛒 Buyurtma Qilish", callback_data=f"order_{product_id}")])
-    
-    reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+    if is_shown(message.chat.id, message.message_id, card_key(product_id, quantity)):
+        # Kartochka o'zgarmagan: Telegramga so'rov yubormaymiz
+        return
+    caption, reply_markup = render_product_card(product_id, product, quantity)
     
-    try:
-        await message.edit_caption(caption=caption, parse_mode='Markdown', reply_markup=reply_markup)
-    except Exception:
+    for edit in (message.edit_caption, message.edit_text):
+        kwargs = {'caption': caption} if edit == message.edit_caption else {'text': caption}
         try:
-            await message.edit_text(text=caption, parse_mode='Markdown', reply_markup=reply_markup)
+            await edit(parse_mode='Markdown', reply_markup=reply_markup, **kwargs)
+        except TelegramBadRequest as e:
+            if 'message is not modified' not in str(e):
+                continue
         except Exception:
-            pass
+            continue
+        mark_shown(message.chat.id, message.message_id, card_key(product_id, quantity))
+        return
 
-async def send_to_admin(bot: Bot, user_id: int, user_data: dict, product: dict, order: dict):
+async def send_to_admin(bot: Bot, user_id: int, user_data: dict, order: dict):
     lat = order['location_geo']['latitude']
     lon = order['location_geo']['longitude']
     google_link, yandex_link = create_location_links(lat, lon)
     
-    cap_text = "Bachok bilan" if order.get('with_cap', True) else "Bachoksiz"
+    items = order_items(order)
+    lines_text = ""
+    for i, item in enumerate(items, 1):
+        cap_text = f" ({cap_label(item)})" if cap_label(item) else ""
+        lines_text += f"{i}. {item['product_name']}{cap_text}: {item['quantity']} ta x {item['price']:,} so'm\n"
     
     admin_message = (
         f"🔔 *YANGI BUYURTMA!*\n\n"
@@ -1186,9 +1220,7 @@ async def send_to_admin(bot: Bot, user_id: int, user_data: dict, product: dict,
         f"📍 Koordinatalar: {lat:.6f}, {lon:.6f}\n"
         f"📝 Manzil: {order['location_text']}\n\n"
         f"🛍 *BUYURTMA TAFSILOTLARI:*\n"
-        f"Mahsulot: {product['name']}\n"
-        f"📊 Soni: {order['quantity']} ta\n"
-        f"💰 Narx: {order['price']:,} so'm ({cap_text})\n"
+        f"{lines_text}"
         f"💵 Jami summa: *{order['total']:,} so'm*\n"
         f"⏰ Yetkazish vaqti: {order['delivery_time']}\n"
         f"💭 Izoh: {order['comment']}\n"
@@ -1198,15 +1230,19 @@ async def send_to_admin(bot: Bot, user_id: int, user_data: dict, product: dict,
         f"Yandex Maps: {yandex_link}"
     )
     
+    # Bitta mahsulotli buyurtmada avvalgidek mahsulot rasmi bilan yuboriladi
+    product = load_products().get(items[0]['product_id']) if len(items) == 1 else None
+    
     location_keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text="🗺 Google Maps ochish", url=google_link)],
-            [InlineKeyboardButton(text="🗺 Yandex Maps ochish", url=yandex_link)]
+            [InlineKeyboardButton(text="🗺 Yandex Maps ochish", url=yandex_link)],
+            [InlineKeyboardButton(text="🚫 Buyurtmani bekor qilish", callback_data=f"admin_cancel_{user_id}_{order['order_id']}")]
         ]
     )
     
     try:
-        if product.get('image'):
+        if product and product.get('image'):
             await bot.send_photo(
                 chat_id=ADMIN_ID,
                 photo=product['image'],
@@ -1228,6 +1264,13 @@ async def send_to_admin(bot: Bot, user_id: int, user_data: dict, product: dict,
 # BUYURTMALAR BO'LIMI
 # ============================================================================
 
+ORDER_STATUS_LABELS = {
+    'pending': ("⏳", "Kutilmoqda"),
+    'on_delivery': ("🛵", "Yo'lda"),
+    'delivered': ("✅", "Yetkazildi"),
+    'cancelled': ("🚫", "Bekor qilingan"),
+}
+
 @router.message(StateFilter(MainMenuStates.main_menu), F.text == "📦 Buyurtmalarim")
 async def show_orders(message: Message, state: FSMContext):
     user_id = message.from_user.id
@@ -1242,13 +1285,15 @@ async def show_orders(message: Message, state: FSMContext):
     else:
         text = "📦 *Sizning buyurtmalaringiz:*\n\n"
         for i, order in enumerate(reversed(user_data['orders']), 1):
-            emoji = "⏳" if order.get('status') == 'pending' else "✅"
-            status = "Kutilmoqda" if order.get('status') == 'pending' else "Yetkazildi"
-            cap_text = " (bachok bilan)" if order.get('with_cap', True) else " (bachoksiz)"
+            emoji, status = ORDER_STATUS_LABELS.get(order.get('status'), ("✅", "Yetkazildi"))
             rating_info = f"⭐️ Baho: {'⭐️' * order.get('rating', 0)}" if order.get('rated') else ""
+            items_text = ""
+            for item in order_items(order):
+                cap_text = f" ({cap_label(item)})" if cap_label(item) else ""
+                items_text += f"   🛍 *{item['product_name']}{cap_text}*: {item['quantity']} ta\n"
             text += (
-                f"{i}. {emoji} *{order['product_name']}{cap_text}*\n"
-                f"   📊 Soni: {order['quantity']} ta\n"
+                f"{i}. {emoji} Buyurtma #{order.get('order_id')}\n"
+                f"{items_text}"
                 f"   💰 Jami: {order['total']:,} so'm\n"
                 f"   📅 {order['date']}\n"
                 f"   📌 {status}\n"
@@ -1256,9 +1301,41 @@ async def show_orders(message: Message, state: FSMContext):
             )
         
         await message.answer(text, parse_mode='Markdown', reply_markup=back_keyboard())
+        
+        # Kuryer hali qabul qilmagan buyurtmalarni mijoz o'zi bekor qilishi mumkin
+        pending = [order for order in user_data['orders'] if order.get('status') == 'pending']
+        if pending:
+            keyboard = [
+                [InlineKeyboardButton(text=f"❌ #{order.get('order_id')} ni bekor qilish", callback_data=f"cancel_my_order_{order.get('order_id')}")]
+                for order in pending
+            ]
+            await message.answer(
+                "⏳ Kutilayotgan buyurtmani bekor qilish:",
+                reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard)
+            )
     
     await state.set_state(MainMenuStates.orders_menu)
 
+@router.callback_query(F.data.startswith("cancel_my_order_"))
+async def handle_cancel_my_order(callback: CallbackQuery, bot: Bot):
+    order_id = callback.data.replace("cancel_my_order_", "")
+    # Faqat pending: kuryer bir vaqtda qabul qilsa, compare-and-set bittasini yutdiradi
+    user_id, order, _ = cancel_order(
+        order_id, statuses=('pending',), owner_id=callback.from_user.id,
+        updates={**event_fields('cancelled'), 'cancelled_by': 'client'}
+    )
+    if order is None:
+        await callback.answer("Buyurtmani bekor qilib bo'lmaydi: kuryer allaqachon qabul qilgan.", show_alert=True)
+        return
+    
+    await callback.answer("Bekor qilindi.")
+    await callback.message.edit_text(f"🚫 Buyurtma #{order_id} bekor qilindi.")
+    await on_order_cancelled(bot, order)
+    try:
+        await bot.send_message(ADMIN_ID, f"🚫 Mijoz {user_id} buyurtma #{order_id} ni bekor qildi.")
+    except Exception as e:
+        print(f"Admin ga yuborishda xatolik: {e}")
+
 @router.message(StateFilter(MainMenuStates.orders_menu), F.text == "⬅️ Ortga")
 async def back_from_orders(message: Message, state: FSMContext):
     await message.answer("📱 Asosiy menyu:", reply_markup=main_menu_keyboard())
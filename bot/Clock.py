@@ -0,0 +1,108 @@
+# bot/Clock.py (Yagona vaqt manbai: O'zbekiston vaqti va epoch maydonlari)
+#
+# Buyurtma hodisalari (yaratildi, olindi, yetkazildi, baholandi) butun sonli epoch
+# sekundlarda '<hodisa>_ts' maydonlariga yoziladi. Ko'rsatish uchun eski satr maydonlari
+# ('date', 'accepted_at', 'delivered_at', 'rated_at') ham saqlanadi, lekin saralash va
+# oraliq filtrlari faqat butun sonlarni solishtiradi. Server qaysi mintaqada bo'lmasin,
+# barcha satrlar UZB_TZ (UTC+5) bo'yicha chiqadi.
+#
+# Eski yozuvlar: Client.py 'date' ni datetime.now() bilan (server mahalliy vaqti) yozgan,
+# Kuryer.py esa 'accepted_at'/'delivered_at' ni get_uzb_now() bilan (UTC+5). Shuning uchun
+# '_ts' maydoni yo'q eski 'date' satrlari LEGACY_DATE_TZ bo'yicha o'qiladi.
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# ----------------- Sozlamalar -----------------
+UZB_TZ = timezone(timedelta(hours=int(os.getenv("BOT_TZ_OFFSET", "5"))))
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Eski 'date' satrlari yozilgan mintaqa: BOT_LEGACY_TZ_OFFSET (soat) yoki shu serverning vaqti
+_legacy_offset = os.getenv("BOT_LEGACY_TZ_OFFSET")
+LEGACY_DATE_TZ = (timezone(timedelta(hours=float(_legacy_offset))) if _legacy_offset
+                  else datetime.now().astimezone().tzinfo)
+
+# hodisa -> (epoch maydoni, satr maydoni)
+ORDER_EVENTS = {
+    'created': ('created_ts', 'date'),
+    'accepted': ('accepted_ts', 'accepted_at'),
+    'delivered': ('delivered_ts', 'delivered_at'),
+    'cancelled': ('cancelled_ts', 'cancelled_at'),
+    'rated': ('rated_ts', 'rated_at'),
+}
+
+
+def now_ts() -> int:
+    return int(time.time())
+
+
+def now_local() -> datetime:
+    """O'zbekiston vaqti (timezone bilan)."""
+    return datetime.now(UZB_TZ)
+
+
+def format_ts(ts: int, fmt: str = DATE_FORMAT) -> str:
+    return datetime.fromtimestamp(ts, UZB_TZ).strftime(fmt)
+
+
+def now_str(fmt: str = DATE_FORMAT) -> str:
+    return now_local().strftime(fmt)
+
+
+def parse_local(text: str, fmt: str = DATE_FORMAT, tz=UZB_TZ):
+    """tz (standart: UZB) vaqtidagi satrni epoch ga aylantiradi; noto'g'ri bo'lsa None."""
+    try:
+        return int(datetime.strptime(text, fmt).replace(tzinfo=tz).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def day_of(ts: int) -> str:
+    """Epoch qaysi kunga (YYYY-MM-DD, UZB vaqti) tushadi."""
+    return format_ts(ts, "%Y-%m-%d")
+
+# --------------------------------------------------------------------------------------
+# Buyurtma hodisalari
+# --------------------------------------------------------------------------------------
+
+def event_fields(event: str, ts: int = None) -> dict:
+    """transition_order(updates=...) uchun: {'<hodisa>_ts': ts, '<satr>': ...}."""
+    ts = now_ts() if ts is None else ts
+    ts_field, text_field = ORDER_EVENTS[event]
+    return {ts_field: ts, text_field: format_ts(ts)}
+
+
+def stamp(order: dict, event: str, ts: int = None) -> dict:
+    order.update(event_fields(event, ts))
+    return order
+
+
+def legacy_ts(order: dict, event: str, date_tz=None):
+    """Eski satr maydonidan epoch: 'date' date_tz (standart LEGACY_DATE_TZ), qolganlari UZB vaqtida."""
+    _, text_field = ORDER_EVENTS[event]
+    tz = (date_tz or LEGACY_DATE_TZ) if event == 'created' else UZB_TZ
+    return parse_local(order.get(text_field), tz=tz)
+
+
+def order_ts(order: dict, event: str):
+    """Hodisa vaqti (epoch). Eski yozuvlarda satrdan bir marta o'qilib, yozuvning o'zida saqlanadi."""
+    ts_field, _ = ORDER_EVENTS[event]
+    ts = order.get(ts_field)
+    if ts is None:
+        ts = legacy_ts(order, event)
+        if ts is not None:
+            order[ts_field] = ts
+    return ts
+
+
+def backfill_order(order: dict, date_tz=None) -> bool:
+    """Satr maydonlaridan yetishmayotgan '_ts' maydonlarini to'ldiradi. O'zgargan bo'lsa True."""
+    changed = False
+    for event, (ts_field, _) in ORDER_EVENTS.items():
+        if order.get(ts_field) is None:
+            ts = legacy_ts(order, event, date_tz)
+            if ts is not None:
+                order[ts_field] = ts
+                changed = True
+    return changed
@@ -0,0 +1,148 @@
+# bot/Dispatch.py (Yangi buyurtmalarni kuryerlarga darhol yuborish)
+#
+# Mijoz buyurtmani tasdiqlaganda push_new_order() uni sessiyasi faol bo'lgan barcha
+# kuryerlarga yuboradi va har bir nusxaning message_id sini eslab qoladi. Kuryerlardan
+# biri "✅ Buyurtmani olish" ni bosganda mark_order_taken() qolgan nusxalarni
+# "olingan" deb tahrirlaydi. Kuryer ro'yxati (📦 Buyurtmalar) ham shu formatni ishlatadi.
+
+import os
+import time
+import asyncio
+
+from aiogram import Bot, types
+from aiogram.utils.markdown import html_decoration as hd
+
+from Storage import get_user_data, load_couriers, load_courier_sessions, save_courier_sessions, order_items
+from Geo import point_of
+from Clock import order_ts, now_ts
+
+# ----------------- Sozlamalar -----------------
+COURIER_RADIUS_KM = float(os.getenv("COURIER_RADIUS_KM", "10"))
+COURIER_LOCATION_TTL = float(os.getenv("COURIER_LOCATION_TTL", str(3 * 3600)))  # 3 soat
+
+# Yuborilgan nusxalar: order_id -> {courier_id: message_id} (faqat xotirada)
+_pushed = {}
+
+# --------------------------------------------------------------------------------------
+# Kuryer joylashuvi (sessiyada saqlanadi)
+# --------------------------------------------------------------------------------------
+
+def save_courier_location(courier_id, latitude: float, longitude: float):
+    sessions = load_courier_sessions()
+    session = sessions.get(str(courier_id))
+    if session is None:
+        return False
+    session['location'] = {'latitude': latitude, 'longitude': longitude}
+    session['location_at'] = time.time()
+    save_courier_sessions(sessions)
+    return True
+
+
+def courier_location(courier_id):
+    """Kuryerning COURIER_LOCATION_TTL dan eski bo'lmagan joylashuvi (lat, lon) yoki None."""
+    session = load_courier_sessions().get(str(courier_id)) or {}
+    if time.time() - session.get('location_at', 0) > COURIER_LOCATION_TTL:
+        return None
+    return point_of(session.get('location'))
+
+# --------------------------------------------------------------------------------------
+# Buyurtma ko'rinishi
+# --------------------------------------------------------------------------------------
+
+def courier_order_view(user_id_str: str, order: dict) -> dict:
+    """Kuryerga ko'rsatiladigan buyurtma ma'lumotlari (aggregate_pending_orders formati)."""
+    user_data = get_user_data(user_id_str) or {}
+    timestamp = order_ts(order, 'created') or now_ts()
+
+    return {
+        'order_id': order.get('order_id'),
+        'user_id': user_id_str,
+        'phone_number': user_data.get('phone', '---'),
+        'location': order.get('location_geo') or user_data.get('location', {}),
+        'date': order.get('date'),
+        'total_amount': order.get('total'),
+        'items': ", ".join(f"{item['product_name']} ({item['quantity']}x)" for item in order_items(order)),
+        'status': order.get('status', 'pending'),
+        'timestamp': timestamp
+    }
+
+
+def format_courier_order(order: dict) -> str:
+    lat, lon = order['location'].get('latitude', 0), order['location'].get('longitude', 0)
+    map_link = f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
+    return (
+        f"➖➖➖➖➖➖➖➖➖➖\n"
+        f"🆔 {hd.bold('ID:')} <code>#{order.get('order_id')}</code>\n"
+        f"👤 {hd.bold('Mijoz ID:')} <code>{order.get('user_id')}</code>\n"
+        f"⏰ {hd.bold('Vaqt:')} {order.get('date')}\n"
+        f"📞 {hd.bold('Mijoz Tel:')} {hd.bold(order.get('phone_number'))}\n"
+        f"🗺️ {hd.bold('Manzil:')} <a href='{map_link}'>Xarita</a>\n"
+        f"🛍️ {hd.bold('Mahsulotlar:')} {order.get('items')}\n"
+        f"💰 {hd.bold('Jami:')} {hd.bold(f'{order.get('total_amount', 0):,}')} so'm"
+        + (f"\n📏 {hd.bold('Masofa:')} {order['distance_km']:.1f} km" if order.get('distance_km') is not None else "")
+    )
+
+
+def get_order_inline_keyboard(user_id: str, order_id: str):
+    """Buyurtmani qabul qilish uchun inline keyboard yaratadi."""
+    btn_accept = types.InlineKeyboardButton(
+        text="✅ Buyurtmani olish",
+        callback_data=f"courier_accept_{user_id}_{order_id}"
+    )
+
+    keyboard = [
+        [btn_accept]
+    ]
+    return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+# --------------------------------------------------------------------------------------
+# Push va "olindi" tahriri
+# --------------------------------------------------------------------------------------
+
+def online_courier_ids() -> list:
+    """Sessiyasi bor va admin tomonidan o'chirilmagan kuryerlar."""
+    couriers = load_couriers()
+    return [courier_id for courier_id in load_courier_sessions() if courier_id in couriers]
+
+
+def remember_push(order_id, courier_id, message_id: int):
+    _pushed.setdefault(str(order_id), {})[str(courier_id)] = message_id
+
+
+async def push_new_order(bot: Bot, user_id, order: dict, courier_ids: list = None) -> int:
+    """Yangi buyurtmani kuryerlarga yuboradi. Yuborilganlar sonini qaytaradi."""
+    view = courier_order_view(str(user_id), order)
+    text = "🔔 <b>Yangi buyurtma!</b>\n" + format_courier_order(view)
+    keyboard = get_order_inline_keyboard(str(user_id), order.get('order_id'))
+    if courier_ids is None:
+        courier_ids = online_courier_ids()
+
+    async def send(courier_id):
+        try:
+            msg = await bot.send_message(int(courier_id), text, parse_mode="HTML", reply_markup=keyboard)
+            remember_push(order.get('order_id'), courier_id, msg.message_id)
+            return True
+        except Exception as e:
+            print(f"XATO: Buyurtma #{order.get('order_id')} ni kuryer {courier_id} ga yuborib bo'lmadi: {e}")
+            return False
+
+    results = await asyncio.gather(*(send(courier_id) for courier_id in courier_ids))
+    return sum(results)
+
+
+async def mark_order_taken(bot: Bot, order_id, taken_by, text: str = None):
+    """Buyurtma olinganda boshqa kuryerlardagi nusxalarni tahrirlaydi."""
+    copies = _pushed.pop(str(order_id), {})
+    text = text or f"🔒 Buyurtma #{order_id} boshqa kuryer tomonidan olindi."
+
+    async def edit(courier_id, message_id):
+        try:
+            await bot.edit_message_text(chat_id=int(courier_id), message_id=message_id, text=text)
+        except Exception:
+            # Xabar o'chirilgan yoki allaqachon tahrirlangan
+            pass
+
+    await asyncio.gather(*(
+        edit(courier_id, message_id) for courier_id, message_id in copies.items()
+        if courier_id != str(taken_by)
+    ))
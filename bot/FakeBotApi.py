@@ -0,0 +1,164 @@
+# bot/FakeBotApi.py (Yuklama testlari uchun lokal soxta Telegram Bot API server)
+#
+# aiogram Bot ni TelegramAPIServer.from_base(server.base_url) orqali shu serverga ulash
+# mumkin: getUpdates, sendMessage, sendPhoto, editMessageText/Caption, copyMessage,
+# answerCallbackQuery va boshqa usullarga Telegram formatidagi javob qaytaradi.
+# Har bir javob oldidan latency qo'shiladi, rate_limit_ratio ulushidagi so'rovlar esa
+# 429 (retry_after bilan) qaytaradi (getUpdates, getMe va boshqa ishga tushirish usullaridan tashqari). Tarmoq kerak emas: faqat 127.0.0.1.
+
+import json
+import time
+import random
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {'id': 100000001, 'is_bot': True, 'first_name': "Shukrona Test", 'username': "shukrona_test_bot"}
+
+# Ishga tushirish va polling so'rovlari: ularga sun'iy 429 berilmaydi (aks holda start_polling
+# butun yuklama testini boshlanmasdanoq to'xtatadi)
+RATE_LIMIT_EXEMPT = {'getupdates', 'getme', 'setmycommands', 'deletewebhook', 'setwebhook', 'close', 'logout'}
+
+# Message qaytaradigan usullar (qolganlari True qaytaradi)
+MESSAGE_METHODS = {
+    'sendmessage', 'sendphoto', 'sendvideo', 'senddocument', 'sendlocation', 'sendcontact',
+    'editmessagetext', 'editmessagecaption', 'editmessagereplymarkup', 'editmessagemedia',
+}
+
+
+class FakeBotApi:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_limit_ratio: float = 0.0,
+                 retry_after: int = 1, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+
+        self.calls = Counter()          # usul -> chaqiruvlar soni
+        self.rate_limited = Counter()   # usul -> 429 javoblar soni
+        self.updates = asyncio.Queue()
+        self._update_id = 0
+        self._message_id = 0
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle_method)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # ----------------- Yangilanishlar navbati -----------------
+
+    def next_update_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    def next_message_id(self) -> int:
+        self._message_id += 1
+        return self._message_id
+
+    def push_update(self, update: dict) -> int:
+        """Yangilanishni getUpdates navbatiga qo'yadi; update_id bo'lmasa beriladi."""
+        update.setdefault('update_id', self.next_update_id())
+        self.updates.put_nowait(update)
+        return update['update_id']
+
+    async def _get_updates(self, params: dict) -> list:
+        timeout = float(params.get('timeout') or 0)
+        limit = int(params.get('limit') or 100)
+        batch = []
+        try:
+            batch.append(await asyncio.wait_for(self.updates.get(), timeout=max(timeout, 0.001)))
+        except asyncio.TimeoutError:
+            return []
+        while len(batch) < limit and not self.updates.empty():
+            batch.append(self.updates.get_nowait())
+        return batch
+
+    # ----------------- Javoblar -----------------
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get('chat_id')
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            chat_id = 0
+        message_id = params.get('message_id')
+        message = {
+            'message_id': int(message_id) if message_id else self.next_message_id(),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'supergroup'},
+            'from': BOT_USER,
+        }
+        if params.get('text') is not None:
+            message['text'] = params['text']
+        if params.get('caption') is not None:
+            message['caption'] = params['caption']
+        if params.get('reply_markup'):
+            markup = params['reply_markup']
+            markup = json.loads(markup) if isinstance(markup, str) else markup
+            if 'inline_keyboard' in markup:
+                message['reply_markup'] = markup
+        return message
+
+    def _result(self, method: str, params: dict):
+        if method == 'getupdates':
+            return None   # alohida (asinxron) ishlanadi
+        if method == 'getme':
+            return BOT_USER
+        if method in MESSAGE_METHODS:
+            if params.get('inline_message_id'):
+                return True
+            return self._message(params)
+        if method in ('copymessage', 'forwardmessage'):
+            return {'message_id': self.next_message_id()}
+        if method == 'getchat':
+            return {'id': int(params.get('chat_id', 0)), 'type': 'private'}
+        return True
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method'].lower()
+        params = dict(await request.post())
+        if not params and request.can_read_body:
+            try:
+                params = await request.json()
+            except (json.JSONDecodeError, ValueError):
+                params = {}
+        self.calls[method] += 1
+
+        if method == 'getupdates':
+            return web.json_response({'ok': True, 'result': await self._get_updates(params)})
+
+        if self.latency_ms or self.jitter_ms:
+            await asyncio.sleep(max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+        if self.rate_limit_ratio and method not in RATE_LIMIT_EXEMPT and self.rng.random() < self.rate_limit_ratio:
+            self.rate_limited[method] += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after},
+            })
+        return web.json_response({'ok': True, 'result': self._result(method, params)})
+
+    # ----------------- Ishga tushirish -----------------
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
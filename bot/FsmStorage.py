@@ -0,0 +1,156 @@
+# bot/FsmStorage.py (Diskda saqlanadigan FSM holatlari: MemoryStorage o'rniga)
+#
+# Holat va state-data SQLite faylda saqlanadi, shuning uchun qayta deploy qilinganda
+# foydalanuvchining boshlangan buyurtma jarayoni davom etadi. Tez-tez ishlatiladigan
+# yozuvlar cheklangan hajmdagi xotira keshida turadi, FSM_TTL dan uzoq vaqt
+# o'zgarmagan (tashlab ketilgan) holatlar esa fon vazifasi tomonidan o'chiriladi.
+# Tinch holatlar (asosiy menyu) eskirmaydi: haftada bir buyurtma beradigan mijoz qaytib
+# kelganda menyu tugmalari ishlashi kerak.
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+# ----------------- Sozlamalar -----------------
+FSM_FILE = Path(os.getenv("FSM_PATH", Path(__file__).parent / 'fsm.db'))
+FSM_TTL = float(os.getenv("FSM_TTL", str(7 * 24 * 3600)))          # 7 kun
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_EVICT_INTERVAL = float(os.getenv("FSM_EVICT_INTERVAL", "3600"))  # 1 soat
+# TTL bo'yicha o'chirilmaydigan holatlar (vergul bilan)
+FSM_RESTING_STATES = {
+    s.strip() for s in os.getenv("FSM_RESTING_STATES", "MainMenuStates:main_menu").split(",") if s.strip()
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key        TEXT PRIMARY KEY,
+    state      TEXT,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm (updated_at);
+"""
+
+
+class SqliteFsmStorage(BaseStorage):
+    """aiogram uchun SQLite asosidagi FSM storage (TTL va LRU kesh bilan)."""
+
+    def __init__(self, path: Path = FSM_FILE, ttl: float = FSM_TTL, cache_size: int = FSM_CACHE_SIZE,
+                 resting_states=FSM_RESTING_STATES):
+        self.ttl = ttl
+        self.resting_states = tuple(resting_states)
+        self.cache_size = cache_size
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache = OrderedDict()   # key -> [state, data, updated_at]
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # ----------------- Ichki yordamchilar -----------------
+
+    def _is_expired(self, record: list) -> bool:
+        return self.ttl > 0 and record[0] not in self.resting_states and record[2] < time.time() - self.ttl
+
+    def _not_resting_sql(self) -> tuple:
+        """WHERE qismi uchun: tinch holatlarni chiqarib tashlovchi shart va uning parametrlari."""
+        if not self.resting_states:
+            return "1", ()
+        marks = ", ".join("?" * len(self.resting_states))
+        return f"(state IS NULL OR state NOT IN ({marks}))", self.resting_states
+
+    def _remember(self, key: str, record: list):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _load(self, key: str) -> list:
+        record = self._cache.get(key)
+        if record is None:
+            row = self.conn.execute("SELECT state, data, updated_at FROM fsm WHERE key = ?", (key,)).fetchone()
+            record = [row[0], json.loads(row[1]), row[2]] if row else [None, {}, time.time()]
+        if self._is_expired(record):
+            record = [None, {}, time.time()]
+        self._remember(key, record)
+        return record
+
+    def _store(self, key: str, record: list):
+        record[2] = time.time()
+        self._remember(key, record)
+        with self.conn:
+            if record[0] is None and not record[1]:
+                self.conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET state=excluded.state, data=excluded.data, updated_at=excluded.updated_at",
+                    (key, record[0], json.dumps(record[1], ensure_ascii=False), record[2])
+                )
+
+    # ----------------- BaseStorage interfeysi -----------------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = self.key_builder.build(key)
+        record = self._load(k)
+        record[0] = state.state if isinstance(state, State) else state
+        self._store(k, record)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return self._load(self.key_builder.build(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        k = self.key_builder.build(key)
+        record = self._load(k)
+        record[1] = dict(data)
+        self._store(k, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict(self._load(self.key_builder.build(key))[1])
+
+    async def close(self) -> None:
+        self.conn.close()
+
+    def state_counts(self) -> dict:
+        """Har bir holatdagi (eskirmagan) suhbatlar soni: {state: count} (Metrics.py uchun)."""
+        cutoff = time.time() - self.ttl if self.ttl > 0 else 0
+        not_resting, params = self._not_resting_sql()
+        rows = self.conn.execute(
+            f"SELECT state, COUNT(*) FROM fsm WHERE state IS NOT NULL AND (updated_at >= ? OR NOT {not_resting}) "
+            "GROUP BY state", (cutoff, *params)
+        ).fetchall()
+        return dict(rows)
+
+    # ----------------- Eskirgan holatlarni tozalash -----------------
+
+    def evict_expired(self) -> int:
+        """FSM_TTL dan eski yozuvlarni (tinch holatlardan tashqari) o'chiradi. O'chirilganlar sonini qaytaradi."""
+        if self.ttl <= 0:
+            return 0
+        cutoff = time.time() - self.ttl
+        for key in [k for k, record in self._cache.items() if self._is_expired(record)]:
+            del self._cache[key]
+        not_resting, params = self._not_resting_sql()
+        with self.conn:
+            cursor = self.conn.execute(f"DELETE FROM fsm WHERE updated_at < ? AND {not_resting}", (cutoff, *params))
+        return cursor.rowcount
+
+    async def evict_loop(self, interval: float = FSM_EVICT_INTERVAL):
+        """Fon vazifasi: tashlab ketilgan holatlarni muntazam o'chiradi."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = self.evict_expired()
+                if removed:
+                    print(f"FSM: {removed} ta eskirgan holat o'chirildi.")
+            except sqlite3.Error as e:
+                print(f"XATO: FSM holatlarini tozalashda xato yuz berdi: {e}")
@@ -0,0 +1,102 @@
+# bot/Geo.py (Geografik yordamchilar: masofa va katakli (grid) indeks)
+#
+# Pending buyurtmalar koordinatalari GEO_CELL_DEG o'lchamli kataklarga joylanadi.
+# Radius bo'yicha so'rov faqat kuryer atrofidagi kataklarni tekshiradi, shuning uchun
+# kuryerga eng yaqin buyurtmalarni topish barcha buyurtmalarni aylanib chiqmaydi.
+
+import os
+import math
+
+# ----------------- Sozlamalar -----------------
+GEO_CELL_DEG = float(os.getenv("GEO_CELL_DEG", "0.01"))   # ~1.1 km kenglik bo'yicha
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Ikki nuqta orasidagi masofa (km)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def create_location_links(lat, lon):
+    google_link = f"https://www.google.com/maps?q={lat},{lon}"
+    yandex_link = f"https://yandex.com/maps/?ll={lon},{lat}&z=16&pt={lon},{lat}"
+    return google_link, yandex_link
+
+
+def point_of(location) -> tuple | None:
+    """{'latitude', 'longitude'} dan (lat, lon) yoki noto'g'ri bo'lsa None."""
+    if not isinstance(location, dict):
+        return None
+    try:
+        lat, lon = float(location['latitude']), float(location['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
+
+
+class GridIndex:
+    """Nuqtalar uchun oddiy katakli indeks: key -> (lat, lon)."""
+
+    def __init__(self, cell_deg: float = GEO_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.cells = {}    # (i, j) -> {key: (lat, lon)}
+        self.points = {}   # key -> (i, j)
+
+    def _cell(self, lat: float, lon: float):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
+
+    def add(self, key, lat: float, lon: float):
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self.cells.setdefault(cell, {})[key] = (lat, lon)
+        self.points[key] = cell
+
+    def remove(self, key):
+        cell = self.points.pop(key, None)
+        if cell is None:
+            return
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self.cells[cell]
+
+    def clear(self):
+        self.cells.clear()
+        self.points.clear()
+
+    def within(self, lat: float, lon: float, radius_km: float):
+        """radius_km ichidagi nuqtalarni (masofa, key) ko'rinishida, yaqinidan boshlab qaytaradi."""
+        dlat = radius_km / KM_PER_DEG_LAT
+        dlon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+
+        found = []
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.cells):
+            # Radius juda katta: kataklarni emas, mavjud kataklarni aylanamiz
+            buckets = self.cells.values()
+        else:
+            buckets = (self.cells.get((i, j)) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1))
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for key, (plat, plon) in bucket.items():
+                distance = haversine_km(lat, lon, plat, plon)
+                if distance <= radius_km:
+                    found.append((distance, key))
+        found.sort()
+        return found
@@ -0,0 +1,112 @@
+# bot/Journal.py (Faqat qo'shiladigan jurnal: ratings, complaints, comments uchun)
+#
+# Har bir yangi yozuv jurnal fayliga (*.jsonl) bitta qator bo'lib qo'shiladi, shuning
+# uchun yozish tarix hajmiga bog'liq emas. compact() jurnalni asosiy JSON snapshotga
+# (ratings.json va h.k.) qo'shib, jurnalni tozalaydi. Admin ko'rinishlari snapshotni o'qiydi.
+
+import os
+import json
+from pathlib import Path
+
+
+def journal_path(snapshot_path: Path) -> Path:
+    """ratings.json -> ratings.jsonl"""
+    return snapshot_path.with_suffix('.jsonl')
+
+
+def append(path: Path, record: dict):
+    """Yozuvni jurnal oxiriga bitta qator qilib qo'shadi (O(1))."""
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def iter_journal(path: Path):
+    """Jurnal yozuvlarini qatorma-qator o'qiydi (butun faylni xotiraga yuklamaydi)."""
+    if not path.exists():
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Yozuv paytida uzilib qolgan oxirgi qator
+                print(f"XATO: {path.name} da buzilgan qator o'tkazib yuborildi.")
+
+
+def _load_snapshot(snapshot_path: Path):
+    if not snapshot_path.exists():
+        return []
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (json.JSONDecodeError, IOError):
+        return []
+
+
+def _work_paths(snapshot_path: Path):
+    """compact() ning oraliq fayllari: (.compacting, .compacted, snapshot .tmp)."""
+    path = journal_path(snapshot_path)
+    return (path.with_name(path.name + '.compacting'),
+            path.with_name(path.name + '.compacted'),
+            snapshot_path.with_name(snapshot_path.name + '.tmp'))
+
+
+def _current_snapshot(snapshot_path: Path) -> Path:
+    # .compacted bor va .tmp hali joyiga qo'yilmagan: to'liq (birlashtirilgan) nusxa .tmp da
+    _, compacted, tmp_path = _work_paths(snapshot_path)
+    if compacted.exists() and tmp_path.exists():
+        return tmp_path
+    return snapshot_path
+
+
+def iter_records(snapshot_path: Path):
+    """Avval snapshotdagi, keyin jurnaldagi barcha yozuvlarni ketma-ket qaytaradi."""
+    compacting, _, _ = _work_paths(snapshot_path)
+    yield from _load_snapshot(_current_snapshot(snapshot_path))
+    yield from iter_journal(compacting)
+    yield from iter_journal(journal_path(snapshot_path))
+
+
+def _finish_interrupted(snapshot_path: Path):
+    """Uzilib qolgan compact ni yakunlaydi (.compacted bo'lsa .tmp to'liq yozilgan)."""
+    _, compacted, tmp_path = _work_paths(snapshot_path)
+    if not compacted.exists():
+        return
+    if tmp_path.exists():
+        os.replace(tmp_path, snapshot_path)
+    os.remove(compacted)
+
+
+def compact(snapshot_path: Path):
+    """Jurnalni snapshotga qo'shadi va jurnalni tozalaydi. Qo'shilgan yozuvlar sonini qaytaradi.
+
+    Qadamlar: jurnal -> .compacting; snapshot + .compacting -> .tmp; .compacting -> .compacted
+    (shu nom o'zgarishi - tasdiqlash nuqtasi); .tmp -> snapshot; .compacted o'chiriladi.
+    Qaysi qadamda uzilsa ham yozuvlar na yo'qoladi, na ikki marta qo'shiladi.
+    """
+    path = journal_path(snapshot_path)
+    compacting, compacted, tmp_path = _work_paths(snapshot_path)
+    _finish_interrupted(snapshot_path)
+
+    # Yangi yozuvlar compact paytida bo'sh jurnalga tushishi uchun avval nomini o'zgartiramiz.
+    # Oldingi compact tasdiqlashdan oldin uzilgan bo'lsa, .compacting allaqachon mavjud bo'ladi.
+    if path.exists() and not compacting.exists():
+        os.replace(path, compacting)
+    if not compacting.exists():
+        return 0
+
+    records = _load_snapshot(snapshot_path)
+    new_records = list(iter_journal(compacting))
+    records.extend(new_records)
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=4, ensure_ascii=False)
+    os.replace(compacting, compacted)
+    os.replace(tmp_path, snapshot_path)
+    os.remove(compacted)
+    return len(new_records)
@@ -1,23 +1,40 @@
 import os 
 import time
-import json 
-import asyncio 
-from datetime import datetime, timedelta # UTC+5 uchun qo'shildi
+from datetime import datetime, timedelta
 from aiogram import Router, F, types, Bot
 from aiogram.filters import Command
 from aiogram.utils.markdown import html_decoration as hd
-from pathlib import Path 
 from aiogram.fsm.context import FSMContext # State uchun qo'shildi
 from aiogram.fsm.state import StatesGroup, State # State uchun qo'shildi
 
-# ----------------- Konstanta -----------------
-# Kuryer uchun komissiya foizi (10%)
-COMMISSION_RATE = 0.10 # 10%
+from Storage import (
+    get_order,
+    transition_order,
+    iter_orders_by_status,
+    iter_orders_by_courier,
+    iter_pending_orders_near,
+    load_couriers,
+    load_courier_sessions,
+    save_courier_sessions,
+)
 
-# ----------------- Fayl yo'llari -----------------
-COURIER_SESSION_FILE = Path(__file__).parent / 'courier_sessions.json' 
-COURIERS_FILE = Path(__file__).parent / 'couriers.json' 
-DATABASE_FILE = Path(__file__).parent / 'database.json' 
+# ----------------- Konstanta -----------------
+# Kuryer uchun komissiya foizi (10%) - Rollups.py da belgilangan
+from Rollups import COMMISSION_RATE, courier_stats, record_delivery
+from Dispatch import (
+    COURIER_RADIUS_KM,
+    courier_order_view,
+    format_courier_order,
+    get_order_inline_keyboard,
+    remember_push,
+    mark_order_taken,
+    save_courier_location,
+    courier_location,
+)
+from Clock import now_local, now_str, event_fields
+from Geo import point_of, haversine_km, create_location_links
+from AutoDispatch import on_order_accepted, decline_offer
+from Route import plan_route, directions_link, GOOGLE_DIR_MAX_POINTS
 
 # ----------------- Maxfiy Ma'lumotlar -----------------
 KURYER_PASSWORD_RAW = os.getenv("KURYER_PASSWORD") 
@@ -36,73 +53,24 @@ class CourierHistoryState(StatesGroup):
     waiting_for_start_date = State()
     waiting_for_end_date = State()
 
-# ----------------- YANGI: Vaqt Funksiyasi (UTC+5) -----------------
-def get_uzb_now():
-    """O'zbekiston vaqtini qaytaradi (UTC+5)."""
-    return datetime.utcnow() + timedelta(hours=5)
-
 # --------------------------------------------------------------------------------------
-# JSON bilan ishlash funksiyalari (DATABASE.JSON BILAN ISHLAYDI)
+# Kuryer sessiyasi (saqlash Storage.py orqali)
 # --------------------------------------------------------------------------------------
 
-def load_couriers():
-    """couriers.json faylidan rasmiy kuryerlar ro'yxatini o'qiydi."""
-    if not COURIERS_FILE.exists():
-        return {}
-    try:
-        with open(COURIERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-def load_courier_sessions():
-    """JSON fayldan kuryer sessiyalarini o'qiydi."""
-    if not COURIER_SESSION_FILE.exists():
-        return {}
-    try:
-        with open(COURIER_SESSION_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
 def save_courier_session(user_id, message_data):
-    """Kuryerning sessiya ma'lumotlarini JSON faylga yozadi."""
+    """Kuryerning sessiya ma'lumotlarini saqlaydi (Storage.py orqali)."""
     sessions = load_courier_sessions()
     session_data = {
         'id': user_id,
         'username': message_data.from_user.username,
         'first_name': message_data.from_user.first_name,
-        'login_time': get_uzb_now().strftime("%Y-%m-%d %H:%M:%S"), # To'g'rilandi
+        'login_time': now_str(),
         'timestamp': time.time()
     }
     sessions[str(user_id)] = session_data
-    try:
-        with open(COURIER_SESSION_FILE, 'w', encoding='utf-8') as f:
-            json.dump(sessions, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        print(f"XATO: Kuryer sessiyasini saqlashda xato yuz berdi: {e}")
+    save_courier_sessions(sessions)
     return session_data
 
-def load_database():
-    """database.json faylidan barcha ma'lumotlarni o'qiydi."""
-    if not DATABASE_FILE.exists():
-        return {}
-    try:
-        with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
-
-def save_database(data):
-    """Barcha ma'lumotlarni database.json fayliga yozadi."""
-    try:
-        with open(DATABASE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except IOError as e:
-        print(f"XATO: database.json ga saqlashda xato yuz berdi: {e}")
-        return False
-        
 # --------------------------------------------------------------------------------------
 # YANGILANGAN FUNKSIYA: Kuryer statistikasini hisoblash (Range filtri qo'shildi)
 # --------------------------------------------------------------------------------------
@@ -110,92 +78,43 @@ def aggregate_courier_stats(courier_id: str, target_date: str = None, start_date
     """
     Berilgan kuryer ID bo'yicha yetkazilgan buyurtmalar statistikasini hisoblaydi.
     start_date va end_date berilsa, oraliq bo'yicha hisoblaydi.
+    Natija butun tarixni aylanmasdan, kunlik yig'ma savatlardan olinadi (Rollups.py).
     """
-    db_data = load_database()
-    delivered_orders = []
-    total_delivered_count = 0
-    total_sales_amount = 0 
-    total_commission = 0   
-    
-    for _, user_data in db_data.items():
-        user_orders = user_data.get('orders', [])
-        
-        for order in user_orders:
-            if order.get('status') == 'delivered' and str(order.get('courier_id')) == courier_id:
-                
-                full_date = order.get('delivered_at', order.get('date', ''))
-                order_day = full_date.split(' ')[0]
-
-                # 1. Aniq bir kunlik filtr
-                if target_date and order_day != target_date:
-                    continue
-                
-                # 2. Oraliq kunlik filtr (Range)
-                if start_date and end_date:
-                    if not (start_date <= order_day <= end_date):
-                        continue
-
-                total_delivered_count += 1
-                order_total = order.get('total', 0)
-                commission = int(order_total * COMMISSION_RATE)
-                
-                total_sales_amount += order_total
-                total_commission += commission
-                
-                delivered_orders.append({
-                    'order_id': order.get('order_id'),
-                    'total': order_total,
-                    'commission': commission,
-                    'date': full_date
-                })
-                
-    delivered_orders.sort(key=lambda x: x['date'], reverse=True)
-    
-    return {
-        'orders_list': delivered_orders,
-        'count': total_delivered_count,
-        'total_sales': total_sales_amount,
-        'total_commission': total_commission
-    }
+    return courier_stats(courier_id, target_date=target_date, start_date=start_date, end_date=end_date)
 
 
 # --------------------------------------------------------------------------------------
-# Pending buyurtmalarni olish (O'ZGARMADI)
+# Pending buyurtmalarni olish (status indeksi orqali)
 # --------------------------------------------------------------------------------------
-def aggregate_pending_orders():
-    """database.json dan barcha pending buyurtmalarni yig'adi."""
-    db_data = load_database()
-    pending_orders_list = []
-    
-    for user_id_str, user_data in db_data.items():
-        user_orders = user_data.get('orders', [])
-        
-        user_phone = user_data.get('phone', '---')
-        user_address_data = user_data.get('location', {})
-        
-        for order in user_orders:
-            if order.get('status') == 'pending' and order.get('courier_id') is None:
-                
-                try:
-                    timestamp = time.mktime(time.strptime(order.get('date'), "%Y-%m-%d %H:%M:%S"))
-                except (ValueError, TypeError):
-                    timestamp = time.time() 
-
-                aggregated_order = {
-                    'order_id': order.get('order_id'),
-                    'user_id': user_id_str, 
-                    'phone_number': user_phone,
-                    'location': user_address_data,
-                    'total_amount': order.get('total'),
-                    'items': f"{order.get('product_name')} ({order.get('quantity')}x)", 
-                    'status': 'pending',
-                    'timestamp': timestamp
-                }
-                pending_orders_list.append(aggregated_order)
-                
-    pending_orders_list.sort(key=lambda x: x['timestamp'])
-    
-    return pending_orders_list
+def aggregate_pending_orders(courier_id: str = None):
+    """
+    Barcha pending buyurtmalarni yig'adi (status indeksi orqali, butun bazani aylanmaydi).
+    Kuryerning yangi joylashuvi ma'lum bo'lsa, COURIER_RADIUS_KM ichidagi buyurtmalar geo indeks
+    orqali yaqinidan boshlab beriladi; koordinatasiz buyurtmalar ro'yxat oxiriga qo'shiladi.
+    """
+    point = courier_location(courier_id) if courier_id is not None else None
+    if point is None:
+        pending_orders_list = []
+        for user_id_str, order in iter_orders_by_status('pending'):
+            if order.get('courier_id') is not None:
+                continue
+            pending_orders_list.append(courier_order_view(user_id_str, order))
+        pending_orders_list.sort(key=lambda x: x['timestamp'])
+        return pending_orders_list
+
+    nearby = []
+    for distance, user_id_str, order in iter_pending_orders_near(point[0], point[1], COURIER_RADIUS_KM):
+        view = courier_order_view(user_id_str, order)
+        view['distance_km'] = distance
+        nearby.append(view)
+
+    without_location = [
+        courier_order_view(user_id_str, order)
+        for user_id_str, order in iter_orders_by_status('pending')
+        if order.get('courier_id') is None and point_of(order.get('location_geo')) is None
+    ]
+    without_location.sort(key=lambda x: x['timestamp'])
+    return nearby + without_location
 
 
 # --------------------------------------------------------------------------------------
@@ -207,11 +126,13 @@ def get_courier_keyboard():
     btn_history = types.KeyboardButton(text="📜 Zakazlarim tarixi") 
     btn_balance = types.KeyboardButton(text="💰 Balans / Hisobot") 
     btn_rating = types.KeyboardButton(text="⭐ My Reyting") 
+    btn_location = types.KeyboardButton(text="📍 Joylashuvni yuborish", request_location=True)
+    btn_route = types.KeyboardButton(text="🗺 Marshrut")
     
     keyboard_rows = [
-        [btn_orders], 
+        [btn_orders, btn_route], 
         [btn_history, btn_balance],
-        [btn_rating]
+        [btn_rating, btn_location]
     ]
 
     markup = types.ReplyKeyboardMarkup(
@@ -238,17 +159,6 @@ def get_balance_inline_keyboard():
     ]
     return types.InlineKeyboardMarkup(inline_keyboard=ikb)
 
-def get_order_inline_keyboard(user_id: str, order_id: str):
-    """Buyurtmani qabul qilish uchun inline keyboard yaratadi."""
-    btn_accept = types.InlineKeyboardButton(
-        text="✅ Buyurtmani olish",
-        callback_data=f"courier_accept_{user_id}_{order_id}"
-    )
-    
-    keyboard = [
-        [btn_accept]
-    ]
-    return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
 # --------------------------------------------------------------------------------------
@@ -344,7 +254,7 @@ async def handle_courier_buttons(message: types.Message, state: FSMContext):
         return
 
     if message.text == "📦 Buyurtmalar":
-        pending_orders = aggregate_pending_orders()
+        pending_orders = aggregate_pending_orders(user_id_str)
         
         if not pending_orders:
             await message.answer("📋 <b>Yangi Buyurtmalar</b>\n\n🎉 Ayni damda yangi buyurtmalar mavjud emas.", parse_mode="HTML")
@@ -353,22 +263,9 @@ async def handle_courier_buttons(message: types.Message, state: FSMContext):
         await message.answer("📋 <b>Yangi Buyurtmalar Ro'yxati:</b>", parse_mode="HTML")
         
         for order in pending_orders:
-            lat, lon = order['location'].get('latitude', 0), order['location'].get('longitude', 0)
-            map_link = f"https://www.google.com/maps/search/?api=1&query={lat},{lon}"
-            
-            order_details = (
-                f"➖➖➖➖➖➖➖➖➖➖\n"
-                f"🆔 {hd.bold('ID:')} <code>#{order.get('order_id')}</code>\n"
-                f"👤 {hd.bold('Mijoz ID:')} <code>{order.get('user_id')}</code>\n"
-                f"⏰ {hd.bold('Vaqt:')} {order.get('date')}\n"
-                f"📞 {hd.bold('Mijoz Tel:')} {hd.bold(order.get('phone_number'))}\n"
-                f"🗺️ {hd.bold('Manzil:')} <a href='{map_link}'>Xarita</a>\n"
-                f"🛍️ {hd.bold('Mahsulotlar:')} {order.get('items')}\n"
-                f"💰 {hd.bold('Jami:')} {hd.bold(f'{order.get('total_amount', 0):,}')} so'm"
-            )
-            
-            await message.answer(order_details, parse_mode="HTML", reply_markup=get_order_inline_keyboard(order.get('user_id'), order.get('order_id')))
-            await asyncio.sleep(0.1) 
+            msg = await message.answer(format_courier_order(order), parse_mode="HTML", reply_markup=get_order_inline_keyboard(order.get('user_id'), order.get('order_id')))
+            # Boshqa kuryer olsa, bu nusxa ham "olindi" deb tahrirlanadi
+            remember_push(order.get('order_id'), user_id_str, msg.message_id)
 
     elif message.text == "📜 Zakazlarim tarixi":
         await message.answer("📜 Zakazlar tarixini ko'rish uchun vaqtni tanlang:", reply_markup=get_history_filter_keyboard())
@@ -395,7 +292,7 @@ async def handle_courier_buttons(message: types.Message, state: FSMContext):
 async def callback_report_weekly(call: types.CallbackQuery):
     user_id_str = str(call.from_user.id)
     # Kechadan boshlab 7 kun orqaga (Bugun hisobga olinmaydi)
-    yesterday = get_uzb_now() - timedelta(days=1)
+    yesterday = now_local() - timedelta(days=1)
     start_dt = yesterday - timedelta(days=6)
     
     start_date_str = start_dt.strftime("%Y-%m-%d")
@@ -464,7 +361,7 @@ async def process_end_date(message: types.Message, state: FSMContext):
 @courier_router.message(F.text == "📅 Bugun")
 async def history_today_handler(message: types.Message):
     user_id_str = str(message.from_user.id)
-    today_date = get_uzb_now().strftime("%Y-%m-%d")
+    today_date = now_local().strftime("%Y-%m-%d")
     stats = aggregate_courier_stats(user_id_str, target_date=today_date)
     
     response = f"📊 {hd.bold('BUGUNGI HISOBOT (' + today_date + ')')}\n\n"
@@ -490,7 +387,7 @@ async def process_day_input(message: types.Message, state: FSMContext):
         await message.answer("❌ 1-31 oralig'ida raqam kiriting:")
         return
 
-    now = get_uzb_now()
+    now = now_local()
     target_date = f"{now.year}-{now.month:02d}-{kun:02d}"
     stats = aggregate_courier_stats(str(message.from_user.id), target_date=target_date)
     await state.clear()
@@ -512,6 +409,113 @@ async def send_history_stats(message, stats, response, show_main_kb=False):
     markup = get_courier_keyboard() if show_main_kb else None
     await message.answer(response, parse_mode="HTML", reply_markup=markup)
 
+# ----------------------------------------------------------------------------------
+# KURYER JOYLASHUVI (buyurtmalarni masofa bo'yicha saralash uchun)
+# ----------------------------------------------------------------------------------
+@courier_router.message(F.location)
+async def handle_courier_location(message: types.Message):
+    user_id_str = str(message.from_user.id)
+    if user_id_str not in load_couriers():
+        return
+    if not save_courier_location(user_id_str, message.location.latitude, message.location.longitude):
+        await message.answer("⚠️ Kirish uchun ruxsat yo'q. /kuryer [parol] orqali kiring.")
+        return
+    await message.answer(
+        f"✅ Joylashuv saqlandi. 📦 Buyurtmalar endi {COURIER_RADIUS_KM:g} km radiusda, yaqinidan boshlab ko'rsatiladi.",
+        reply_markup=get_courier_keyboard()
+    )
+
+@courier_router.edited_message(F.location)
+async def handle_courier_live_location(message: types.Message):
+    # Jonli joylashuv yangilanishlari: javob yubormasdan saqlaymiz
+    if str(message.from_user.id) in load_couriers():
+        save_courier_location(message.from_user.id, message.location.latitude, message.location.longitude)
+
+# ----------------------------------------------------------------------------------
+# MARSHRUT: olingan buyurtmalarni yetkazish tartibi
+# ----------------------------------------------------------------------------------
+def build_route_message(courier_id: str):
+    """Kuryerning on_delivery buyurtmalari uchun marshrut xabari qatorlari (HTML) yoki None."""
+    stops, points, without_location = [], [], []
+    for user_id_str, order in iter_orders_by_courier(courier_id, 'on_delivery'):
+        view = courier_order_view(user_id_str, order)
+        point = point_of(view['location'])
+        if point is None:
+            without_location.append(view)
+            continue
+        stops.append(view)
+        points.append(point)
+
+    if not stops and not without_location:
+        return None
+
+    start = courier_location(courier_id)
+    from_courier = start is not None
+    if start is None and points:
+        # Joylashuv noma'lum: birinchi manzildan boshlaymiz
+        start = points[0]
+
+    order_idx, total_km = plan_route(start, points) if points else ([], 0.0)
+
+    lines = [f"🗺 {hd.bold('Yetkazish marshruti')} ({len(stops)} ta manzil, ~{total_km:.1f} km)"]
+    if not from_courier and points:
+        lines.append(hd.italic("📍 Joylashuvingiz noma'lum — marshrut birinchi manzildan hisoblandi."))
+    prev = start
+    ordered_points = []
+    for number, idx in enumerate(order_idx, start=1):
+        view, point = stops[idx], points[idx]
+        ordered_points.append(point)
+        google_link, yandex_link = create_location_links(round(point[0], 6), round(point[1], 6))
+        leg_km = haversine_km(prev[0], prev[1], point[0], point[1])
+        prev = point
+        lines.append(
+            f"\n{number}. 🆔 <code>#{view['order_id']}</code> · +{leg_km:.1f} km\n"
+            f"📞 {view['phone_number']} · 🛍️ {view['items']}\n"
+            f"<a href='{google_link}'>Google</a> | <a href='{yandex_link}'>Yandex</a>"
+        )
+
+    if ordered_points:
+        suffix = f" (birinchi {GOOGLE_DIR_MAX_POINTS} ta)" if len(ordered_points) > GOOGLE_DIR_MAX_POINTS else ""
+        if from_courier:
+            link = directions_link(start, ordered_points)
+        else:
+            link = directions_link(ordered_points[0], ordered_points[1:])
+        lines.append(f"\n🧭 <a href='{link}'>Butun marshrut Google Maps'da</a>{suffix}")
+    if without_location:
+        ids = ", ".join(f"<code>#{view['order_id']}</code>" for view in without_location)
+        lines.append(f"\n⚠️ Manzili yo'q buyurtmalar: {ids}")
+    return lines
+
+
+def split_message(lines: list, limit: int = 4000) -> list:
+    """Qatorlarni Telegram xabar chegarasidan oshmaydigan bo'laklarga yig'adi."""
+    chunks, current = [], ""
+    for line in lines:
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = line.lstrip("\n")
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@courier_router.message(F.text == "🗺 Marshrut")
+async def handle_courier_route(message: types.Message):
+    user_id_str = str(message.from_user.id)
+    if user_id_str not in load_courier_sessions() or user_id_str not in load_couriers():
+        await message.answer("⚠️ Kirish uchun ruxsat yo'q. /kuryer [parol] orqali kiring.")
+        return
+
+    lines = build_route_message(user_id_str)
+    if lines is None:
+        await message.answer("🗺 Sizda yetkazilayotgan buyurtmalar yo'q.")
+        return
+    # Odatda bitta xabar; juda ko'p manzil bo'lsa, 4096 belgidan oshmasligi uchun bo'linadi
+    for chunk in split_message(lines):
+        await message.answer(chunk, parse_mode="HTML", disable_web_page_preview=True)
+
 # ----------------------------------------------------------------------------------
 # CALLBACKS: Qabul va Yetkazish
 # ----------------------------------------------------------------------------------
@@ -522,26 +526,31 @@ async def callback_accept_order(call: types.CallbackQuery, bot: Bot):
     parts = call.data.split('_')
     target_user_id, order_id = parts[-2], parts[-1]
     
-    db_data = load_database()
-    user_data = db_data.get(target_user_id)
-    if not user_data: return
-
-    order_found = False
-    for order in user_data['orders']:
-        if order.get('order_id') == order_id and order.get('status') == 'pending':
-            order.update({'status': 'on_delivery', 'courier_id': courier_id, 'accepted_at': get_uzb_now().strftime("%Y-%m-%d %H:%M:%S")})
-            order_found = True
-            break
-
-    if not order_found:
-        await call.message.edit_text("❌ Xatolik!")
+    # Atomar o'tish: bir vaqtda bosgan kuryerlardan faqat bittasi buyurtmani oladi
+    owner_id, order = transition_order(
+        order_id, 'pending', 'on_delivery', owner_id=target_user_id,
+        updates={'courier_id': courier_id, **event_fields('accepted')}
+    )
+    if order is None:
+        await call.message.edit_text(f"❌ Buyurtma #{order_id} allaqachon olingan yoki mavjud emas.")
         return
 
-    if save_database(db_data):
-        await call.message.edit_text(f"✅ Olingan: #{order_id}", reply_markup=types.InlineKeyboardMarkup(inline_keyboard=[[types.InlineKeyboardButton(text="✔️ Yetkazildi", callback_data=f"courier_delivered_{target_user_id}_{order_id}")]]))
-        try:
-            await bot.send_message(target_user_id, f"🛵 Buyurtmangiz #{order_id} yo'lda!")
-        except Exception: pass
+    on_order_accepted(order_id, courier_id)
+    await mark_order_taken(bot, order_id, courier_id)
+    await call.message.edit_text(f"✅ Olingan: #{order_id}", reply_markup=types.InlineKeyboardMarkup(inline_keyboard=[[types.InlineKeyboardButton(text="✔️ Yetkazildi", callback_data=f"courier_delivered_{target_user_id}_{order_id}")]]))
+    try:
+        await bot.send_message(target_user_id, f"🛵 Buyurtmangiz #{order_id} yo'lda!")
+    except Exception: pass
+
+@courier_router.callback_query(F.data.startswith("courier_decline_"))
+async def callback_decline_order(call: types.CallbackQuery, bot: Bot):
+    order_id = call.data.split('_')[-1]
+    # Keyingi kuryerga taklif fonda ketadi, tugma shu zahoti javob oladi
+    if not decline_offer(bot, order_id, call.from_user.id):
+        await call.answer("Bu taklif endi amal qilmaydi.", show_alert=True)
+        return
+    await call.answer("Rad etildi.")
+    await call.message.edit_text(f"❌ Buyurtma #{order_id} rad etildi.")
 
 @courier_router.callback_query(F.data.startswith("courier_delivered_"))
 async def callback_delivered_order(call: types.CallbackQuery, bot: Bot):
@@ -550,23 +559,23 @@ async def callback_delivered_order(call: types.CallbackQuery, bot: Bot):
     parts = call.data.split('_')
     target_user_id, order_id = parts[-2], parts[-1]
     
-    db_data = load_database()
-    user_data = db_data.get(target_user_id)
-    if not user_data: return
-
-    order_found = False
-    for order in user_data['orders']:
-        if order.get('order_id') == order_id and order.get('courier_id') == courier_id:
-            total = order.get('total', 0)
-            order.update({'status': 'delivered', 'delivered_at': get_uzb_now().strftime("%Y-%m-%d %H:%M:%S"), 'commission_amount': int(total * COMMISSION_RATE)})
-            order_found = True
-            break
-            
-    if order_found and save_database(db_data):
-        await call.message.edit_text(f"🏁 #{order_id} yetkazildi!") 
-        try:
-            await bot.send_message(target_user_id, f"🎉 Buyurtma #{order_id} yetkazildi!")
-        except Exception: pass
+    _, order = get_order(order_id)
+    if order is None:
+        return
+    total = order.get('total', 0)
+    # Qayta bosilganda hisobot ikki marta oshmasligi uchun: faqat on_delivery -> delivered
+    owner_id, order = transition_order(
+        order_id, 'on_delivery', 'delivered', owner_id=target_user_id, courier_id=courier_id,
+        updates={**event_fields('delivered'), 'commission_amount': int(total * COMMISSION_RATE)}
+    )
+    if order is None:
+        return
+
+    record_delivery(courier_id, order)
+    await call.message.edit_text(f"🏁 #{order_id} yetkazildi!") 
+    try:
+        await bot.send_message(target_user_id, f"🎉 Buyurtma #{order_id} yetkazildi!")
+    except Exception: pass
 
 def setup_kuryer_handlers(dp):
     dp.include_router(courier_router)
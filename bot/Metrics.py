@@ -0,0 +1,241 @@
+# bot/Metrics.py (Prometheus formatidagi metrikalar: handlerlar, saqlash, Telegram API)
+#
+# Tashqi kutubxonasiz kichik registr: Counter, Histogram va scrape paytida hisoblanadigan
+# Gauge. install(dp) barcha routerlardagi handlerlarga vaqt o'lchovchi middleware qo'yadi,
+# TelegramMetrics esa har bir Bot API so'rovining vaqtini va xatolarini yozadi. Storage.py
+# JSON/DB o'qish-yozish vaqtini va hajmini shu yerga yozadi. Natija METRICS_HOST:METRICS_PORT
+# dagi /metrics manzilida (standart: faqat 127.0.0.1; METRICS_PORT=0 o'chiradi).
+
+import os
+import time
+import bisect
+import threading
+
+# ----------------- Sozlamalar -----------------
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1024, 16384, 131072, 1048576, 8388608, 67108864, 268435456)
+
+_lock = threading.Lock()
+_metrics = []   # ro'yxatga olingan barcha metrikalar (chiqarish tartibida)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.values = {}
+        _metrics.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}   # labels -> [bucket_counts..., count, sum]
+        _metrics.append(self)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                entry[index] += 1
+            entry[-2] += 1
+            entry[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        for labels, entry in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, 'le="%s"' % bound)} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, 'le="+Inf"')} {entry[-2]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {entry[-2]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {entry[-1]:.6f}"
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Gauge:
+    """Qiymati scrape paytida funksiya orqali hisoblanadi: fn() -> {labels_tuple: qiymat}."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), fn=None):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.fn = fn
+        _metrics.append(self)
+
+    def samples(self):
+        try:
+            values = self.fn() if self.fn else {}
+        except Exception as e:
+            print(f"XATO: '{self.name}' metrikasini hisoblab bo'lmadi: {e}")
+            values = {}
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+# --------------------------------------------------------------------------------------
+# Metrikalar
+# --------------------------------------------------------------------------------------
+HANDLER_SECONDS = Histogram('bot_handler_seconds', "Handler bajarilish vaqti", ('router', 'handler'))
+HANDLER_ERRORS = Counter('bot_handler_errors_total', "Handlerda ushlanmagan xatolar", ('router', 'handler', 'error'))
+
+TELEGRAM_SECONDS = Histogram('telegram_request_seconds', "Bot API so'rovi vaqti", ('method',))
+TELEGRAM_ERRORS = Counter('telegram_request_errors_total', "Bot API xatolari", ('method', 'error'))
+
+STORAGE_SECONDS = Histogram('storage_io_seconds', "JSON/DB o'qish va yozish vaqti", ('backend', 'op', 'target'))
+STORAGE_BYTES = Histogram('storage_io_bytes', "O'qilgan/yozilgan fayl hajmi", ('backend', 'op', 'target'), SIZE_BUCKETS)
+
+LOOP_LAG_SECONDS = Histogram('event_loop_lag_seconds', "Event loop uyg'onish kechikishi (Watchdog.py)")
+LOOP_BLOCKS = Counter('event_loop_blocks_total', "Bo'sag'adan uzoq bloklanishlar, aybdor funksiya bo'yicha", ('culprit',))
+
+_fsm_storage = None
+FSM_STATES = Gauge('bot_fsm_states', "Har bir FSM holatidagi suhbatlar soni", ('state',),
+                   fn=lambda: _fsm_state_counts())
+
+
+def observe_storage(backend: str, op: str, target: str, seconds: float, size: int = None):
+    STORAGE_SECONDS.observe(seconds, backend, op, target)
+    if size is not None:
+        STORAGE_BYTES.observe(size, backend, op, target)
+
+
+def _fsm_state_counts() -> dict:
+    storage = _fsm_storage
+    if storage is None:
+        return {}
+    if hasattr(storage, 'state_counts'):
+        counts = storage.state_counts()
+    else:
+        # aiogram MemoryStorage: {key: MemoryStorageRecord(data, state)}
+        counts = {}
+        for record in getattr(storage, 'storage', {}).values():
+            state = getattr(record, 'state', None)
+            if state is not None:
+                counts[state] = counts.get(state, 0) + 1
+    return {(state,): count for state, count in counts.items()}
+
+# --------------------------------------------------------------------------------------
+# aiogram integratsiyasi
+# --------------------------------------------------------------------------------------
+
+async def handler_middleware(handler, event, data):
+    """Inner middleware: data['handler'] - tanlangan handler (HandlerObject)."""
+    callback = getattr(data.get('handler'), 'callback', None)
+    router = getattr(callback, '__module__', 'unknown')
+    name = getattr(callback, '__name__', 'unknown')
+    start = time.perf_counter()
+    try:
+        return await handler(event, data)
+    except Exception as e:
+        HANDLER_ERRORS.inc(router, name, type(e).__name__)
+        raise
+    finally:
+        HANDLER_SECONDS.observe(time.perf_counter() - start, router, name)
+
+
+def install(dp):
+    """Dispatcher handlerlariga middleware qo'yadi. Inner middleware ichki routerlarga ham
+    tarqaladi (aiogram chain_head bo'ylab yig'adi), shuning uchun faqat dp ga qo'yiladi."""
+    global _fsm_storage
+    _fsm_storage = dp.storage
+    for event_name, observer in dp.observers.items():
+        if event_name not in ('update', 'error'):
+            observer.middleware(handler_middleware)
+
+
+def telegram_middleware():
+    from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+    class TelegramMetrics(BaseRequestMiddleware):
+        async def __call__(self, make_request, bot, method):
+            name = method.__api_method__
+            start = time.perf_counter()
+            try:
+                return await make_request(bot, method)
+            except Exception as e:
+                TELEGRAM_ERRORS.inc(name, type(e).__name__)
+                raise
+            finally:
+                TELEGRAM_SECONDS.observe(time.perf_counter() - start, name)
+
+    return TelegramMetrics()
+
+# --------------------------------------------------------------------------------------
+# /metrics HTTP server
+# --------------------------------------------------------------------------------------
+
+async def start_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """/metrics serverini ishga tushiradi. web.AppRunner (to'xtatish uchun) yoki None qaytaradi."""
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(body=render().encode('utf-8'),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        print(f"XATO: Metrikalar serverini {host}:{port} da ochib bo'lmadi: {e}")
+        await runner.cleanup()
+        return None
+    print(f"Metrikalar: http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,138 @@
+# bot/ProductCard.py (Mahsulot kartochkasini chizish va keshlash)
+#
+# send_product_card va update_product_card bir xil matn va klaviaturani shu yerdan oladi.
+# Natija (product_id, versiya, miqdor) bo'yicha keshlanadi; admin mahsulot qo'shganda
+# yoki o'chirganda invalidate_product() versiyani oshiradi. Har bir xabarda oxirgi
+# ko'rsatilgan kalit eslab qolinadi, shuning uchun o'zgarmagan tahrir yuborilmaydi.
+# CATALOG_MODE=paged bo'lganda barcha mahsulotlar bitta sahifalangan xabarda chiziladi.
+
+import os
+from collections import OrderedDict
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+# ----------------- Sozlamalar -----------------
+RENDER_CACHE_SIZE = 2000
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "5"))
+SHOWN_CACHE_SIZE = 20000
+
+_versions = {}            # product_id -> versiya
+_rendered = OrderedDict()  # (product_id, versiya, miqdor) -> (caption, reply_markup)
+_shown = OrderedDict()     # (chat_id, message_id) -> card_key() yoki katalog sahifasi kaliti
+
+
+def _remember(cache: OrderedDict, key, value, limit: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def invalidate_product(product_id):
+    """Mahsulot o'zgarganda (qo'shildi/o'chirildi) uning keshlangan kartochkalarini bekor qiladi."""
+    product_id = str(product_id)
+    _versions[product_id] = _versions.get(product_id, 0) + 1
+    for key in [k for k in _rendered if k[0] == product_id]:
+        del _rendered[key]
+
+
+def card_key(product_id: str, quantity: int):
+    return (str(product_id), _versions.get(str(product_id), 0), quantity)
+
+
+def _build(product_id: str, product: dict, quantity: int):
+    if 'price_with_cap' in product and 'price_without_cap' in product:
+        price_text = f"💰 Narx: {product['price_with_cap']:,} so'm (bachok bilan)\n       {product['price_without_cap']:,} so'm (bachoksiz)"
+    else:
+        price_text = f"💰 Narx: {product.get('price', 0):,} so'm"
+
+    caption = (
+        f"*{product['name']}*\n\n"
+        f"📝 {product['description']}\n"
+        f"{price_text}\n"
+        f"📊 Savatchada: {quantity} ta"
+    )
+
+    keyboard = [
+        [
+            InlineKeyboardButton(text="➖", callback_data=f"dec_{product_id}"),
+            InlineKeyboardButton(text=f"📦 {quantity}", callback_data=f"show_{product_id}"),
+            InlineKeyboardButton(text="➕", callback_data=f"inc_{product_id}")
+        ]
+    ]
+    if quantity > 0:
+        keyboard.append([InlineKeyboardButton(text="🛒 Buyurtma Qilish", callback_data=f"order_{product_id}")])
+
+    return caption, InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+def render_product_card(product_id: str, product: dict, quantity: int):
+    """Kartochka matni va klaviaturasini (caption, reply_markup) qaytaradi (keshdan, bo'lsa)."""
+    key = card_key(product_id, quantity)
+    cached = _rendered.get(key)
+    if cached is None:
+        cached = _build(product_id, product, quantity)
+    _remember(_rendered, key, cached, RENDER_CACHE_SIZE)
+    return cached
+
+# --------------------------------------------------------------------------------------
+# Sahifalangan katalog (bitta xabar)
+# --------------------------------------------------------------------------------------
+
+def _price_line(product: dict) -> str:
+    if 'price_with_cap' in product and 'price_without_cap' in product:
+        return f"{product['price_with_cap']:,} / {product['price_without_cap']:,} so'm (bachok bilan / bachoksiz)"
+    return f"{product.get('price', 0):,} so'm"
+
+
+def render_catalog_page(products: dict, cart: dict, page: int):
+    """
+    Katalogning bitta sahifasini chizadi. (key, text, reply_markup, page) qaytaradi;
+    page chegaradan chiqsa to'g'rilanadi, key esa o'zgarmagan tahrirni aniqlash uchun.
+    """
+    items = list(products.items())
+    pages = max(1, (len(items) + CATALOG_PAGE_SIZE - 1) // CATALOG_PAGE_SIZE)
+    page = min(max(page, 0), pages - 1)
+    page_items = items[page * CATALOG_PAGE_SIZE:(page + 1) * CATALOG_PAGE_SIZE]
+
+    lines = [f"🛍 *Mahsulotlar* ({page + 1}/{pages})\n"]
+    keyboard = []
+    for number, (product_id, product) in enumerate(page_items, start=page * CATALOG_PAGE_SIZE + 1):
+        quantity = cart.get(product_id, 0)
+        lines.append(
+            f"*{number}. {product['name']}*\n"
+            f"📝 {product['description']}\n"
+            f"💰 {_price_line(product)}\n"
+            f"📊 Savatchada: {quantity} ta\n"
+        )
+        keyboard.append([
+            InlineKeyboardButton(text="➖", callback_data=f"cat_dec_{product_id}_{page}"),
+            InlineKeyboardButton(text=f"{number}. 📦 {quantity}", callback_data=f"show_{product_id}"),
+            InlineKeyboardButton(text="➕", callback_data=f"cat_inc_{product_id}_{page}")
+        ])
+
+    # Butun savatcha bitta buyurtma sifatida rasmiylashtiriladi
+    cart_count = sum(quantity for product_id, quantity in cart.items() if product_id in products)
+    if cart_count > 0:
+        keyboard.append([InlineKeyboardButton(text=f"🛒 Buyurtma Qilish ({cart_count} ta)", callback_data="order_cart")])
+    if pages > 1:
+        keyboard.append([
+            InlineKeyboardButton(text="⬅️", callback_data=f"cat_page_{(page - 1) % pages}"),
+            InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="cat_noop"),
+            InlineKeyboardButton(text="➡️", callback_data=f"cat_page_{(page + 1) % pages}")
+        ])
+
+    key = ('catalog', page, pages, cart_count, tuple(card_key(pid, cart.get(pid, 0)) for pid, _ in page_items))
+    return key, "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=keyboard), page
+
+# --------------------------------------------------------------------------------------
+# Xabarda ko'rsatilgan kartochkani kuzatish
+# --------------------------------------------------------------------------------------
+
+def is_shown(chat_id: int, message_id: int, key) -> bool:
+    """Xabarda aynan shu kalitdagi kartochka/sahifa allaqachon ko'rsatilganmi (tahrir keraksiz)."""
+    return _shown.get((chat_id, message_id)) == key
+
+
+def mark_shown(chat_id: int, message_id: int, key):
+    _remember(_shown, (chat_id, message_id), key, SHOWN_CACHE_SIZE)
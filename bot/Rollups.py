@@ -0,0 +1,156 @@
+# bot/Rollups.py (Kuryer daromadi bo'yicha kunlik yig'ma hisoblagichlar)
+#
+# Har bir kuryer uchun har kun alohida "savat" saqlanadi: yetkazilgan zakazlar soni,
+# savdo summasi, komissiya va shu kungi zakaz ID lari. callback_delivered_order
+# zakazni yetkazilgan deb belgilaganda savat yangilanadi, hisobotlar esa butun
+# buyurtmalar tarixini emas, faqat kerakli kunlarning savatlarini qo'shadi.
+
+from datetime import date, timedelta
+
+import Storage
+from Clock import order_ts, day_of
+
+# ----------------- Konstanta -----------------
+# Kuryer uchun komissiya foizi (10%)
+COMMISSION_RATE = 0.10
+
+# Hisobotlarda ko'rsatiladigan oxirgi zakazlar soni
+ORDERS_LIST_LIMIT = 10
+
+COLLECTION = 'courier_rollups'   # {courier_id: {"YYYY-MM-DD": bucket}}
+
+
+def _empty_bucket():
+    return {'count': 0, 'sales': 0, 'commission': 0, 'order_ids': []}
+
+
+def order_event_ts(order: dict) -> int:
+    """Yetkazilgan vaqt (epoch); bo'lmasa yaratilgan vaqt, u ham bo'lmasa 0."""
+    return order_ts(order, 'delivered') or order_ts(order, 'created') or 0
+
+
+def order_day(order: dict) -> str:
+    ts = order_event_ts(order)
+    return day_of(ts) if ts else ''
+
+
+def order_commission(order: dict) -> int:
+    return int(order.get('total', 0) * COMMISSION_RATE)
+
+
+def _add_to(rollups: dict, courier_id: str, order: dict):
+    bucket = rollups.setdefault(courier_id, {}).setdefault(order_day(order), _empty_bucket())
+    bucket['count'] += 1
+    bucket['sales'] += order.get('total', 0)
+    bucket['commission'] += order_commission(order)
+    bucket['order_ids'].append(order.get('order_id'))
+
+
+def _load():
+    rollups = Storage.get_collection(COLLECTION)
+    if not rollups and any(True for _ in Storage.iter_orders_by_status('delivered')):
+        # Birinchi ishga tushirish yoki migratsiya: tarixdan qayta quramiz
+        Storage.save_collection(COLLECTION, rebuild())
+    return rollups
+
+# --------------------------------------------------------------------------------------
+# Yangilash
+# --------------------------------------------------------------------------------------
+
+def record_delivery(courier_id, order: dict):
+    """Zakaz yetkazilganda chaqiriladi: kuryerning shu kungi savatini oshiradi."""
+    rollups = _load()
+    _add_to(rollups, str(courier_id), order)
+    Storage.mark_collection_dirty(COLLECTION)
+
+
+def rebuild() -> dict:
+    """Barcha yetkazilgan zakazlar tarixidan savatlarni noldan quradi."""
+    rollups = {}
+    for _, order in Storage.iter_orders_by_status('delivered'):
+        courier_id = order.get('courier_id')
+        if courier_id is not None:
+            _add_to(rollups, str(courier_id), order)
+    return rollups
+
+
+def verify():
+    """Saqlangan savatlarni tarixdan qurilgani bilan solishtiradi. Farqlar ro'yxatini qaytaradi."""
+    # _load() emas: bo'sh kolleksiya avtomatik qayta qurilmasligi, balki farq sifatida chiqishi kerak
+    stored = Storage.get_collection(COLLECTION)
+    expected = rebuild()
+    diffs = []
+    for courier_id in sorted(set(stored) | set(expected)):
+        days_stored = stored.get(courier_id, {})
+        days_expected = expected.get(courier_id, {})
+        for day in sorted(set(days_stored) | set(days_expected)):
+            a = days_stored.get(day, _empty_bucket())
+            b = days_expected.get(day, _empty_bucket())
+            for key in ('count', 'sales', 'commission'):
+                if a[key] != b[key]:
+                    diffs.append((courier_id, day, key, a[key], b[key]))
+            if sorted(map(str, a['order_ids'])) != sorted(map(str, b['order_ids'])):
+                diffs.append((courier_id, day, 'order_ids', len(a['order_ids']), len(b['order_ids'])))
+    return diffs
+
+# --------------------------------------------------------------------------------------
+# Hisobot
+# --------------------------------------------------------------------------------------
+
+def _days_in_range(days: dict, start_date: str = None, end_date: str = None):
+    """Oraliqqa tushgan mavjud kunlarni qaytaradi (qisqa oraliqda faqat o'sha kunlar tekshiriladi)."""
+    if not start_date or not end_date:
+        return list(days.keys())
+    try:
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except ValueError:
+        return [day for day in days if start_date <= day <= end_date]
+    span = (end - start).days + 1
+    if span <= 0:
+        return []
+    if span > len(days):
+        return [day for day in days if start_date <= day <= end_date]
+    return [d for d in ((start + timedelta(days=i)).isoformat() for i in range(span)) if d in days]
+
+
+def courier_stats(courier_id: str, target_date: str = None, start_date: str = None, end_date: str = None):
+    """
+    aggregate_courier_stats bilan bir xil natija qaytaradi, lekin faqat kunlik savatlardan.
+    orders_list da eng oxirgi ORDERS_LIST_LIMIT ta zakaz bo'ladi.
+    """
+    if target_date:
+        start_date = end_date = target_date
+    days = _load().get(str(courier_id), {})
+    selected = sorted(_days_in_range(days, start_date, end_date), reverse=True)
+
+    count = sales = commission = 0
+    orders_list = []
+    for day in selected:
+        bucket = days[day]
+        count += bucket['count']
+        sales += bucket['sales']
+        commission += bucket['commission']
+
+        if len(orders_list) >= ORDERS_LIST_LIMIT:
+            continue
+        day_orders = []
+        for order_id in bucket['order_ids']:
+            _, order = Storage.get_order(order_id)
+            if order is None:
+                continue
+            day_orders.append({
+                'order_id': order.get('order_id'),
+                'total': order.get('total', 0),
+                'commission': order_commission(order),
+                'date': order.get('delivered_at', order.get('date', "Noma'lum sana")),
+                'ts': order_event_ts(order)
+            })
+        day_orders.sort(key=lambda x: x['ts'], reverse=True)
+        orders_list.extend(day_orders[:ORDERS_LIST_LIMIT - len(orders_list)])
+
+    return {
+        'orders_list': orders_list,
+        'count': count,
+        'total_sales': sales,
+        'total_commission': commission
+    }
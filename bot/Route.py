@@ -0,0 +1,84 @@
+# bot/Route.py (Kuryer uchun bir nechta manzilli marshrut rejasi)
+#
+# Kuryerning on_delivery buyurtmalari uchun borish tartibi tuziladi: avval eng yaqin
+# qo'shni (nearest neighbour) bilan boshlang'ich yo'l, keyin 2-opt bilan yaxshilash.
+# Masofalar matritsasi bir marta hisoblanadi; 30+ manzil uchun bir necha millisekund.
+# Yo'l ochiq: kuryer oxirgi manzilda qoladi, boshlang'ich nuqtaga qaytmaydi.
+
+from Geo import haversine_km
+
+# Google Maps yo'nalish havolasiga sig'adigan oraliq nuqtalar soni
+GOOGLE_DIR_MAX_POINTS = 10
+
+
+def distance_matrix(points: list) -> list:
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        lat1, lon1 = points[i]
+        row = matrix[i]
+        for j in range(i + 1, n):
+            d = haversine_km(lat1, lon1, points[j][0], points[j][1])
+            row[j] = d
+            matrix[j][i] = d
+    return matrix
+
+
+def nearest_neighbour(matrix: list, start: int = 0) -> list:
+    n = len(matrix)
+    route = [start]
+    unvisited = set(range(n)) - {start}
+    while unvisited:
+        row = matrix[route[-1]]
+        nxt = min(unvisited, key=row.__getitem__)
+        route.append(nxt)
+        unvisited.remove(nxt)
+    return route
+
+
+def route_length(route: list, matrix: list) -> float:
+    return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+
+def two_opt(route: list, matrix: list) -> list:
+    """Ochiq yo'l uchun 2-opt: birinchi nuqta (start) joyida qoladi."""
+    route = list(route)
+    n = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            d_ab = matrix[a][b]
+            for j in range(i + 1, n):
+                c = route[j]
+                if j + 1 < n:
+                    d = route[j + 1]
+                    delta = matrix[a][c] + matrix[b][d] - d_ab - matrix[c][d]
+                else:
+                    # Oxirgi kesma: yo'l ochiq, keyingi nuqta yo'q
+                    delta = matrix[a][c] - d_ab
+                if delta < -1e-9:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+                    a, b = route[i - 1], route[i]
+                    d_ab = matrix[a][b]
+    return route
+
+
+def plan_route(start: tuple, stops: list):
+    """
+    start - (lat, lon), stops - [(lat, lon), ...].
+    (stops indekslari tashrif tartibida, umumiy km) qaytaradi.
+    """
+    if not stops:
+        return [], 0.0
+    matrix = distance_matrix([start] + list(stops))
+    route = two_opt(nearest_neighbour(matrix, 0), matrix)
+    return [i - 1 for i in route[1:]], route_length(route, matrix)
+
+
+def directions_link(start: tuple, stops: list) -> str:
+    """Google Maps yo'nalish havolasi (dastlabki GOOGLE_DIR_MAX_POINTS ta manzil)."""
+    points = [start] + list(stops[:GOOGLE_DIR_MAX_POINTS])
+    return "https://www.google.com/maps/dir/" + "/".join(f"{lat:.6f},{lon:.6f}" for lat, lon in points)
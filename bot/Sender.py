@@ -0,0 +1,183 @@
+# bot/Sender.py (Telegramga chiquvchi so'rovlar rejalashtiruvchisi)
+#
+# Bot sessiyasiga request-middleware sifatida ulanadi, shuning uchun Client, Admin va
+# Kuryer dagi barcha send_message / copy_to / edit_* chaqiruvlari avtomatik shu yerdan
+# o'tadi. Umumiy token-bucket (sekundiga ~30 so'rov) barcha usullarga, har bir chat uchun
+# alohida chegara esa faqat yangi xabarlarga (send*/copy/forward) qo'llanadi - tahrirlar va
+# callback javoblari handlerni chat chegarasida kuttirmaydi. Tranzaksion xabarlar
+# xabarnomadan (broadcast) oldin yuboriladi. RetryAfter (flood-wait) kelsa, so'rov
+# (chatsiz usullar ham) kutib qayta yuboriladi.
+
+import os
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+# ----------------- Sozlamalar -----------------
+GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))          # xabar/sekund, butun bot
+GLOBAL_BURST = float(os.getenv("SEND_GLOBAL_BURST", "30"))
+PRIVATE_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))       # xabar/sekund, bitta shaxsiy chat
+PRIVATE_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "10"))
+GROUP_CHAT_RATE = float(os.getenv("SEND_GROUP_RATE", str(20 / 60)))  # guruhlar: 20 xabar/daqiqa
+GROUP_CHAT_BURST = float(os.getenv("SEND_GROUP_BURST", "3"))
+MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+# Long polling so'rovi cheklovchidan o'tmaydi
+UNTHROTTLED_METHODS = {'getUpdates'}
+
+# Chatga yangi xabar qo'shadigan usullar (chat chegarasi faqat shularga)
+FORWARD_METHODS = {'copyMessage', 'copyMessages', 'forwardMessage', 'forwardMessages'}
+
+
+def is_new_message(method_name: str) -> bool:
+    if method_name in FORWARD_METHODS:
+        return True
+    return method_name.startswith('send') and method_name != 'sendChatAction'
+
+
+# Navbatlar (kichik raqam - yuqori ustuvorlik)
+PRIORITY_TRANSACTIONAL = 0
+PRIORITY_BROADCAST = 1
+
+_priority = contextvars.ContextVar('send_priority', default=PRIORITY_TRANSACTIONAL)
+
+
+@contextmanager
+def broadcast_priority():
+    """Ichidagi barcha yuborishlar past ustuvorlikdagi (xabarnoma) navbatga tushadi."""
+    token = _priority.set(PRIORITY_BROADCAST)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Keyingi token uchun necha soniya kutish kerakligi (0 - hozir mavjud)."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """Barcha chiquvchi so'rovlar uchun umumiy va chat bo'yicha cheklovchi."""
+
+    CHAT_BUCKETS_LIMIT = 10000
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self.chat_buckets = {}
+        self._lanes = {PRIORITY_TRANSACTIONAL: deque(), PRIORITY_BROADCAST: deque()}
+        self._pump_task = None
+
+    # ----------------- Chat bo'yicha cheklov -----------------
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.CHAT_BUCKETS_LIMIT:
+                self._drop_idle_buckets()
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(GROUP_CHAT_RATE, GROUP_CHAT_BURST) if is_group else TokenBucket(PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _drop_idle_buckets(self):
+        now = time.monotonic()
+        for chat_id in [c for c, b in self.chat_buckets.items() if b.wait_time() == 0 and b.tokens >= b.burst and now > b.blocked_until]:
+            del self.chat_buckets[chat_id]
+
+    async def _acquire_chat(self, chat_id):
+        bucket = self._chat_bucket(chat_id)
+        while True:
+            wait = bucket.wait_time()
+            if wait <= 0:
+                bucket.take()
+                return
+            await asyncio.sleep(wait)
+
+    # ----------------- Umumiy cheklov (ustuvorlik navbatlari bilan) -----------------
+
+    async def _acquire_global(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append(future)
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    def _next_waiter(self):
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            while lane:
+                future = lane.popleft()
+                if not future.done():
+                    return future
+        return None
+
+    async def _pump(self):
+        while any(self._lanes.values()):
+            wait = self.global_bucket.wait_time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            future = self._next_waiter()
+            if future is None:
+                break
+            self.global_bucket.take()
+            future.set_result(None)
+
+    # ----------------- Middleware -----------------
+
+    async def __call__(self, make_request, bot, method):
+        name = getattr(method, '__api_method__', '')
+        if name in UNTHROTTLED_METHODS:
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, 'chat_id', None)
+        # Chat chegarasi faqat yangi xabarlarga qo'llanadi. Tahrirlar, callback javoblari va
+        # chatsiz usullar (getMe, setMyCommands, ...) faqat umumiy chegara va qayta urinishdan o'tadi
+        per_chat = chat_id is not None and is_new_message(name)
+        priority = _priority.get()
+        attempt = 0
+        while True:
+            if per_chat:
+                await self._acquire_chat(chat_id)
+            await self._acquire_global(priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if per_chat:
+                    self._chat_bucket(chat_id).block(e.retry_after)
+                if attempt > MAX_RETRIES:
+                    raise
+                print(f"Flood-wait: {name} (chat {chat_id}), {e.retry_after} s kutilmoqda ({attempt}/{MAX_RETRIES}).")
+                if not per_chat:
+                    await asyncio.sleep(e.retry_after)
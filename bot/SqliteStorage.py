@@ -0,0 +1,285 @@
+# bot/SqliteStorage.py (SQLite saqlash usuli: STORAGE_BACKEND=sqlite bo'lganda ishlatiladi)
+#
+# Har bir buyurtma alohida qator, shuning uchun bitta buyurtmani yangilash butun
+# bazani emas, faqat bitta qatorni yozadi.
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id         TEXT PRIMARY KEY,
+    name            TEXT,
+    phone           TEXT,
+    username        TEXT,
+    registered_date TEXT,
+    data            TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    user_id      TEXT NOT NULL,
+    order_id     TEXT NOT NULL,
+    seq          INTEGER NOT NULL,
+    status       TEXT,
+    courier_id   TEXT,
+    date         TEXT,
+    delivered_at TEXT,
+    total        INTEGER,
+    data         TEXT NOT NULL,
+    PRIMARY KEY (user_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_orders_order_id ON orders (order_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+CREATE INDEX IF NOT EXISTS idx_orders_courier ON orders (courier_id, status, delivered_at);
+
+CREATE TABLE IF NOT EXISTS products (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS couriers (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS admin_sessions (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS courier_sessions (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS courier_rollups (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id   TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    job_id TEXT PRIMARY KEY,
+    data   TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id  TEXT,
+    order_id TEXT,
+    rating   INTEGER,
+    date     TEXT,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ratings_order ON ratings (order_id);
+
+CREATE TABLE IF NOT EXISTS complaints (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    date    TEXT,
+    data    TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    date    TEXT,
+    data    TEXT NOT NULL
+);
+"""
+
+# Kolleksiya nomi -> jadval nomi (nomlar bir xil, ro'yxat faqat ruxsat etilganlarni cheklaydi)
+COLLECTION_TABLES = {name: name for name in ('products', 'couriers', 'admin_sessions', 'courier_sessions', 'courier_rollups', 'counters', 'broadcasts')}
+STREAM_TABLES = {name: name for name in ('ratings', 'complaints', 'comments')}
+
+
+UPSERT_USER = (
+    "INSERT INTO users (user_id, name, phone, username, registered_date, data) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET name=excluded.name, phone=excluded.phone, "
+    "username=excluded.username, registered_date=excluded.registered_date, data=excluded.data"
+)
+
+UPSERT_ORDER = (
+    "INSERT INTO orders (user_id, order_id, seq, status, courier_id, date, delivered_at, total, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id, seq) DO UPDATE SET order_id=excluded.order_id, status=excluded.status, "
+    "courier_id=excluded.courier_id, date=excluded.date, delivered_at=excluded.delivered_at, "
+    "total=excluded.total, data=excluded.data"
+)
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+class SqliteBackend:
+    """Storage.py uchun SQLite saqlash usuli (JsonBackend bilan bir xil interfeys)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # Storage.flush_async() write_*_snapshot ni oqimlar hovuzida bajaradi. Bitta ulanishdagi
+        # tranzaksiyalar aralashib ketmasligi uchun har bir so'rov self.lock ostida.
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.lock = threading.RLock()
+        self._written = {}   # kolleksiya -> {id: data} - jadvalda turgan qatorlar nusxasi
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # ----------------- Foydalanuvchilar va buyurtmalar -----------------
+
+    def load_users(self):
+        db = {}
+        with self.lock:
+            for user_id, data in self.conn.execute("SELECT user_id, data FROM users"):
+                user = json.loads(data)
+                user['orders'] = []
+                db[user_id] = user
+            for user_id, data in self.conn.execute("SELECT user_id, data FROM orders ORDER BY user_id, seq"):
+                if user_id in db:
+                    db[user_id]['orders'].append(json.loads(data))
+        return db
+
+    @staticmethod
+    def _user_row(user_id, user):
+        fields = {k: v for k, v in user.items() if k != 'orders'}
+        return (user_id, user.get('name'), user.get('phone'), user.get('username'),
+                user.get('registered_date'), _dumps(fields))
+
+    @staticmethod
+    def _order_row(user_id, seq, order):
+        courier_id = order.get('courier_id')
+        return (user_id, str(order.get('order_id')), seq, order.get('status'),
+                str(courier_id) if courier_id is not None else None,
+                order.get('date'), order.get('delivered_at'), order.get('total'), _dumps(order))
+
+    def snapshot_users(self, db, dirty_users, dirty_orders):
+        """Loop oqimida: o'zgargan foydalanuvchi/buyurtmalarning tayyor qatorlari."""
+        users, orders = [], []
+        for user_id in dirty_users:
+            user = db.get(user_id)
+            if user is None:
+                users.append((user_id, None, []))
+                continue
+            order_rows = [self._order_row(user_id, seq, order) for seq, order in enumerate(user.get('orders', []))]
+            users.append((user_id, self._user_row(user_id, user), order_rows))
+
+        for user_id, order_id in dirty_orders:
+            if user_id in dirty_users or user_id not in db:
+                continue
+            for seq, order in enumerate(db[user_id].get('orders', [])):
+                if order.get('order_id') == order_id:
+                    orders.append(self._order_row(user_id, seq, order))
+                    break
+        return users, orders
+
+    def write_users_snapshot(self, snapshot):
+        users, orders = snapshot
+        with self.lock, self.conn:
+            for user_id, user_row, order_rows in users:
+                if user_row is None:
+                    self.conn.execute("DELETE FROM orders WHERE user_id = ?", (user_id,))
+                    self.conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+                    continue
+                self.conn.execute(UPSERT_USER, user_row)
+                self.conn.execute("DELETE FROM orders WHERE user_id = ? AND seq >= ?", (user_id, len(order_rows)))
+                self.conn.executemany(UPSERT_ORDER, order_rows)
+            self.conn.executemany(UPSERT_ORDER, orders)
+
+    def write_users(self, db, dirty_users, dirty_orders):
+        self.write_users_snapshot(self.snapshot_users(db, dirty_users, dirty_orders))
+
+    # ----------------- Kolleksiyalar (products, couriers, sessiyalar) -----------------
+
+    def _stored_rows(self, name) -> dict:
+        """Jadvaldagi hozirgi qatorlar {id: data}; o'zgarmagan kalitlarni qayta yozmaslik uchun."""
+        rows = self._written.get(name)
+        if rows is None:
+            table = COLLECTION_TABLES[name]
+            rows = self._written[name] = dict(self.conn.execute(f"SELECT id, data FROM {table}"))
+        return rows
+
+    def load_collection(self, name):
+        with self.lock:
+            return {key: json.loads(data) for key, data in self._stored_rows(name).items()}
+
+    def snapshot_collection(self, name, data):
+        return {str(key): _dumps(value) for key, value in data.items()}
+
+    def write_collection_snapshot(self, name, rows):
+        """Faqat o'zgargan kalitlar upsert, o'chirilganlari delete qilinadi (write_users kabi)."""
+        table = COLLECTION_TABLES[name]
+        with self.lock:
+            stored = self._stored_rows(name)
+            changed = [(key, data) for key, data in rows.items() if stored.get(key) != data]
+            removed = [(key,) for key in stored if key not in rows]
+            if not changed and not removed:
+                return
+            with self.conn:
+                self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", removed)
+                self.conn.executemany(
+                    f"INSERT INTO {table} (id, data) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET data=excluded.data",
+                    changed
+                )
+            stored.update(changed)
+            for (key,) in removed:
+                del stored[key]
+
+    def write_collection(self, name, data):
+        self.write_collection_snapshot(name, self.snapshot_collection(name, data))
+
+    # ----------------- Oqimlar (ratings, complaints, comments) -----------------
+
+    def load_records(self, stream):
+        table = STREAM_TABLES[stream]
+        with self.lock:
+            return [json.loads(data) for (data,) in self.conn.execute(f"SELECT data FROM {table} ORDER BY id")]
+
+    def append_record(self, stream, record):
+        table = STREAM_TABLES[stream]
+        user_id = record.get('user_id')
+        user_id = str(user_id) if user_id is not None else None
+        with self.lock, self.conn:
+            if table == 'ratings':
+                self.conn.execute(
+                    "INSERT INTO ratings (user_id, order_id, rating, date, data) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, record.get('order_id'), record.get('rating'), record.get('date'), _dumps(record))
+                )
+            else:
+                self.conn.execute(
+                    f"INSERT INTO {table} (user_id, date, data) VALUES (?, ?, ?)",
+                    (user_id, record.get('date'), _dumps(record))
+                )
+
+    # ----------------- Xabarnoma qabul qiluvchilari (bir marta yoziladi) -----------------
+
+    def write_recipients(self, job_id, recipient_ids):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO broadcast_recipients (job_id, data) VALUES (?, ?)",
+                (job_id, json.dumps(recipient_ids))
+            )
+
+    def load_recipients(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM broadcast_recipients WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def delete_recipients(self, job_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM broadcast_recipients WHERE job_id = ?", (job_id,))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,781 @@
+# bot/Storage.py (Umumiy ma'lumotlar qatlami: barcha routerlar shu modul orqali ishlaydi)
+#
+# Ma'lumotlar bot ishga tushganda bir marta o'qiladi, o'qishlar xotiradan bajariladi,
+# o'zgarishlar esa fon vazifasi orqali to'plab diskka yoziladi (write-behind).
+# Saqlash usuli STORAGE_BACKEND orqali tanlanadi: "json" (standart) yoki "sqlite".
+#
+# Fayl o'qish-yozish event loop da emas, cheklangan oqimlar hovuzida (STORAGE_IO_WORKERS)
+# bajariladi: flush_async() / preload() / run_io(). Hovuzga jonli ma'lumot emas, loop da
+# olingan nusxa (faqat o'zgargan yozuvlar qayta kodlanadi) beriladi. Bitta faylga bir
+# vaqtda faqat bitta yozuvchi yozadi (har bir fayl uchun alohida qulf).
+
+import os
+import json
+import time
+import asyncio
+import threading
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import Journal
+import Metrics
+from Geo import GridIndex, point_of
+
+# ----------------- Fayl yo'llari -----------------
+# BOT_DATA_DIR boshqa katalogni ko'rsatishi mumkin (masalan, bench.py sintetik ma'lumotlari)
+BASE_DIR = Path(os.getenv("BOT_DATA_DIR", Path(__file__).parent))
+
+DATABASE_FILE = BASE_DIR / 'database.json'
+SQLITE_FILE = Path(os.getenv("SQLITE_PATH", BASE_DIR / 'shukrona.db'))
+
+# Xabarnoma qabul qiluvchilari ro'yxati (bir marta yoziladi, har bir ish uchun alohida fayl)
+RECIPIENTS_DIR = BASE_DIR / 'broadcast_recipients'
+
+# Kolleksiya / oqim nomi -> JSON fayl
+JSON_FILES = {
+    'products': BASE_DIR / 'products.json',
+    'couriers': BASE_DIR / 'couriers.json',
+    'admin_sessions': BASE_DIR / 'admin.json',
+    'courier_sessions': BASE_DIR / 'courier_sessions.json',
+    'ratings': BASE_DIR / 'ratings.json',
+    'complaints': BASE_DIR / 'complaints.json',
+    'comments': BASE_DIR / 'comments.json',
+    'courier_rollups': BASE_DIR / 'courier_rollups.json',
+    'counters': BASE_DIR / 'counters.json',
+    'broadcasts': BASE_DIR / 'broadcasts.json',
+}
+
+COLLECTIONS = ('products', 'couriers', 'admin_sessions', 'courier_sessions', 'courier_rollups', 'counters', 'broadcasts')
+STREAMS = ('ratings', 'complaints', 'comments')
+
+# ----------------- Sozlamalar -----------------
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").strip().lower()
+
+# Xotiradagi o'zgarishlar diskka necha soniyada bir marta yoziladi
+FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", "5"))
+
+# Fayl I/O va JSON serializatsiyasi uchun oqimlar soni
+IO_WORKERS = int(os.getenv("STORAGE_IO_WORKERS", "2"))
+
+# --------------------------------------------------------------------------------------
+# JSON fayllar bilan ishlash
+# --------------------------------------------------------------------------------------
+
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def _file_lock(path: Path) -> threading.Lock:
+    """Har bir fayl uchun bitta qulf: yozuvchilar navbat bilan yozadi (oqimlar o'rtasida ham)."""
+    with _file_locks_guard:
+        lock = _file_locks.get(path)
+        if lock is None:
+            lock = _file_locks[path] = threading.Lock()
+        return lock
+
+
+def _encode_entry(key, value) -> str:
+    """json.dump(..., indent=4) dagi bitta yuqori darajali '"kalit": qiymat' bo'lagi."""
+    text = json.dumps(value, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+    return f"    {json.dumps(str(key), ensure_ascii=False)}: {text}"
+
+
+def _read_json_file(path: Path, default):
+    if not path.exists():
+        return default
+    start = time.perf_counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            size = f.tell()
+    except (json.JSONDecodeError, IOError):
+        return default
+    Metrics.observe_storage('file', 'read', path.name, time.perf_counter() - start, size)
+    return data
+
+
+def _write_json_chunks(path: Path, chunks: list):
+    """_encode_entry bo'laklaridan lug'at faylini atomar yozadi (json.dump indent=4 bilan bir xil matn).
+
+    Bo'laklar loop oqimida tayyorlanadi, shuning uchun bu funksiya jonli ma'lumotlarga tegmaydi
+    va oqimlar hovuzida xavfsiz ishlaydi.
+    """
+    with _file_lock(path):
+        start = time.perf_counter()
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if chunks:
+                f.write("{")
+                for i, chunk in enumerate(chunks):
+                    f.write(",\n" if i else "\n")
+                    f.write(chunk)
+                f.write("\n}")
+            else:
+                f.write("{}")
+            size = f.tell()
+        os.replace(tmp_path, path)
+    Metrics.observe_storage('file', 'write', path.name, time.perf_counter() - start, size)
+
+
+class JsonBackend:
+    """Eski JSON fayllar formatida saqlash (database.json, products.json, ...).
+
+    snapshot_* loop oqimida chaqiriladi va faqat matn bo'laklarini qaytaradi; write_*_snapshot
+    ularni oqimlar hovuzida diskka yozadi. database.json da har bir foydalanuvchining bo'lagi
+    keshda turadi va faqat o'zgarganlari qayta kodlanadi.
+    """
+
+    def __init__(self):
+        self._user_chunks = None   # {user_id: _encode_entry matni}
+
+    def load_users(self):
+        data = _read_json_file(DATABASE_FILE, {})
+        return data if isinstance(data, dict) else {}
+
+    def prime(self, db):
+        """Foydalanuvchi bo'laklari keshini to'liq quradi (ishga tushishda, oqimda)."""
+        self._user_chunks = {user_id: _encode_entry(user_id, user) for user_id, user in db.items()}
+
+    def snapshot_users(self, db, dirty_users, dirty_orders):
+        if self._user_chunks is None:
+            self.prime(db)
+        else:
+            for user_id in dirty_users | {user_id for user_id, _ in dirty_orders}:
+                user = db.get(user_id)
+                if user is None:
+                    self._user_chunks.pop(user_id, None)
+                else:
+                    self._user_chunks[user_id] = _encode_entry(user_id, user)
+            if len(self._user_chunks) != len(db):
+                # save_database() butun bazani almashtirganda o'chgan foydalanuvchilar
+                for user_id in [u for u in self._user_chunks if u not in db]:
+                    del self._user_chunks[user_id]
+        return list(self._user_chunks.values())
+
+    def write_users_snapshot(self, chunks):
+        # JSON faylni qisman yozib bo'lmaydi: bitta flush = bitta to'liq yozuv
+        _write_json_chunks(DATABASE_FILE, chunks)
+
+    def write_users(self, db, dirty_users, dirty_orders):
+        self.write_users_snapshot(self.snapshot_users(db, dirty_users, dirty_orders))
+
+    def load_collection(self, name):
+        data = _read_json_file(JSON_FILES[name], {})
+        return data if isinstance(data, dict) else {}
+
+    def snapshot_collection(self, name, data):
+        return [_encode_entry(key, value) for key, value in data.items()]
+
+    def write_collection_snapshot(self, name, chunks):
+        _write_json_chunks(JSON_FILES[name], chunks)
+
+    def write_collection(self, name, data):
+        self.write_collection_snapshot(name, self.snapshot_collection(name, data))
+
+    def load_records(self, stream):
+        return list(Journal.iter_records(JSON_FILES[stream]))
+
+    def append_record(self, stream, record):
+        # Butun ro'yxatni qayta yozish o'rniga jurnalga bitta qator qo'shiladi
+        Journal.append(Journal.journal_path(JSON_FILES[stream]), record)
+
+    def compact(self):
+        return {stream: Journal.compact(JSON_FILES[stream]) for stream in STREAMS}
+
+    def write_recipients(self, job_id, recipient_ids):
+        RECIPIENTS_DIR.mkdir(exist_ok=True)
+        path = RECIPIENTS_DIR / f"{job_id}.json"
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(recipient_ids, f)
+        os.replace(tmp_path, path)
+
+    def load_recipients(self, job_id):
+        data = _read_json_file(RECIPIENTS_DIR / f"{job_id}.json", [])
+        return data if isinstance(data, list) else []
+
+    def delete_recipients(self, job_id):
+        (RECIPIENTS_DIR / f"{job_id}.json").unlink(missing_ok=True)
+
+    def close(self):
+        self.compact()
+
+
+def create_backend(name: str = STORAGE_BACKEND):
+    if name == 'sqlite':
+        from SqliteStorage import SqliteBackend
+        return SqliteBackend(SQLITE_FILE)
+    if name != 'json':
+        print(f"XATO: Noma'lum STORAGE_BACKEND '{name}'. JSON ishlatiladi.")
+    return JsonBackend()
+
+# --------------------------------------------------------------------------------------
+# Xotiradagi holat
+# --------------------------------------------------------------------------------------
+_backend = None
+_db = None                  # {user_id_str: user_data}
+_collections = {}           # {kolleksiya_nomi: dict}
+_dirty_users = set()        # To'liq qayta yoziladigan foydalanuvchilar
+_dirty_orders = set()       # (user_id_str, order_id) - faqat bitta buyurtma o'zgargan
+_dirty_collections = set()  # O'zgargan kolleksiya nomlari
+
+# Buyurtmalar bo'yicha ikkilamchi indekslar (har bir buyurtma yozuvida yangilanadi)
+_order_index = {}           # order_id -> (user_id_str, position)
+_status_index = {}          # status -> {order_id}
+_courier_index = {}         # courier_id_str -> {order_id}
+_indexed = {}               # order_id -> (status, courier_id_str) - indekslangan oxirgi holat
+_user_order_ids = {}        # user_id_str -> [order_id] - foydalanuvchining indekslangan buyurtmalari
+_pending_geo = GridIndex()  # kuryer olmagan pending buyurtmalar koordinatalari (order_id -> lat, lon)
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def _ensure_loaded():
+    global _db
+    if _db is None:
+        start = time.perf_counter()
+        _db = _get_backend().load_users()
+        Metrics.observe_storage(STORAGE_BACKEND, 'read', 'users', time.perf_counter() - start)
+        _rebuild_indexes()
+    return _db
+
+# --------------------------------------------------------------------------------------
+# Buyurtma indekslari
+# --------------------------------------------------------------------------------------
+
+def _unindex_order(order_id):
+    old = _indexed.pop(order_id, None)
+    _order_index.pop(order_id, None)
+    _pending_geo.remove(order_id)
+    if old is None:
+        return
+    status, courier_id = old
+    _status_index.get(status, set()).discard(order_id)
+    if courier_id is not None:
+        _courier_index.get(courier_id, set()).discard(order_id)
+
+
+def _index_order(user_id, position, order):
+    order_id = order.get('order_id')
+    if order_id is None:
+        return
+    owner = _order_index.get(order_id)
+    if owner is not None and owner[0] != user_id:
+        print(f"XATO: Buyurtma ID takrorlangan: {order_id} ({owner[0]} va {user_id})")
+    _unindex_order(order_id)
+
+    status = order.get('status')
+    courier_id = order.get('courier_id')
+    courier_id = str(courier_id) if courier_id is not None else None
+
+    _order_index[order_id] = (user_id, position)
+    _indexed[order_id] = (status, courier_id)
+    _status_index.setdefault(status, set()).add(order_id)
+    if courier_id is not None:
+        _courier_index.setdefault(courier_id, set()).add(order_id)
+    elif status == 'pending':
+        point = point_of(order.get('location_geo'))
+        if point is not None:
+            _pending_geo.add(order_id, *point)
+
+
+def _reindex_user(user_id):
+    for order_id in _user_order_ids.pop(user_id, ()):
+        if _order_index.get(order_id, (None,))[0] == user_id:
+            _unindex_order(order_id)
+    user = _db.get(user_id) if _db is not None else None
+    if not user:
+        return
+    order_ids = []
+    for position, order in enumerate(user.get('orders', [])):
+        _index_order(user_id, position, order)
+        order_ids.append(order.get('order_id'))
+    _user_order_ids[user_id] = order_ids
+
+
+def _rebuild_indexes():
+    for index in (_order_index, _status_index, _courier_index, _indexed, _user_order_ids, _pending_geo):
+        index.clear()
+    for user_id in _db:
+        _reindex_user(user_id)
+
+
+def _get_collection(name):
+    if name not in _collections:
+        start = time.perf_counter()
+        _collections[name] = _get_backend().load_collection(name)
+        Metrics.observe_storage(STORAGE_BACKEND, 'read', name, time.perf_counter() - start)
+    return _collections[name]
+
+
+def _save_collection(name, data):
+    current = _get_collection(name)
+    if data is not current:
+        current.clear()
+        current.update(data)
+    _dirty_collections.add(name)
+    return True
+
+# --------------------------------------------------------------------------------------
+# Foydalanuvchilar va buyurtmalar (database.json)
+# --------------------------------------------------------------------------------------
+
+def load_database():
+    """Butun bazaning xotiradagi nusxasini qaytaradi (diskdan qayta o'qilmaydi)."""
+    return _ensure_loaded()
+
+
+def save_database(data):
+    """Butun bazani yozishga belgilaydi. Disk yozuvi flush() da bajariladi."""
+    db = _ensure_loaded()
+    if data is not db:
+        db.clear()
+        db.update(data)
+    _rebuild_indexes()
+    _dirty_users.update(db.keys())
+    return True
+
+
+def get_user_data(user_id):
+    return _ensure_loaded().get(str(user_id), None)
+
+
+def save_user_data(user_id, data):
+    _ensure_loaded()[str(user_id)] = data
+    _reindex_user(str(user_id))
+    _dirty_users.add(str(user_id))
+
+
+def mark_dirty(user_id):
+    """Joyida o'zgartirilgan foydalanuvchi yozuvini diskka yozishga belgilaydi."""
+    _ensure_loaded()
+    _reindex_user(str(user_id))
+    _dirty_users.add(str(user_id))
+
+
+def add_order(user_id, order):
+    """Foydalanuvchiga yangi buyurtma qo'shadi va indekslarga kiritadi."""
+    user_id = str(user_id)
+    user = _ensure_loaded()[user_id]
+    orders = user.setdefault('orders', [])
+    orders.append(order)
+    _index_order(user_id, len(orders) - 1, order)
+    _user_order_ids.setdefault(user_id, []).append(order.get('order_id'))
+    _dirty_orders.add((user_id, order.get('order_id')))
+
+
+def save_order(user_id, order):
+    """Foydalanuvchining bitta buyurtmasi o'zgarganini belgilaydi (SQLite da bitta qator yoziladi)."""
+    user_id = str(user_id)
+    order_id = order.get('order_id')
+    _ensure_loaded()
+    location = _order_index.get(order_id)
+    if location is not None and location[0] == user_id:
+        _index_order(user_id, location[1], order)
+    else:
+        _reindex_user(user_id)
+    _dirty_orders.add((user_id, order_id))
+
+
+def get_order(order_id):
+    """order_id bo'yicha (user_id, order) ni O(1) da qaytaradi. Topilmasa (None, None)."""
+    _ensure_loaded()
+    order_id = str(order_id)
+    location = _order_index.get(order_id)
+    if location is None:
+        return None, None
+    user_id, position = location
+    orders = _db.get(user_id, {}).get('orders', [])
+    if position >= len(orders) or orders[position].get('order_id') != order_id:
+        # Ro'yxat indekslanmasdan o'zgartirilgan: shu foydalanuvchini qayta indekslaymiz
+        _reindex_user(user_id)
+        location = _order_index.get(order_id)
+        if location is None:
+            return None, None
+        user_id, position = location
+        orders = _db[user_id]['orders']
+    return user_id, orders[position]
+
+
+def iter_orders_by_status(status):
+    """Berilgan statusdagi buyurtmalarni (user_id, order) ko'rinishida qaytaradi."""
+    _ensure_loaded()
+    for order_id in list(_status_index.get(status, ())):
+        user_id, order = get_order(order_id)
+        if order is not None:
+            yield user_id, order
+
+
+def iter_orders_by_courier(courier_id, status=None):
+    """Kuryerga biriktirilgan buyurtmalarni qaytaradi (ixtiyoriy status filtri bilan)."""
+    _ensure_loaded()
+    for order_id in list(_courier_index.get(str(courier_id), ())):
+        if status is not None and _indexed.get(order_id, (None,))[0] != status:
+            continue
+        user_id, order = get_order(order_id)
+        if order is not None:
+            yield user_id, order
+
+
+def iter_pending_orders_near(latitude, longitude, radius_km):
+    """
+    Kuryer olmagan pending buyurtmalarni berilgan nuqtadan radius_km ichida, yaqinidan
+    boshlab (distance_km, user_id, order) ko'rinishida qaytaradi (katakli geo indeks orqali).
+    """
+    _ensure_loaded()
+    for distance, order_id in _pending_geo.within(latitude, longitude, radius_km):
+        user_id, order = get_order(order_id)
+        if order is not None and order.get('status') == 'pending':
+            yield distance, user_id, order
+
+
+def get_all_user_ids():
+    return [int(user_id) for user_id in _ensure_loaded().keys()]
+
+
+def order_items(order):
+    """
+    Buyurtma qatorlari ro'yxati: [{product_id, product_name, price, quantity, total, with_cap}].
+    Eski (bitta mahsulotli) buyurtmalar uchun qator yuqori darajadagi maydonlardan tuziladi.
+    """
+    items = order.get('items')
+    if isinstance(items, list):
+        return items
+    return [{
+        'product_id': order.get('product_id'),
+        'product_name': order.get('product_name', "Noma'lum"),
+        'price': order.get('price', 0),
+        'quantity': order.get('quantity', 0),
+        'total': order.get('total', 0),
+        'with_cap': order.get('with_cap'),
+    }]
+
+# --------------------------------------------------------------------------------------
+# Buyurtma holatlari: pending -> on_delivery -> delivered (+ bekor qilish)
+# --------------------------------------------------------------------------------------
+ORDER_TRANSITIONS = {
+    'pending': {'on_delivery', 'cancelled'},
+    'on_delivery': {'delivered', 'cancelled'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+
+# Bekor qilish mumkin bo'lgan holatlar
+CANCELLABLE_STATUSES = ('pending', 'on_delivery')
+
+_order_lock = threading.Lock()
+
+
+def transition_order(order_id, expected_status, new_status, updates=None, owner_id=None, courier_id=None):
+    """
+    Buyurtma holatini compare-and-set bilan o'zgartiradi: joriy status expected_status ga teng
+    bo'lsa (va owner_id / courier_id berilgan bo'lsa ular ham mos kelsa) new_status va updates
+    bir vaqtda yoziladi. Muvaffaqiyatda (user_id, order), aks holda (None, None) qaytaradi.
+    Bir vaqtda kelgan so'rovlardan faqat birinchisi yutadi.
+    """
+    if new_status not in ORDER_TRANSITIONS.get(expected_status, ()):
+        print(f"XATO: Ruxsat etilmagan o'tish: {expected_status} -> {new_status}")
+        return None, None
+    with _order_lock:
+        user_id, order = get_order(order_id)
+        if order is None or order.get('status') != expected_status:
+            return None, None
+        if owner_id is not None and user_id != str(owner_id):
+            return None, None
+        if courier_id is not None and order.get('courier_id') != str(courier_id):
+            return None, None
+        order.update(updates or {})
+        order['status'] = new_status
+        save_order(user_id, order)
+        return user_id, order
+
+
+def cancel_order(order_id, statuses=CANCELLABLE_STATUSES, updates=None, owner_id=None):
+    """
+    Buyurtmani bekor qiladi: statuses dagi har bir holat uchun transition_order (compare-and-set)
+    sinab ko'riladi. Kuryer bir vaqtda qabul qilsa ham, faqat bittasi yutadi.
+    (user_id, order, oldingi_status) yoki (None, None, None) qaytaradi.
+    """
+    for status in statuses:
+        user_id, order = transition_order(order_id, status, 'cancelled', updates=updates, owner_id=owner_id)
+        if order is not None:
+            return user_id, order, status
+    return None, None, None
+
+# --------------------------------------------------------------------------------------
+# ID ajratuvchi (buyurtma va mahsulot ID lari)
+# --------------------------------------------------------------------------------------
+# Eski buyurtma ID lari vaqt belgisidan iborat edi (YYYYmmddHHMMSS, 14 xona).
+# Yangi ID lar ketma-ket sonlar, shuning uchun ular bilan hech qachon to'qnashmaydi.
+LEGACY_ORDER_ID_LENGTH = 14
+
+_counter_lock = threading.Lock()
+_seeded_counters = set()
+
+
+def _max_existing_id(sequence):
+    if sequence == 'order':
+        keys = (k for k in _order_index if len(str(k)) < LEGACY_ORDER_ID_LENGTH)
+    elif sequence == 'product':
+        keys = _get_collection('products').keys()
+    elif sequence == 'broadcast':
+        keys = _get_collection('broadcasts').keys()
+    else:
+        return 0
+    return max((int(k) for k in keys if str(k).isdigit()), default=0)
+
+
+def allocate_id(sequence):
+    """Ketma-ketlik uchun yangi, takrorlanmas va o'suvchi ID qaytaradi ('order', 'product', 'broadcast')."""
+    _ensure_loaded()
+    with _counter_lock:
+        counters = _get_collection('counters')
+        if sequence not in _seeded_counters:
+            # Hisoblagich diskka yozilmay qolgan bo'lsa ham mavjud ID lardan pastga tushmaydi
+            counters[sequence] = max(counters.get(sequence, 0), _max_existing_id(sequence))
+            _seeded_counters.add(sequence)
+        counters[sequence] += 1
+        while sequence == 'order' and str(counters[sequence]) in _order_index:
+            counters[sequence] += 1
+        _dirty_collections.add('counters')
+        return str(counters[sequence])
+
+# --------------------------------------------------------------------------------------
+# Mahsulotlar, kuryerlar va sessiyalar
+# --------------------------------------------------------------------------------------
+
+def get_collection(name):
+    """Kolleksiyaning xotiradagi nusxasi (Rollups va boshqa yordamchi modullar uchun)."""
+    return _get_collection(name)
+
+
+def save_collection(name, data):
+    return _save_collection(name, data)
+
+
+def mark_collection_dirty(name):
+    _dirty_collections.add(name)
+
+
+def load_products():
+    return _get_collection('products')
+
+
+def save_products(data):
+    return _save_collection('products', data)
+
+
+def load_couriers():
+    return _get_collection('couriers')
+
+
+def save_couriers(data):
+    return _save_collection('couriers', data)
+
+
+def load_admin_sessions():
+    return _get_collection('admin_sessions')
+
+
+def save_admin_sessions(data):
+    return _save_collection('admin_sessions', data)
+
+
+def load_courier_sessions():
+    return _get_collection('courier_sessions')
+
+
+def save_courier_sessions(data):
+    return _save_collection('courier_sessions', data)
+
+# --------------------------------------------------------------------------------------
+# Baholar, shikoyatlar va izohlar (faqat qo'shiladigan yozuvlar)
+# --------------------------------------------------------------------------------------
+
+def load_ratings():
+    return _get_backend().load_records('ratings')
+
+
+def save_rating(rating_data):
+    _get_backend().append_record('ratings', rating_data)
+
+
+def load_complaints():
+    return _get_backend().load_records('complaints')
+
+
+def save_complaint(complaint_data):
+    _get_backend().append_record('complaints', complaint_data)
+
+
+def load_comments():
+    return _get_backend().load_records('comments')
+
+
+def save_comment(comment_data):
+    _get_backend().append_record('comments', comment_data)
+
+
+def save_broadcast_recipients(job_id, recipient_ids: list):
+    """Xabarnoma qabul qiluvchilarini alohida, o'zgarmaydigan joyga yozadi (kolleksiyaga emas)."""
+    _get_backend().write_recipients(str(job_id), list(recipient_ids))
+
+
+def load_broadcast_recipients(job_id) -> list:
+    return _get_backend().load_recipients(str(job_id))
+
+
+def delete_broadcast_recipients(job_id):
+    _get_backend().delete_recipients(str(job_id))
+
+
+def compact_journals():
+    """Jurnallarni snapshot fayllarga qo'shadi (faqat JSON usulida, SQLite da kerak emas)."""
+    backend = _get_backend()
+    if hasattr(backend, 'compact'):
+        return backend.compact()
+    return {}
+
+# --------------------------------------------------------------------------------------
+# Diskka yozish (write-behind)
+# --------------------------------------------------------------------------------------
+
+def _take_flush_jobs():
+    """Iflos to'plamlarni bo'shatib, yoziladigan ishlar ro'yxatini qaytaradi.
+
+    Har bir ish: (nishon, yozish funksiyasi, xato bo'lsa qayta belgilash funksiyasi).
+    Loop oqimida chaqiriladi: o'zgargan yozuvlarning nusxasi (snapshot) shu yerda olinadi,
+    yozish funksiyasi esa faqat o'sha nusxani oladi va oqimlar hovuzida xavfsiz ishlaydi.
+    """
+    backend = _get_backend()
+    jobs = []
+
+    if _db is not None and (_dirty_users or _dirty_orders):
+        users, orders = set(_dirty_users), set(_dirty_orders)
+        _dirty_users.clear()
+        _dirty_orders.clear()
+
+        def restore():
+            _dirty_users.update(users)
+            _dirty_orders.update(orders)
+        try:
+            snapshot = backend.snapshot_users(_db, users, orders)
+            jobs.append(('users', partial(backend.write_users_snapshot, snapshot), restore))
+        except Exception as e:
+            _flush_failed('users', restore, e)
+
+    for name in list(_dirty_collections):
+        _dirty_collections.discard(name)
+        restore = partial(_dirty_collections.add, name)
+        try:
+            snapshot = backend.snapshot_collection(name, _collections[name])
+            jobs.append((name, partial(backend.write_collection_snapshot, name, snapshot), restore))
+        except Exception as e:
+            _flush_failed(name, restore, e)
+    return jobs
+
+
+def _run_flush_job(target, write):
+    start = time.perf_counter()
+    write()
+    Metrics.observe_storage(STORAGE_BACKEND, 'write', target, time.perf_counter() - start)
+
+
+def _flush_failed(target, restore, error):
+    restore()
+    if target == 'users':
+        print(f"XATO: Foydalanuvchilar bazasini saqlashda xato yuz berdi: {error}")
+    else:
+        print(f"XATO: '{target}' kolleksiyasini saqlashda xato yuz berdi: {error}")
+
+
+def flush():
+    """To'plangan o'zgarishlarni bitta yozuvda diskka tushiradi (sinxron: skriptlar va to'xtash uchun)."""
+    wrote = False
+    for target, write, restore in _take_flush_jobs():
+        try:
+            _run_flush_job(target, write)
+            wrote = True
+        except Exception as e:
+            _flush_failed(target, restore, e)
+    return wrote
+
+
+_io_pool = None
+
+
+def _get_io_pool() -> ThreadPoolExecutor:
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=max(1, IO_WORKERS), thread_name_prefix="storage-io")
+    return _io_pool
+
+
+async def run_io(func, *args):
+    """Bloklovchi fayl/JSON ishini oqimlar hovuzida bajaradi va natijasini kutadi."""
+    return await asyncio.get_running_loop().run_in_executor(_get_io_pool(), partial(func, *args))
+
+
+async def flush_async():
+    """flush() ning loop ni to'xtatmaydigan varianti: yozuvlar oqimlar hovuzida bajariladi.
+
+    Yozuv paytida o'zgargan yozuvlar qayta iflos deb belgilanadi va keyingi flush da yoziladi.
+    Turli fayllar parallel yoziladi, bitta faylga esa _file_lock navbat bilan kiritadi.
+    """
+    jobs = _take_flush_jobs()
+    if not jobs:
+        return False
+    try:
+        results = await asyncio.gather(*(run_io(_run_flush_job, target, write) for target, write, _ in jobs),
+                                       return_exceptions=True)
+    except asyncio.CancelledError:
+        # Bot to'xtamoqda: yozuv tugadimi-yo'qmi noma'lum, close_storage() qayta yozsin
+        for _, _, restore in jobs:
+            restore()
+        raise
+    wrote = False
+    for (target, _, restore), result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            _flush_failed(target, restore, result)
+        else:
+            wrote = True
+    return wrote
+
+
+async def preload():
+    """Bot ishga tushganda baza va kolleksiyalarni oqimda o'qib oladi (birinchi handler kutmaydi)."""
+    await run_io(_ensure_loaded)
+    backend = _get_backend()
+    if hasattr(backend, 'prime'):
+        # database.json bo'laklari keshi: birinchi flush butun bazani loop da kodlamasin
+        await run_io(backend.prime, _db)
+    for name in COLLECTIONS:
+        await run_io(_get_collection, name)
+
+
+async def flush_loop(interval: float = FLUSH_INTERVAL):
+    """Fon vazifasi: har `interval` soniyada o'zgarishlarni diskka yozadi."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush_async()
+        except Exception as e:
+            print(f"XATO: Bazani diskka yozishda kutilmagan xato: {e}")
+
+
+def close_storage():
+    """Bot to'xtaganda chaqiriladi: qolgan barcha o'zgarishlarni yozadi."""
+    global _io_pool
+    # Avval hovuzda boshlangan yozuvlar tugashini kutamiz
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=True)
+        _io_pool = None
+    flush()
+    if _backend is not None:
+        _backend.close()
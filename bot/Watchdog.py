@@ -0,0 +1,105 @@
+# bot/Watchdog.py (Event loop kechikishini kuzatuvchi: bloklovchi chaqiruvlarni topish)
+#
+# Loop ichidagi yurak urishi (heartbeat) har WATCHDOG_INTERVAL_MS da vaqtni belgilaydi va
+# uyg'onish kechikishini (lag) Metrics ga yozadi. Alohida daemon-oqim shu belgini kuzatadi:
+# belgi WATCHDOG_THRESHOLD_MS dan ko'proq eskirsa, loop hozir sinxron kod ichida qotgan
+# bo'ladi - oqim sys._current_frames() orqali loop oqimining stekini oladi, aybdor
+# funksiyani (bot kodidagi eng ichki kadr) Metrics ga sanaydi va stekni logga chiqaradi.
+# Loop ga qo'shimcha yuk sekundiga ~20 ta qisqa uyg'onish, shuning uchun doim yoqiq turadi.
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from pathlib import Path
+
+import Metrics
+
+# ----------------- Sozlamalar -----------------
+THRESHOLD = float(os.getenv("WATCHDOG_THRESHOLD_MS", "100")) / 1000   # 0 - o'chiq
+INTERVAL = float(os.getenv("WATCHDOG_INTERVAL_MS", "50")) / 1000
+STACK_LIMIT = int(os.getenv("WATCHDOG_STACK_LIMIT", "12"))
+
+BOT_DIR = Path(__file__).resolve().parent
+
+
+def culprit(frame) -> str:
+    """Stekdagi eng ichki bot kodi kadri: 'Modul.funksiya' (kutubxona ichida qotsa ham)."""
+    fallback = None
+    while frame is not None:
+        path = Path(frame.f_code.co_filename)
+        name = f"{path.stem}.{frame.f_code.co_name}"
+        if fallback is None:
+            fallback = name
+        if path.parent == BOT_DIR and path.name != 'Watchdog.py':
+            return name
+        frame = frame.f_back
+    return fallback or 'unknown'
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = THRESHOLD, interval: float = INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self._beat = time.monotonic()
+        self._reported_beat = None   # shu yurak urishi uchun stek allaqachon olinganmi
+        self._loop_thread = None
+        self._task = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._beat - self.interval)
+            Metrics.LOOP_LAG_SECONDS.observe(lag)
+
+    def _monitor(self):
+        # Bo'sag'aning yarmida tekshiramiz, shunda qisqa bloklar ham qotgan paytida ushlanadi
+        while not self._stop.wait(min(self.interval, self.threshold / 2)):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or self._reported_beat == beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            name = culprit(frame)
+            Metrics.LOOP_BLOCKS.inc(name)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            print(f"OGOHLANTIRISH: Event loop {stalled * 1000:.0f} ms dan beri bloklangan ({name}):\n{stack}")
+            del frame
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_watchdog = None
+
+
+def start_watchdog():
+    """Loop ichidan chaqiriladi. WATCHDOG_THRESHOLD_MS=0 bo'lsa hech narsa qilmaydi."""
+    global _watchdog
+    if THRESHOLD <= 0 or _watchdog is not None:
+        return _watchdog
+    _watchdog = LoopWatchdog().start()
+    return _watchdog
+
+
+def stop_watchdog():
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
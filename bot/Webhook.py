@@ -0,0 +1,93 @@
+# bot/Webhook.py (Webhook rejimi: o'zining aiohttp serveri bilan)
+#
+# RUN_MODE=webhook bo'lganda app.py polling o'rniga shu serverni ishga tushiradi.
+# Telegram har bir yangilanishni POST qiladi; maxfiy token tekshiriladi, javob darhol
+# qaytariladi, yangilanish esa fonda WEBHOOK_WORKERS tadan oshmagan parallel ishchi
+# tomonidan qayta ishlanadi. /health load balancer tekshiruvlari uchun.
+
+import os
+import asyncio
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+# ----------------- Sozlamalar -----------------
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")                 # masalan: https://shukrona.koyeb.app
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("PORT", os.getenv("WEBHOOK_PORT", "8000")))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int = WEBHOOK_WORKERS):
+        self.dp = dp
+        self.bot = bot
+        self.semaphore = asyncio.Semaphore(max(1, workers))
+        self.tasks = set()
+        self.app = web.Application()
+        self.app.router.add_post(WEBHOOK_PATH, self.handle_update)
+        self.app.router.add_get("/health", self.handle_health)
+
+    # ----------------- HTTP handlerlar -----------------
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and request.headers.get(SECRET_HEADER) != WEBHOOK_SECRET:
+            return web.Response(status=401, text="Unauthorized")
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            print(f"XATO: Webhook yangilanishini o'qib bo'lmadi: {e}")
+            return web.Response(status=400, text="Bad Request")
+
+        task = asyncio.create_task(self._process(update))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.Response(text="ok")
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({'status': 'ok', 'in_flight': len(self.tasks)})
+
+    async def _process(self, update: Update):
+        async with self.semaphore:
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                print(f"XATO: Yangilanish #{update.update_id} ni qayta ishlashda xato: {e}")
+
+    # ----------------- Ishga tushirish -----------------
+
+    async def run(self):
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL is not set for RUN_MODE=webhook.")
+        if not WEBHOOK_SECRET:
+            print("OGOHLANTIRISH: WEBHOOK_SECRET o'rnatilmagan, so'rovlar manbasi tekshirilmaydi.")
+
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+        await site.start()
+
+        await self.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=self.dp.resolve_used_update_types(),
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        )
+        print(f"Webhook server {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH} da ishlamoqda (ishchilar: {WEBHOOK_WORKERS}).")
+
+        await self.dp.emit_startup(bot=self.bot, dispatcher=self.dp, bots=[self.bot])
+        try:
+            await asyncio.Event().wait()
+        finally:
+            # Navbatdagi yangilanishlarni yakunlashga imkon beramiz
+            if self.tasks:
+                await asyncio.wait(self.tasks, timeout=10)
+            await self.dp.emit_shutdown(bot=self.bot, dispatcher=self.dp, bots=[self.bot])
+            await runner.cleanup()
+            await self.bot.session.close()
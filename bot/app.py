@@ -14,6 +14,14 @@ from aiogram.types import BotCommand
 from Client import setup_client_handlers 
 from Admin import setup_admin_handlers 
 from Kuryer import setup_kuryer_handlers
+from Storage import flush_loop, close_storage, preload
+from FsmStorage import SqliteFsmStorage
+from Sender import SendScheduler
+from Broadcast import resume_broadcasts, stop_broadcasts
+from AutoDispatch import resume_auto_dispatch, stop_auto_dispatch
+from Webhook import WebhookServer
+import Metrics
+from Watchdog import start_watchdog, stop_watchdog
 
 # ----------------- Asosiy Sozlashlar -----------------
 
@@ -22,16 +30,41 @@ load_dotenv()
 
 API_TOKEN = os.getenv("BOT_TOKEN")
 
-if not API_TOKEN:
-    print("XATO: .env faylida BOT_TOKEN topilmadi. Tokeningizni tekshiring!")
-    raise ValueError("BOT_TOKEN is not set in .env file.")
+# polling (standart) yoki webhook (Webhook.py dagi WEBHOOK_* sozlamalari bilan)
+RUN_MODE = os.getenv("RUN_MODE", "polling").strip().lower()
 
-# ... qolgan kod o'zgarmaydi
 
 # ------------------ Bot Obyektlarini Yaratish ------------------
-storage = MemoryStorage() 
-bot = Bot(token=API_TOKEN)
-dp = Dispatcher(storage=storage)
+# Fabrikalar loadtest.py ham haqiqiy Dispatcher ni soxta Bot API server bilan ishlatishi uchun.
+# Routerlar modul darajasida, shuning uchun create_dispatcher() jarayonda bir marta chaqiriladi.
+
+def create_fsm_storage():
+    # FSM holatlari diskda saqlanadi (qayta ishga tushganda suhbatlar davom etadi).
+    # FSM_STORAGE=memory bo'lsa eski MemoryStorage ishlatiladi.
+    if os.getenv("FSM_STORAGE", "sqlite").strip().lower() == "memory":
+        return MemoryStorage()
+    return SqliteFsmStorage()
+
+
+def create_bot(token: str = API_TOKEN, session=None) -> Bot:
+    if not token:
+        print("XATO: .env faylida BOT_TOKEN topilmadi. Tokeningizni tekshiring!")
+        raise ValueError("BOT_TOKEN is not set in .env file.")
+    bot = Bot(token=token, session=session)
+    # Barcha chiquvchi xabarlar umumiy tezlik cheklovchisi orqali o'tadi (flood-wait oldini olish)
+    bot.session.middleware(SendScheduler())
+    # Har bir Bot API so'rovining vaqti va xatolari (/metrics)
+    bot.session.middleware(Metrics.telegram_middleware())
+    return bot
+
+
+def create_dispatcher(storage=None) -> Dispatcher:
+    dp = Dispatcher(storage=storage if storage is not None else create_fsm_storage())
+    setup_client_handlers(dp)
+    setup_admin_handlers(dp)
+    setup_kuryer_handlers(dp)
+    Metrics.install(dp)
+    return dp
 
 
 # ------------------ Buyruqlar Ro'yxati ------------------
@@ -43,19 +76,45 @@ async def set_default_commands(bot: Bot):
     await bot.set_my_commands(commands)
 
 
-# ------------------ Handlerlarni Bog'lash ------------------
-setup_client_handlers(dp)
-setup_admin_handlers(dp) 
-setup_kuryer_handlers(dp)
-
-
 # ------------------ Botni Ishga Tushirish ------------------
 async def main():
     print("Bot ishga tushmoqda...")
-    
+    bot = create_bot()
+    dp = create_dispatcher()
+    # Baza va kolleksiyalar oqimda o'qiladi (event loop bloklanmaydi)
+    await preload()
+
     await set_default_commands(bot)
     
-    await dp.start_polling(bot)
+    # Bazani fon rejimida diskka yozib turish (write-behind)
+    flush_task = asyncio.create_task(flush_loop())
+    background_tasks = [flush_task]
+    if isinstance(dp.storage, SqliteFsmStorage):
+        background_tasks.append(asyncio.create_task(dp.storage.evict_loop()))
+    # To'xtab qolgan xabarnomalarni davom ettirish
+    resume_broadcasts(bot)
+    # AUTO_DISPATCH: kuryersiz qolgan buyurtmalarni qayta taklif qilish
+    resume_auto_dispatch(bot)
+    # Prometheus uchun /metrics (METRICS_PORT=0 bo'lsa o'chiq)
+    metrics_runner = await Metrics.start_server()
+    # Event loop ni bloklayotgan sinxron kodni topish (WATCHDOG_THRESHOLD_MS=0 o'chiradi)
+    start_watchdog()
+    try:
+        if RUN_MODE == "webhook":
+            await WebhookServer(dp, bot).run()
+        else:
+            # Avval webhook o'rnatilgan bo'lsa, getUpdates ishlashi uchun uni o'chiramiz
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        stop_broadcasts()
+        stop_auto_dispatch()
+        stop_watchdog()
+        close_storage()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
 
 if __name__ == '__main__':
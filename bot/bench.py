@@ -0,0 +1,322 @@
+# bot/bench.py (Sintetik ma'lumotlar bilan saqlash va hisobot yo'llarini o'lchash)
+#
+# Foydalanish:
+#   python bench.py generate --out bench_data [--users 100000] [--orders 1000000] [--seed 42]
+#   python bench.py run --data bench_data [--samples 2000] [--repeat 3] [--output result.json]
+#
+# generate: database.json, products.json, couriers.json, courier_sessions.json va
+# ratings.json ni bir xil seed bilan qayta tiklanadigan qilib yozadi.
+# run: Storage ni BOT_DATA_DIR orqali shu katalogga ulaydi, har bir amalni o'lchaydi va
+# p50/p99 (ms) hamda eng yuqori xotira (RSS, MB) ni JSON ko'rinishida chiqaradi.
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# Toshkent atrofidagi koordinatalar
+CENTER_LAT, CENTER_LON = 41.311, 69.279
+SPREAD_DEG = 0.15
+
+# Buyurtma holatlari ulushi (yig'indisi 1)
+STATUS_WEIGHTS = {'delivered': 0.90, 'cancelled': 0.04, 'on_delivery': 0.03, 'pending': 0.03}
+
+DAY = 86400
+UZB_OFFSET = 5 * 3600
+
+
+# --------------------------------------------------------------------------------------
+# Sintetik ma'lumotlar generatori
+# --------------------------------------------------------------------------------------
+def _fmt(ts: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts + UZB_OFFSET))
+
+
+def _point(rng: random.Random) -> dict:
+    return {
+        'latitude': round(CENTER_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+        'longitude': round(CENTER_LON + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+    }
+
+
+def _make_products(count: int) -> dict:
+    products = {}
+    for i in range(1, count + 1):
+        products[str(i)] = {
+            'id': str(i),
+            'name': f"Suv {i * 5}L",
+            'description': f"Toza ichimlik suvi, {i * 5} litr",
+            'price_with_cap': 20000 + i * 5000,
+            'price_without_cap': 15000 + i * 5000,
+            'image': None,
+            'created_at': "2025-01-01 09:00:00",
+        }
+    return products
+
+
+def _make_order(rng, order_id, products, couriers, now, days):
+    created = now - rng.randint(0, days * DAY)
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+    lines = []
+    for product_id in rng.sample(list(products), k=rng.randint(1, min(3, len(products)))):
+        product = products[product_id]
+        with_cap = rng.random() < 0.3
+        price = product['price_with_cap'] if with_cap else product['price_without_cap']
+        quantity = rng.randint(1, 4)
+        lines.append({
+            'product_id': product_id,
+            'product_name': product['name'],
+            'price': price,
+            'quantity': quantity,
+            'total': price * quantity,
+            'with_cap': with_cap,
+        })
+    order = {
+        'order_id': str(order_id),
+        'items': lines,
+        'total': sum(line['total'] for line in lines),
+        'date': _fmt(created),
+        'created_ts': created,
+        'status': status,
+        'rated': False,
+        'location_geo': _point(rng),
+        'location_text': "Chilonzor",
+        'delivery_time': "Hozir",
+        'comment': '',
+    }
+    if status in ('on_delivery', 'delivered'):
+        accepted = created + rng.randint(30, 900)
+        order.update({'courier_id': rng.choice(couriers), 'accepted_at': _fmt(accepted), 'accepted_ts': accepted})
+        if status == 'delivered':
+            delivered = accepted + rng.randint(600, 3600)
+            order.update({
+                'delivered_at': _fmt(delivered), 'delivered_ts': delivered,
+                'commission_amount': int(order['total'] * 0.10),
+            })
+    return order
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    now = int(time.time())
+
+    products = _make_products(args.products)
+    courier_ids = [str(7_000_000_000 + i) for i in range(args.couriers)]
+    couriers = {
+        courier_id: {'id': courier_id, 'username': f"kuryer{i}", 'added_by': "1", 'added_at': "2025-01-01 09:00:00"}
+        for i, courier_id in enumerate(courier_ids)
+    }
+    sessions = {}
+    for i, courier_id in enumerate(courier_ids):
+        session = {'id': int(courier_id), 'username': f"kuryer{i}", 'first_name': f"Kuryer {i}",
+                   'login_time': _fmt(now), 'timestamp': now}
+        if i % 2 == 0:
+            session.update({'location': _point(rng), 'location_at': now})
+        sessions[courier_id] = session
+
+    # Buyurtmalar foydalanuvchilarga notekis taqsimlanadi (ko'p buyurtma qiladiganlar oz)
+    weights = [rng.paretovariate(1.5) for _ in range(args.users)]
+    scale = args.orders / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in rng.sample(range(args.users), k=max(0, args.orders - sum(counts))):
+        counts[i] += 1
+
+    ratings = []
+    order_id = 10_000_000
+    total_orders = 0
+    with open(out / 'database.json', 'w', encoding='utf-8') as f:
+        f.write('{')
+        for index, count in enumerate(counts):
+            user_id = 1_000_000_000 + index
+            orders = []
+            for _ in range(count):
+                order_id += 1
+                order = _make_order(rng, order_id, products, courier_ids, now, args.days)
+                if order['status'] == 'delivered' and rng.random() < 0.3:
+                    rated = order['delivered_ts'] + rng.randint(60, 7200)
+                    order.update({'rated': True, 'rating': rng.randint(3, 5), 'rated_at': _fmt(rated), 'rated_ts': rated})
+                    ratings.append({'user_id': user_id, 'username': f"user{index}", 'name': f"Mijoz {index}",
+                                    'order_id': order['order_id'], 'rating': order['rating'], 'date': order['rated_at']})
+                orders.append(order)
+            total_orders += count
+            user = {
+                'user_id': user_id,
+                'username': f"user{index}",
+                'name': f"Mijoz {index}",
+                'phone': f"+99890{index % 10_000_000:07d}",
+                'home_location_geo': _point(rng),
+                'home_location_text': "Yunusobod",
+                'cart': {},
+                'orders': orders,
+                'registered_date': _fmt(now - args.days * DAY),
+            }
+            f.write(('' if index == 0 else ',') + json.dumps(str(user_id)) + ':' + json.dumps(user, ensure_ascii=False))
+        f.write('}')
+
+    for name, data in (('products', products), ('couriers', couriers),
+                       ('courier_sessions', sessions), ('ratings', ratings)):
+        with open(out / f'{name}.json', 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    print(f"✅ {out}: {args.users} foydalanuvchi, {total_orders} buyurtma, {len(ratings)} baho, "
+          f"{len(couriers)} kuryer, {len(products)} mahsulot (seed={args.seed}).")
+
+
+# --------------------------------------------------------------------------------------
+# O'lchash
+# --------------------------------------------------------------------------------------
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: bayt
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _measure(fn, arguments):
+    """fn ni har bir argument bilan chaqiradi; natija millisekundlarda."""
+    timings = []
+    for args in arguments:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'n': len(timings),
+        'p50_ms': round(_percentile(timings, 0.50), 4),
+        'p99_ms': round(_percentile(timings, 0.99), 4),
+        'max_ms': round(timings[-1], 4),
+        'mean_ms': round(sum(timings) / len(timings), 4),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def run(args):
+    data_dir = Path(args.data).resolve()
+    if not (data_dir / 'database.json').exists():
+        raise SystemExit(f"XATO: {data_dir} da database.json topilmadi. Avval 'generate' ni ishga tushiring.")
+    # Storage fayl yo'llarini import paytida o'qiydi
+    os.environ['BOT_DATA_DIR'] = str(data_dir)
+    os.environ['STORAGE_BACKEND'] = 'json'
+
+    import Storage
+    import Kuryer
+    import Admin
+
+    rng = random.Random(args.seed)
+    results = {}
+
+    def cold_load():
+        Storage._db = None
+        Storage._ensure_loaded()
+
+    results['load_database'] = _measure(cold_load, [()] * args.repeat)
+    db = Storage.load_database()
+
+    def save_all():
+        Storage.save_database(db)
+        Storage.flush()
+
+    results['save_database'] = _measure(save_all, [()] * args.repeat)
+
+    user_ids = list(db.keys())
+    results['get_user_data'] = _measure(
+        Storage.get_user_data, [(rng.choice(user_ids),) for _ in range(args.samples)]
+    )
+    results['get_all_user_ids'] = _measure(Storage.get_all_user_ids, [()] * args.repeat)
+
+    couriers = list(Storage.load_couriers())
+    located = [c for c in couriers if Storage.load_courier_sessions().get(c, {}).get('location')]
+    unlocated = [c for c in couriers if c not in located]
+    iterations = max(1, args.samples // 100)
+    results['aggregate_pending_orders'] = _measure(Kuryer.aggregate_pending_orders, [()] * iterations)
+    if located:
+        results['aggregate_pending_orders_near'] = _measure(
+            Kuryer.aggregate_pending_orders, [(rng.choice(located),) for _ in range(iterations)]
+        )
+    if unlocated:
+        results['aggregate_pending_orders_courier'] = _measure(
+            Kuryer.aggregate_pending_orders, [(rng.choice(unlocated),) for _ in range(iterations)]
+        )
+
+    # Birinchi chaqiruv kunlik savatlarni tarixdan quradi: uni alohida o'lchaymiz
+    results['rollups_first_build'] = _measure(Kuryer.aggregate_courier_stats, [(couriers[0],)])
+    today = time.strftime("%Y-%m-%d", time.gmtime(time.time() + UZB_OFFSET))
+    week_ago = time.strftime("%Y-%m-%d", time.gmtime(time.time() + UZB_OFFSET - 7 * DAY))
+    picks = [(rng.choice(couriers),) for _ in range(args.samples)]
+    results['kuryer_aggregate_courier_stats'] = _measure(Kuryer.aggregate_courier_stats, picks)
+    results['kuryer_aggregate_courier_stats_today'] = _measure(
+        lambda c: Kuryer.aggregate_courier_stats(c, target_date=today), picks
+    )
+    results['kuryer_aggregate_courier_stats_week'] = _measure(
+        lambda c: Kuryer.aggregate_courier_stats(c, start_date=week_ago, end_date=today), picks
+    )
+    results['admin_aggregate_courier_stats'] = _measure(Admin.aggregate_courier_stats, picks)
+
+    gc.collect()
+    report = {
+        'meta': {
+            'data_dir': str(data_dir),
+            'users': len(db),
+            'orders': sum(len(user.get('orders', [])) for user in db.values()),
+            'couriers': len(couriers),
+            'database_bytes': (data_dir / 'database.json').stat().st_size,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+        },
+        'results': results,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shukrona bot benchmark to'plami")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('generate', help="Sintetik ma'lumotlar yaratish")
+    p.add_argument('--out', default='bench_data')
+    p.add_argument('--users', type=int, default=100_000)
+    p.add_argument('--orders', type=int, default=1_000_000)
+    p.add_argument('--couriers', type=int, default=50)
+    p.add_argument('--products', type=int, default=8)
+    p.add_argument('--days', type=int, default=365, help="Buyurtmalar necha kunga tarqaladi")
+    p.add_argument('--seed', type=int, default=42)
+    p.set_defaults(func=generate)
+
+    p = sub.add_parser('run', help="O'lchashlarni bajarish va JSON hisobot chiqarish")
+    p.add_argument('--data', default='bench_data')
+    p.add_argument('--samples', type=int, default=2000, help="Tez amallar uchun namunalar soni")
+    p.add_argument('--repeat', type=int, default=3, help="Og'ir amallar (yuklash/saqlash) takrori")
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--output', help="Natijani faylga ham yozish")
+    p.set_defaults(func=run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+# bot/loadtest.py (Soxta Bot API server bilan end-to-end yuklama testi)
+#
+# Foydalanish:
+#   python loadtest.py [--customers 50] [--couriers 5] [--admins 1] [--orders-per-customer 1]
+#                      [--latency-ms 30] [--jitter-ms 10] [--rate-limit-ratio 0.01]
+#                      [--unthrottled] [--catalog-mode cards|paged] [--output result.json]
+#
+# app.py dagi haqiqiy Dispatcher (create_dispatcher) FakeBotApi ga ulanadi va polling
+# (getUpdates) orqali ishlaydi. Mijoz, kuryer va admin sessiyalari ssenariy bo'yicha
+# yangilanishlar yuboradi: ro'yxatdan o'tish -> savatcha -> confirm_order -> kuryer
+# qabul qiladi -> yetkazildi -> baho. Natija: updates/sec, har bir oqim (flow) uchun
+# handler va end-to-end kechikish percentillari hamda Telegram chaqiruvlari soni.
+# Ma'lumotlar vaqtinchalik katalogda (BOT_DATA_DIR), haqiqiy bazaga tegilmaydi.
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import contextvars
+from collections import Counter, defaultdict
+from pathlib import Path
+
+CUSTOMER_BASE = 2_000_000_000
+COURIER_BASE = 3_000_000_000
+ADMIN_BASE = 4_000_000_000
+PASSWORD = "loadtest"
+STEP_TIMEOUT = 60
+
+# Joriy yangilanish qaysi oqimga tegishli (Telegram chaqiruvlarini oqim bo'yicha sanash uchun)
+FLOW = contextvars.ContextVar('loadtest_flow', default='other')
+
+
+def _prepare_environment(args, data_dir: Path):
+    """Bot modullari import qilinishidan oldin chaqiriladi (ular sozlamalarni import paytida o'qiydi)."""
+    customers = [CUSTOMER_BASE + i for i in range(args.customers)]
+    admins = [ADMIN_BASE + i for i in range(args.admins)]
+    os.environ.update({
+        'BOT_TOKEN': "123456:LOADTEST",
+        'BOT_DATA_DIR': str(data_dir),
+        'STORAGE_BACKEND': 'json',
+        'FSM_STORAGE': 'memory',
+        'ADMIN_IDS': ",".join(map(str, admins)) or "0",
+        'ADMIN_ID': str(admins[0] if admins else ADMIN_BASE),
+        'ADMIN_PASSWORD': PASSWORD,
+        'KURYER_PASSWORD': PASSWORD,
+        'AUTO_DISPATCH': 'on' if args.auto_dispatch else 'off',
+        'CATALOG_MODE': args.catalog_mode,
+    })
+    if args.unthrottled:
+        os.environ.update({'SEND_GLOBAL_RATE': "100000", 'SEND_GLOBAL_BURST': "100000",
+                           'SEND_CHAT_RATE': "100000", 'SEND_CHAT_BURST': "100000"})
+
+    products = {
+        '1': {'id': '1', 'name': "Suv 19L", 'description': "Bachokli suv", 'price_with_cap': 45000,
+              'price_without_cap': 25000, 'image': None, 'created_at': "2025-01-01 09:00:00"},
+        '2': {'id': '2', 'name': "Suv 5L", 'description': "Kichik idish", 'price': 12000,
+              'image': "AgACAgIAAxkBAAIBloadtest", 'created_at': "2025-01-01 09:00:00"},
+    }
+    couriers = {
+        str(COURIER_BASE + i): {'id': str(COURIER_BASE + i), 'username': f"kuryer{i}", 'added_by': str(ADMIN_BASE),
+                                'added_at': "2025-01-01 09:00:00"}
+        for i in range(args.couriers)
+    }
+    for name, data in (('products', products), ('couriers', couriers)):
+        (data_dir / f'{name}.json').write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return customers
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {'n': 0}
+    values = sorted(values)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * (len(values) - 1) + 0.5))], 3)
+
+    return {'n': len(values), 'p50_ms': pick(0.50), 'p90_ms': pick(0.90), 'p99_ms': pick(0.99),
+            'max_ms': round(values[-1], 3)}
+
+
+# --------------------------------------------------------------------------------------
+# O'lchash: yangilanish middleware va Telegram chaqiruvlari hisoblagichi
+# --------------------------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self.handler_ms = defaultdict(list)
+        self.e2e_ms = defaultdict(list)
+        self.calls = defaultdict(Counter)
+        self.errors = Counter()
+        self.waiters = {}   # update_id -> (flow, future, boshlanish vaqti)
+
+    async def update_middleware(self, handler, event, data):
+        waiter = self.waiters.pop(event.update_id, None)
+        flow = waiter[0] if waiter else 'other'
+        token = FLOW.set(flow)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.errors[flow] += 1
+            raise
+        finally:
+            end = time.perf_counter()
+            self.handler_ms[flow].append((end - start) * 1000)
+            FLOW.reset(token)
+            if waiter is not None:
+                self.e2e_ms[flow].append((end - waiter[2]) * 1000)
+                if not waiter[1].done():
+                    waiter[1].set_result(None)
+
+    def request_middleware(self):
+        from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+        recorder = self
+
+        class CallCounter(BaseRequestMiddleware):
+            async def __call__(self, make_request, bot, method):
+                recorder.calls[FLOW.get()][method.__api_method__] += 1
+                return await make_request(bot, method)
+
+        return CallCounter()
+
+
+# --------------------------------------------------------------------------------------
+# Yangilanishlarni yasash va yuborish
+# --------------------------------------------------------------------------------------
+class Driver:
+    def __init__(self, server, recorder: Recorder):
+        self.server = server
+        self.recorder = recorder
+        self.updates = 0
+
+    @staticmethod
+    def user(user_id: int, name: str) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': name, 'username': f"{name.lower()}{user_id % 100000}"}
+
+    def _message(self, user: dict, **fields) -> dict:
+        return {
+            'message_id': self.server.next_message_id(),
+            'date': int(time.time()),
+            'chat': {'id': user['id'], 'type': 'private'},
+            'from': user,
+            **fields,
+        }
+
+    async def _send(self, flow: str, update: dict):
+        update_id = self.server.next_update_id()
+        update['update_id'] = update_id
+        future = asyncio.get_running_loop().create_future()
+        self.recorder.waiters[update_id] = (flow, future, time.perf_counter())
+        self.server.push_update(update)
+        self.updates += 1
+        await asyncio.wait_for(future, STEP_TIMEOUT)
+
+    async def text(self, flow: str, user: dict, text: str):
+        await self._send(flow, {'message': self._message(user, text=text)})
+
+    async def contact(self, flow: str, user: dict, phone: str):
+        contact = {'phone_number': phone, 'first_name': user['first_name'], 'user_id': user['id']}
+        await self._send(flow, {'message': self._message(user, contact=contact)})
+
+    async def location(self, flow: str, user: dict, latitude: float, longitude: float):
+        await self._send(flow, {'message': self._message(user, location={'latitude': latitude, 'longitude': longitude})})
+
+    async def callback(self, flow: str, user: dict, data: str, message_id: int = None):
+        from FakeBotApi import BOT_USER
+
+        message = {
+            'message_id': message_id or self.server.next_message_id(),
+            'date': int(time.time()),
+            'chat': {'id': user['id'], 'type': 'private'},
+            'from': BOT_USER,
+            'text': "...",
+        }
+        query = {'id': str(self.server.next_update_id()), 'from': user, 'chat_instance': str(user['id']),
+                 'data': data, 'message': message}
+        await self._send(flow, {'callback_query': query})
+
+
+# --------------------------------------------------------------------------------------
+# Ssenariylar
+# --------------------------------------------------------------------------------------
+class FlowFailed(Exception):
+    """Ssenariy kutilgan holatga yetmadi (masalan, handler 429 tufayli to'xtadi)."""
+
+
+def _user_orders(user_id: int) -> list:
+    import Storage
+
+    return (Storage.get_user_data(user_id) or {}).get('orders', [])
+
+
+async def customer_flow(driver: Driver, user_id: int, args, deliveries: asyncio.Queue):
+    user = driver.user(user_id, "Mijoz")
+    lat, lon = 41.30 + (user_id % 97) / 1000, 69.24 + (user_id % 89) / 1000
+
+    await driver.text('registration', user, "/start")
+    await driver.text('registration', user, f"Mijoz {user_id}")
+    await driver.contact('registration', user, f"+99890{user_id % 10_000_000:07d}")
+    await driver.text('registration', user, "🏠 Mening uyimga")
+    await driver.location('registration', user, lat, lon)
+    await driver.text('registration', user, "Chilonzor 1-kvartal")
+
+    for _ in range(args.orders_per_customer):
+        await driver.text('cart', user, "🛍 Mahsulotlar")
+        if args.catalog_mode == 'paged':
+            catalog_id = driver.server.next_message_id()
+            for data in ("cat_inc_1_0", "cat_inc_1_0", "cat_inc_2_0"):
+                await driver.callback('cart', user, data, catalog_id)
+            await driver.callback('checkout', user, "order_cart", catalog_id)
+        else:
+            # Har bir mahsulot alohida kartochka: ➕/➖ bosishlar kartochka bo'yicha birlashtiriladi
+            card_ids = {product_id: driver.server.next_message_id() for product_id in ('1', '2')}
+            for data in ("inc_1", "inc_1", "inc_1", "dec_1", "inc_2"):
+                await driver.callback('cart', user, data, card_ids[data.split('_')[1]])
+            await driver.callback('checkout', user, "order_1", card_ids['1'])
+        await driver.callback('checkout', user, "with_cap_1")
+        await driver.text('checkout', user, "🏠 Mening uyimga")
+        await driver.callback('checkout', user, "delivery_now")
+        await driver.text('checkout', user, "Darvoza yonida")
+        confirm_id = driver.server.next_message_id()
+        await driver.callback('checkout', user, "location_correct", confirm_id)
+        orders_before = len(_user_orders(user_id))
+        await driver.callback('checkout', user, "confirm_order", confirm_id)
+
+        orders = _user_orders(user_id)
+        if len(orders) <= orders_before:
+            raise FlowFailed(f"mijoz {user_id}: buyurtma yaratilmadi")
+        order_id = orders[-1]['order_id']
+        delivered = asyncio.get_running_loop().create_future()
+        await deliveries.put((user_id, order_id, delivered))
+        await delivered
+
+        rating_id = driver.server.next_message_id()
+        await driver.callback('rating', user, f"delivered_{order_id}", rating_id)
+        await driver.callback('rating', user, "rate_5", rating_id)
+
+
+async def courier_flow(driver: Driver, courier_id: int, deliveries: asyncio.Queue):
+    import Storage
+
+    user = driver.user(courier_id, "Kuryer")
+    await driver.text('courier', user, f"/kuryer {PASSWORD}")
+    await driver.location('courier', user, 41.31, 69.28)
+
+    while True:
+        job = await deliveries.get()
+        if job is None:
+            return
+        user_id, order_id, delivered = job
+        try:
+            await driver.text('courier', user, "📦 Buyurtmalar")
+            await driver.callback('courier', user, f"courier_accept_{user_id}_{order_id}")
+            await driver.callback('courier', user, f"courier_delivered_{user_id}_{order_id}")
+            _, order = Storage.get_order(order_id)
+            if order is None or order.get('status') != 'delivered':
+                driver.recorder.errors['courier_state'] += 1
+        finally:
+            delivered.set_result(None)
+
+
+async def admin_flow(driver: Driver, admin_id: int, rounds: int, courier_ids: list):
+    user = driver.user(admin_id, "Admin")
+    await driver.text('admin', user, f"/admin {PASSWORD}")
+    for index in range(rounds):
+        await driver.text('admin', user, "📊 Umumiy Statistika")
+        await driver.text('admin', user, "🏍️ Kuryer nazorati")
+        if courier_ids:
+            await driver.callback('admin', user, "courier_report")
+            await driver.text('admin', user, str(courier_ids[index % len(courier_ids)]))
+        await asyncio.sleep(0.2)
+
+
+# --------------------------------------------------------------------------------------
+# Ishga tushirish
+# --------------------------------------------------------------------------------------
+async def run(args, customers: list):
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.fsm.storage.memory import MemoryStorage
+
+    import app
+    from FakeBotApi import FakeBotApi
+
+    server = await FakeBotApi(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              rate_limit_ratio=args.rate_limit_ratio, retry_after=args.retry_after,
+                              seed=args.seed).start()
+    recorder = Recorder()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(server.base_url))
+    bot = app.create_bot(os.environ['BOT_TOKEN'], session=session)
+    bot.session.middleware(recorder.request_middleware())
+    dp = app.create_dispatcher(MemoryStorage())
+    dp.update.outer_middleware(recorder.update_middleware)
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1, close_bot_session=True))
+    driver = Driver(server, recorder)
+    deliveries = asyncio.Queue()
+    courier_ids = [COURIER_BASE + i for i in range(args.couriers)]
+
+    started = time.perf_counter()
+    couriers = [asyncio.create_task(courier_flow(driver, courier_id, deliveries)) for courier_id in courier_ids]
+    admins = [asyncio.create_task(admin_flow(driver, ADMIN_BASE + i, args.admin_rounds, courier_ids))
+              for i in range(args.admins)]
+    results = await asyncio.gather(*(customer_flow(driver, user_id, args, deliveries) for user_id in customers),
+                                   return_exceptions=True)
+    for _ in couriers:
+        await deliveries.put(None)
+    results += await asyncio.gather(*couriers, *admins, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    failed = [r for r in results if isinstance(r, BaseException)]
+    failure_kinds = Counter(type(r).__name__ for r in failed)
+    for error in failed[:5]:
+        print(f"XATO: Ssenariy yakunlanmadi: {error!r}", file=sys.stderr)
+
+    # Kechiktirilgan tahrirlar (savatcha debounce) tugashini kutamiz
+    await asyncio.sleep(1.0)
+    await dp.stop_polling()
+    await polling
+    await server.stop()
+
+    flows = sorted(set(recorder.handler_ms) | set(recorder.calls))
+    return {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'elapsed_s': round(elapsed, 3),
+        'updates': driver.updates,
+        'updates_per_sec': round(driver.updates / elapsed, 2) if elapsed else None,
+        'failed_sessions': len(failed),
+        'failure_kinds': dict(failure_kinds),
+        'handler_errors': dict(recorder.errors),
+        'flows': {
+            flow: {
+                'handler': _percentiles(recorder.handler_ms.get(flow, [])),
+                'end_to_end': _percentiles(recorder.e2e_ms.get(flow, [])),
+                'telegram_calls': dict(recorder.calls.get(flow, {})),
+            }
+            for flow in flows
+        },
+        'server': {
+            'calls': dict(server.calls),
+            'rate_limited': dict(server.rate_limited),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soxta Bot API bilan end-to-end yuklama testi")
+    parser.add_argument('--customers', type=int, default=50)
+    parser.add_argument('--couriers', type=int, default=5)
+    parser.add_argument('--admins', type=int, default=1)
+    parser.add_argument('--admin-rounds', type=int, default=5)
+    parser.add_argument('--orders-per-customer', type=int, default=1)
+    parser.add_argument('--latency-ms', type=float, default=30.0, help="Har bir Bot API javobiga qo'shiladigan kechikish")
+    parser.add_argument('--jitter-ms', type=float, default=10.0)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="429 qaytariladigan so'rovlar ulushi (0..1)")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--unthrottled', action='store_true', help="Sender.py tezlik cheklovlarini o'chirish")
+    parser.add_argument('--catalog-mode', choices=('cards', 'paged'), default='cards',
+                        help="Client.CATALOG_MODE: mahsulot kartochkalari (standart) yoki sahifalangan katalog")
+    parser.add_argument('--auto-dispatch', action='store_true', help="AUTO_DISPATCH=on bilan ishlatish")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep-data', action='store_true', help="Vaqtinchalik ma'lumotlar katalogini o'chirmaslik")
+    parser.add_argument('--output', help="Natijani faylga ham yozish")
+    args = parser.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix="shukrona-loadtest-"))
+    try:
+        customers = _prepare_environment(args, data_dir)
+        report = asyncio.run(run(args, customers))
+    finally:
+        if args.keep_data:
+            print(f"Ma'lumotlar saqlandi: {data_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    print(text)
+    if report['failed_sessions'] or report['handler_errors']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
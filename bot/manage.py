@@ -0,0 +1,289 @@
+# bot/manage.py (Xizmat buyruqlari: migratsiya va tekshiruvlar)
+#
+# Foydalanish:
+#   python manage.py migrate-sqlite [--db shukrona.db]
+#   python manage.py compact-journal
+#   python manage.py verify-rollups [--fix]
+#   python manage.py stress-transitions [--orders 50] [--couriers 20] [--seed 0]
+#   python manage.py backfill-epochs [--dry-run] [--source-offset 5]
+
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+from datetime import timedelta, timezone
+from pathlib import Path
+
+import Storage
+import Rollups
+import Clock
+from SqliteStorage import SqliteBackend
+
+
+# --------------------------------------------------------------------------------------
+# JSON -> SQLite migratsiyasi
+# --------------------------------------------------------------------------------------
+def migrate_sqlite(args):
+    """Barcha JSON fayllarni bir martalik SQLite bazasiga ko'chiradi."""
+    source = Storage.JsonBackend()
+    target = SqliteBackend(Path(args.db))
+
+    users = source.load_users()
+    target.write_users(users, set(users.keys()), set())
+    order_count = sum(len(user.get('orders', [])) for user in users.values())
+    print(f"👥 Foydalanuvchilar: {len(users)} ta, buyurtmalar: {order_count} ta")
+
+    for name in Storage.COLLECTIONS:
+        data = source.load_collection(name)
+        target.write_collection(name, data)
+        print(f"📁 {name}: {len(data)} ta")
+
+    for stream in Storage.STREAMS:
+        records = source.load_records(stream)
+        existing = len(target.load_records(stream))
+        if existing:
+            print(f"⚠️ {stream}: SQLite da allaqachon {existing} ta yozuv bor, o'tkazib yuborildi.")
+            continue
+        for record in records:
+            target.append_record(stream, record)
+        print(f"📝 {stream}: {len(records)} ta")
+
+    target.close()
+    print(f"✅ Migratsiya yakunlandi: {args.db}\nEndi STORAGE_BACKEND=sqlite bilan ishga tushiring.")
+
+
+# --------------------------------------------------------------------------------------
+# Jurnallarni siqish (ratings.jsonl -> ratings.json)
+# --------------------------------------------------------------------------------------
+def compact_journal(args):
+    backend = Storage.JsonBackend()
+    for stream, count in backend.compact().items():
+        print(f"📝 {stream}: {count} ta yangi yozuv snapshotga qo'shildi")
+
+
+# --------------------------------------------------------------------------------------
+# Kuryer kunlik hisoblagichlarini tekshirish / qayta qurish
+# --------------------------------------------------------------------------------------
+def verify_rollups(args):
+    diffs = Rollups.verify()
+    if not diffs:
+        print("✅ Kunlik hisoblagichlar buyurtmalar tarixi bilan mos.")
+        return
+    print(f"❌ {len(diffs)} ta nomuvofiqlik topildi:")
+    for courier_id, day, key, stored, expected in diffs[:50]:
+        print(f"  kuryer {courier_id} | {day} | {key}: saqlangan={stored}, tarix={expected}")
+    if args.fix:
+        Storage.save_collection(Rollups.COLLECTION, Rollups.rebuild())
+        Storage.close_storage()
+        print("🔧 Hisoblagichlar tarixdan qayta qurildi va saqlandi.")
+    else:
+        raise SystemExit(1)
+
+
+# --------------------------------------------------------------------------------------
+# Buyurtma holatlari uchun stress-tekshiruv (bir vaqtdagi kuryer bosishlari)
+# --------------------------------------------------------------------------------------
+# Har bir soxta Telegram chaqiruvi tasodifiy qisqa vaqt kutadi: handlerlar har bir await
+# nuqtasida bir-biriga aralashadi, xuddi haqiqiy tarmoq kechikishidagi kabi.
+_rng = random.Random()
+
+
+async def _network_delay():
+    await asyncio.sleep(_rng.random() * 0.002)
+
+
+class _FakeBot:
+    async def send_message(self, *args, **kwargs):
+        await _network_delay()
+        return SimpleNamespace(message_id=0)
+
+    async def edit_message_text(self, *args, **kwargs):
+        await _network_delay()
+
+
+def _fake_call(data: str, courier_id: int, outcomes: list):
+    async def answer(*args, **kwargs):
+        await _network_delay()
+
+    async def edit_text(text, **kwargs):
+        await _network_delay()
+        outcomes.append((courier_id, text))
+
+    return SimpleNamespace(
+        data=data,
+        from_user=SimpleNamespace(id=courier_id),
+        answer=answer,
+        message=SimpleNamespace(edit_text=edit_text)
+    )
+
+
+async def _stress_round(user_id: str, order_id: str, courier_ids: list, bot):
+    import Kuryer
+
+    couriers = _rng.sample(courier_ids, len(courier_ids))
+    accepts = []
+    await asyncio.gather(*(
+        Kuryer.callback_accept_order(_fake_call(f"courier_accept_{user_id}_{order_id}", c, accepts), bot)
+        for c in couriers
+    ))
+    winners = [c for c, text in accepts if text.startswith("✅")]
+
+    # G'olib va yutqazganlar bir vaqtda "yetkazildi" bosadi
+    delivered = []
+    await asyncio.gather(*(
+        Kuryer.callback_delivered_order(_fake_call(f"courier_delivered_{user_id}_{order_id}", c, delivered), bot)
+        for c in _rng.sample(couriers + winners, len(couriers) + len(winners))
+    ))
+    return winners, [c for c, text in delivered if text.startswith("🏁")]
+
+
+async def _cancel_round(user_id: str, order_id: str, courier_ids: list, bot):
+    """Mijoz "bekor qilish" ni kuryerlarning "olish" bosishlari bilan bir vaqtda bosadi."""
+    import Kuryer
+    import Client
+
+    outcomes = []
+    calls = [Kuryer.callback_accept_order(_fake_call(f"courier_accept_{user_id}_{order_id}", c, outcomes), bot)
+             for c in courier_ids]
+    calls.append(Client.handle_cancel_my_order(_fake_call(f"cancel_my_order_{order_id}", user_id, outcomes), bot))
+
+    async def click(call):
+        # Bosishlar turli paytda keladi, aks holda birinchi await gacha ishlagan handler doim yutadi
+        await _network_delay()
+        await call
+
+    await asyncio.gather(*(click(call) for call in calls))
+    winners = [c for c, text in outcomes if text.startswith("✅")]
+    cancelled = any(c == user_id and text.startswith("🚫") for c, text in outcomes)
+    return winners, cancelled
+
+
+async def _naive_round(user_id: str, order_id: str, courier_ids: list) -> int:
+    """Nazorat: o'qish -> await -> yozish (transition_order siz). Poyga bo'lsa g'oliblar > 1."""
+    winners = []
+
+    async def accept(courier_id):
+        _, order = Storage.get_order(order_id)
+        if order['status'] != 'pending':
+            return
+        await _network_delay()
+        order.update(status='on_delivery', courier_id=str(courier_id))
+        winners.append(courier_id)
+
+    await asyncio.gather(*(accept(c) for c in courier_ids))
+    return len(winners)
+
+
+def stress_transitions(args):
+    """Sintetik buyurtmalarda bir vaqtdagi qabul/yetkazish bosishlarini tekshiradi. Diskka yozilmaydi."""
+    _rng.seed(args.seed)
+    user_id = "stress-test"
+    courier_ids = list(range(1, args.couriers + 1))
+    Storage.save_user_data(user_id, {'name': 'stress', 'orders': []})
+    bot = _FakeBot()
+
+    def new_order():
+        order_id = Storage.allocate_id('order')
+        Storage.add_order(user_id, {'order_id': order_id, 'status': 'pending', 'total': 1000, 'date': '2000-01-01 00:00:00'})
+        return order_id
+
+    failures = naive_races = cancel_wins = 0
+    for _ in range(args.orders):
+        order_id = new_order()
+        winners, delivered = asyncio.run(_stress_round(user_id, order_id, courier_ids, bot))
+        _, order = Storage.get_order(order_id)
+        ok = (
+            len(winners) == 1 and delivered == winners
+            and order['status'] == 'delivered' and order['courier_id'] == str(winners[0])
+        )
+        if not ok:
+            failures += 1
+            print(f"❌ #{order_id}: g'oliblar={winners}, yetkazdi={delivered}, holat={order['status']}")
+        if asyncio.run(_naive_round(user_id, new_order(), courier_ids)) > 1:
+            naive_races += 1
+
+        # Bekor qilish va qabul qilish poygasi: aynan bittasi yutadi
+        order_id = new_order()
+        winners, cancelled = asyncio.run(_cancel_round(user_id, order_id, courier_ids, bot))
+        _, order = Storage.get_order(order_id)
+        if cancelled:
+            ok = not winners and order['status'] == 'cancelled' and order.get('courier_id') is None
+            cancel_wins += 1
+        else:
+            ok = len(winners) == 1 and order['status'] == 'on_delivery' and order['courier_id'] == str(winners[0])
+        if not ok:
+            failures += 1
+            print(f"❌ #{order_id} (bekor qilish): g'oliblar={winners}, bekor={cancelled}, holat={order['status']}")
+
+    if failures:
+        print(f"❌ {failures}/{args.orders} ta buyurtmada nomuvofiqlik.")
+        raise SystemExit(1)
+    if len(courier_ids) > 1 and not naive_races:
+        # Nazorat ham poygani ushlamadi: handlerlar aralashmagan, tekshiruv hech narsani isbotlamaydi
+        print("❌ Nazorat (o'qish -> await -> yozish) bironta poyga bermadi: stress-test aralashuvni hosil qilmadi.")
+        raise SystemExit(1)
+    print(f"✅ {args.orders} ta buyurtma x {args.couriers} ta kuryer: har birida aynan bitta g'olib, bitta yetkazish.")
+    print(f"   Bekor qilish poygasi: {cancel_wins}/{args.orders} tasida mijoz, qolganida bitta kuryer yutdi.")
+    print(f"   Nazorat: transition_order siz variantda {naive_races}/{args.orders} ta buyurtmada bir nechta g'olib.")
+
+
+# --------------------------------------------------------------------------------------
+# Eski buyurtmalarga epoch maydonlarini qo'shish (Clock.ORDER_EVENTS)
+# --------------------------------------------------------------------------------------
+def backfill_epochs(args):
+    """'date'/'accepted_at'/'delivered_at'/'rated_at' satrlaridan '_ts' maydonlarini to'ldiradi."""
+    date_tz = None
+    if args.source_offset is not None:
+        date_tz = timezone(timedelta(hours=args.source_offset))
+    print(f"🕒 Eski 'date' satrlari mintaqasi: {date_tz or Clock.LEGACY_DATE_TZ}")
+    orders = changed = 0
+    for user_id in Storage.get_all_user_ids():
+        user = Storage.get_user_data(user_id) or {}
+        for order in user.get('orders', []):
+            orders += 1
+            if Clock.backfill_order(order, date_tz):
+                changed += 1
+                if not args.dry_run:
+                    Storage.save_order(user_id, order)
+
+    if args.dry_run:
+        print(f"🔍 {orders} ta buyurtmadan {changed} tasiga epoch maydonlari qo'shiladi (--dry-run, saqlanmadi).")
+        return
+    Storage.close_storage()
+    print(f"✅ {orders} ta buyurtmadan {changed} tasiga epoch maydonlari qo'shildi.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shukrona bot xizmat buyruqlari")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('migrate-sqlite', help="JSON fayllarni SQLite bazasiga ko'chirish")
+    p.add_argument('--db', default=str(Storage.SQLITE_FILE), help="SQLite fayl yo'li")
+    p.set_defaults(func=migrate_sqlite)
+
+    p = sub.add_parser('compact-journal', help="Jurnal yozuvlarini JSON snapshotlarga qo'shish")
+    p.set_defaults(func=compact_journal)
+
+    p = sub.add_parser('verify-rollups', help="Kuryer kunlik hisoblagichlarini tarix bilan solishtirish")
+    p.add_argument('--fix', action='store_true', help="Farq bo'lsa tarixdan qayta qurish")
+    p.set_defaults(func=verify_rollups)
+
+    p = sub.add_parser('stress-transitions', help="Bir vaqtdagi kuryer bosishlarida buyurtma holatini tekshirish")
+    p.add_argument('--orders', type=int, default=50)
+    p.add_argument('--couriers', type=int, default=20)
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=stress_transitions)
+
+    p = sub.add_parser('backfill-epochs', help="Eski buyurtmalarga '_ts' epoch maydonlarini qo'shish")
+    p.add_argument('--dry-run', action='store_true', help="Faqat sanash, saqlamaslik")
+    p.add_argument('--source-offset', type=float,
+                   help="Eski 'date' satrlari yozilgan server mintaqasi, UTC dan soat (standart: BOT_LEGACY_TZ_OFFSET "
+                        "yoki shu server vaqti). accepted_at/delivered_at har doim UTC+5 da o'qiladi")
+    p.set_defaults(func=backfill_epochs)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()